@@ -4,39 +4,723 @@ AI Service for SVN Trading Bot
 Handles AI predictions and machine learning operations
 """
 
+import atexit
 import json
+import hashlib
+import math
+import os
+import threading
+import time
 import numpy as np
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Callable, Dict, Iterable, List, Any, Tuple, Optional, Union
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+try:
+    from .model_registry import ModelRegistry
+except ImportError:
+    # For standalone execution
+    from model_registry import ModelRegistry
+
+try:
+    from .smart_money import (ZONE_DTYPE, ZONE_KINDS, BULLISH, ORDER_BLOCK, SmartMoneyState,
+                              ZoneIndex, order_blocks, fair_value_gaps, liquidity_sweeps)
+except ImportError:
+    # For standalone execution
+    from smart_money import (ZONE_DTYPE, ZONE_KINDS, BULLISH, ORDER_BLOCK, SmartMoneyState,
+                             ZoneIndex, order_blocks, fair_value_gaps, liquidity_sweeps)
+
+# Candles as a list of dicts or as a mapping of column arrays
+CandleData = Union[List[Dict[str, Any]], Dict[str, np.ndarray]]
+
+NAN = float('nan')
+
+# Bump when the input or feature names, their order or their normalization change
+FEATURE_SCHEMA_VERSION = 1
+
+# AIModel row the signal model is stored under
+DEFAULT_MODEL_NAME = 'svn-signal-model'
+
+# Prediction memoization: entries kept (0 disables) and significant digits
+# raw inputs are truncated to before matching
+PREDICTION_MEMO_SIZE = int(os.environ.get('PREDICTION_MEMO_SIZE', 0))
+PREDICTION_MEMO_PRECISION = int(os.environ.get('PREDICTION_MEMO_PRECISION', 4))
+
+# Raw inputs read from a features dict, in vector order
+FEATURE_INPUTS = (
+    'rsi', 'macd', 'macd_signal', 'bb_upper', 'bb_lower', 'close', 'volume',
+    'volume_avg', 'support', 'resistance', 'trend_strength', 'ma_fast', 'ma_slow', 'atr'
+)
+
+# Normalized features scored by the model, in slot order
+FEATURE_NAMES = (
+    'rsi', 'macd', 'macd_signal', 'bollinger', 'volume', 'support_resistance', 'trend', 'ma_cross'
+)
+
+def _as_float(value: Any) -> float:
+    """Float value of a raw input, NaN if missing or not numeric"""
+    if value is None:
+        return NAN
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+def _clip_unit(value: float) -> float:
+    """Clip to [-1, 1], keeping NaN"""
+    if value != value:
+        return value
+    return -1.0 if value < -1 else 1.0 if value > 1 else value
+
+def _feedback_number(feedback: Dict[str, Any], key: str) -> float:
+    """Numeric field of a feedback event (0 when absent), ValueError otherwise"""
+    value = feedback.get(key, 0)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{key} must be a finite number, got {value!r}")
+    return value
+
+def _failed_prediction(error: Exception) -> Tuple[Dict[str, Any], List[float]]:
+    """Neutral prediction reported when scoring raised"""
+    logger.error(f"Error in predict_signal: {error}")
+    return {
+        'signal': 0,
+        'confidence': 0.0,
+        'error': str(error),
+        'timestamp': datetime.now().isoformat()
+    }, []
+
+class FeatureSchema:
+    """Raw inputs and normalized features compiled to fixed vector slots
+    
+    Built once per model: input names map to slots of a raw vector, features
+    to slots of a normalized vector, and the feature weights to a vector in
+    that same order. Predictions then work on lists/arrays indexed by slot
+    rather than on per-call dicts. ``fingerprint`` identifies the exact names
+    and order so stored weights are only ever applied to the layout they
+    were trained on.
+    """
+    
+    def __init__(self, model_version: str, feature_weights: Dict[str, float],
+                 inputs: Tuple[str, ...] = FEATURE_INPUTS, features: Tuple[str, ...] = FEATURE_NAMES):
+        self.model_version = model_version
+        self.version = FEATURE_SCHEMA_VERSION
+        self.inputs = tuple(inputs)
+        self.features = tuple(features)
+        self.fingerprint = hashlib.sha1(
+            f"{self.version}|{','.join(self.inputs)}|{','.join(self.features)}".encode('utf-8')
+        ).hexdigest()[:12]
+        
+        slot = {name: index for index, name in enumerate(self.inputs)}
+        self.rsi = slot['rsi']
+        self.macd = slot['macd']
+        self.macd_signal = slot['macd_signal']
+        self.bb_upper = slot['bb_upper']
+        self.bb_lower = slot['bb_lower']
+        self.close = slot['close']
+        self.volume = slot['volume']
+        self.volume_avg = slot['volume_avg']
+        self.support = slot['support']
+        self.resistance = slot['resistance']
+        self.trend_strength = slot['trend_strength']
+        self.ma_fast = slot['ma_fast']
+        self.ma_slow = slot['ma_slow']
+        self.atr = slot['atr']
+        
+        # Normalization constants
+        self.rsi_center = 50.0
+        self.macd_scale = 0.001
+        self.volume_cap = 2.0
+        
+        self.set_weights(feature_weights)
+    
+    def set_weights(self, feature_weights: Dict[str, float]) -> None:
+        """Compile feature weights into slot order (features without a weight get 0)"""
+        self.set_weight_vector([feature_weights.get(name, 0.0) for name in self.features])
+    
+    def set_weight_vector(self, weights: Iterable[float]) -> None:
+        """Install weights already in slot order"""
+        weights = tuple(float(weight) for weight in weights)
+        self.weights = weights
+        self.weight_vector = np.array(weights)
+        self.weight_magnitudes = np.abs(self.weight_vector)
+        self.weighted_slots = tuple(index for index, weight in enumerate(weights) if weight)
+    
+    def with_weights(self, weights: Iterable[float], model_version: Optional[str] = None) -> 'FeatureSchema':
+        """A new schema with the same layout and the given slot-order weights
+        
+        Schemas are swapped into a predictor whole rather than modified in
+        place, so a prediction never sees half-updated weights.
+        """
+        schema = FeatureSchema(model_version or self.model_version, {}, self.inputs, self.features)
+        schema.set_weight_vector(weights)
+        return schema
+    
+    def weight_dict(self) -> Dict[str, float]:
+        """Weights keyed by feature name (zero weights left out)"""
+        return {self.features[index]: self.weights[index] for index in self.weighted_slots}
+    
+    def vector(self, features: Dict[str, Any]) -> List[float]:
+        """Raw input vector for a features dict"""
+        get = features.get
+        return [_as_float(get(name)) for name in self.inputs]
+    
+    def matrix(self, feature_rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Raw input matrix for many features dicts"""
+        matrix = np.full((len(feature_rows), len(self.inputs)), NAN)
+        for row, features in enumerate(feature_rows):
+            matrix[row] = self.vector(features)
+        return matrix
+    
+    def normalize(self, raw: List[float]) -> List[float]:
+        """Normalized feature vector for one raw vector (NaN where unavailable)"""
+        close = raw[self.close]
+        
+        bb_range = raw[self.bb_upper] - raw[self.bb_lower]
+        bollinger = ((close - raw[self.bb_lower]) / bb_range - 0.5) * 2 if bb_range else NAN
+        
+        volume_avg = raw[self.volume_avg]
+        volume = min(raw[self.volume] / volume_avg, self.volume_cap) - 1 if volume_avg > 0 else NAN
+        
+        sr_range = raw[self.resistance] - raw[self.support]
+        support_resistance = ((close - raw[self.support]) / sr_range - 0.5) * 2 if sr_range > 0 else NAN
+        
+        ma_slow = raw[self.ma_slow]
+        ma_cross = (raw[self.ma_fast] - ma_slow) / ma_slow if ma_slow > 0 else NAN
+        
+        return [
+            (raw[self.rsi] - self.rsi_center) / self.rsi_center,
+            _clip_unit(raw[self.macd] / self.macd_scale),
+            _clip_unit(raw[self.macd_signal] / self.macd_scale),
+            bollinger,
+            volume,
+            support_resistance,
+            _clip_unit(raw[self.trend_strength]),
+            ma_cross
+        ]
+    
+    def normalize_matrix(self, raw: np.ndarray) -> np.ndarray:
+        """Normalized feature matrix for a raw input matrix (NaN where unavailable)"""
+        column = raw.T
+        close = column[self.close]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bb_range = column[self.bb_upper] - column[self.bb_lower]
+            sr_range = column[self.resistance] - column[self.support]
+            volume_avg = column[self.volume_avg]
+            ma_slow = column[self.ma_slow]
+            return np.column_stack([
+                (column[self.rsi] - self.rsi_center) / self.rsi_center,
+                np.clip(column[self.macd] / self.macd_scale, -1, 1),
+                np.clip(column[self.macd_signal] / self.macd_scale, -1, 1),
+                np.where(bb_range != 0, ((close - column[self.bb_lower]) / bb_range - 0.5) * 2, NAN),
+                np.where(volume_avg > 0,
+                         np.minimum(self.volume_cap, column[self.volume] / volume_avg) - 1, NAN),
+                np.where(sr_range > 0, ((close - column[self.support]) / sr_range - 0.5) * 2, NAN),
+                np.clip(column[self.trend_strength], -1, 1),
+                np.where(ma_slow > 0, (column[self.ma_fast] - ma_slow) / ma_slow, NAN)
+            ])
+    
+    def score(self, normalized: List[float]) -> float:
+        """Weighted average over the weighted features that are present
+        
+        Normalized by the total weight magnitude, so learned negative weights
+        keep the score within [-1, 1].
+        """
+        score = 0.0
+        total_weight = 0.0
+        weights = self.weights
+        for index in self.weighted_slots:
+            value = normalized[index]
+            if value == value:
+                weight = weights[index]
+                score += value * weight
+                total_weight += abs(weight)
+        return score / total_weight if total_weight > 0 else score
+    
+    def used(self, normalized) -> List[str]:
+        """Names of the features that were available"""
+        return [name for name, value in zip(self.features, normalized) if value == value]
+    
+    def describe(self) -> Dict[str, Any]:
+        """Schema identity, stored alongside model weights"""
+        return {
+            'version': self.version,
+            'fingerprint': self.fingerprint,
+            'model_version': self.model_version,
+            'inputs': list(self.inputs),
+            'features': list(self.features)
+        }
+
+class OnlineLearner:
+    """SGD logistic regression over the normalized feature slots
+    
+    Each feedback event is one O(features) gradient step on the probability
+    that price moved up, given the feature vector the prediction was made
+    from. The predictor's score is a weighted average, so only the direction
+    of the learned weights matters; ``apply`` swaps them (bias excluded)
+    into the predictor as a new schema. Learned weights are persisted through
+    the predictor's model registry every ``persist_every`` events or
+    ``persist_interval`` seconds, whichever comes first, on a background
+    thread.
+    """
+    
+    def __init__(self, predictor: 'AIPredictor', learning_rate: float = 0.05, l2: float = 1e-4,
+                 persist_every: int = 100, persist_interval: float = 300.0):
+        self.predictor = predictor
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.persist_every = persist_every
+        self.persist_interval = persist_interval
+        
+        self.weights = np.array(predictor.schema.weights)
+        self.bias = 0.0
+        self.updates = 0
+        self.correct = 0
+        self._pending = 0
+        self._unpersisted = 0
+        self._last_persist = time.monotonic()
+        self._persisting = False
+        self._lock = threading.Lock()
+    
+    def learn(self, features: Iterable[float], direction: int) -> float:
+        """One gradient step towards ``direction`` (+1 up, -1 down); returns the prior up-probability"""
+        x = np.nan_to_num(np.asarray(features, dtype=np.float64))
+        if x.shape != self.weights.shape:
+            raise ValueError(f"Expected {len(self.weights)} features, got {x.shape}")
+        target = 1.0 if direction > 0 else 0.0
+        with self._lock:
+            margin = float(x @ self.weights) + self.bias
+            probability = 1.0 / (1.0 + math.exp(-max(-35.0, min(35.0, margin))))
+            error = probability - target
+            self.weights -= self.learning_rate * (error * x + self.l2 * self.weights)
+            self.bias -= self.learning_rate * error
+            self.updates += 1
+            self.correct += (probability >= 0.5) == (target == 1.0)
+            self._pending += 1
+            self._unpersisted += 1
+        return probability
+    
+    def apply(self) -> bool:
+        """Swap the learned weights into the predictor if anything was learned since the last call"""
+        with self._lock:
+            if not self._pending:
+                return False
+            self._pending = 0
+            predictor = self.predictor
+            predictor.schema = predictor.schema.with_weights(self.weights)
+            predictor.weights_revision += 1
+        return True
+    
+    def install(self, schema: 'FeatureSchema', bias: float = 0.0) -> None:
+        """Serve a newly loaded model and continue learning from its weights"""
+        with self._lock:
+            self.weights = np.array(schema.weights)
+            self.bias = bias
+            self._pending = 0
+            self._unpersisted = 0
+            predictor = self.predictor
+            predictor.schema = schema
+            predictor.weights_revision += 1
+    
+    def maybe_persist(self) -> bool:
+        """Start a background save when enough events or time have accumulated"""
+        with self._lock:
+            due = self._unpersisted >= self.persist_every or (
+                self._unpersisted and time.monotonic() - self._last_persist >= self.persist_interval)
+            if not due or self._persisting:
+                return False
+            self._persisting = True
+            self._unpersisted = 0
+            self._last_persist = time.monotonic()
+            record = self._record()
+        threading.Thread(target=self._persist, args=(record,), daemon=True).start()
+        return True
+    
+    def flush(self) -> None:
+        """Persist anything not yet saved (used at shutdown)"""
+        with self._lock:
+            if not self._unpersisted:
+                return
+            self._unpersisted = 0
+            record = self._record()
+        self._persist(record, background=False)
+    
+    def _record(self) -> Dict[str, Any]:
+        """AIModel row for the current state (caller holds the lock)"""
+        schema = self.predictor.schema
+        return {
+            'name': self.predictor.registry.name,
+            'version': self.predictor.model_version,
+            'weights': {name: float(weight) for name, weight in zip(schema.features, self.weights)},
+            'parameters': {
+                'bias': self.bias,
+                'learning_rate': self.learning_rate,
+                'l2': self.l2,
+                'updates': self.updates,
+                'confidence_threshold': self.predictor.confidence_threshold,
+                'feature_schema': schema.describe()
+            },
+            'accuracy': self.correct / self.updates if self.updates else None,
+            'last_trained': datetime.now().isoformat()
+        }
+    
+    def _persist(self, record: Dict[str, Any], background: bool = True) -> None:
+        """Write one AIModel row"""
+        try:
+            self.predictor.registry.save(record)
+        finally:
+            if background:
+                with self._lock:
+                    self._persisting = False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Update counts and running accuracy"""
+        with self._lock:
+            return {
+                'updates': self.updates,
+                'accuracy': self.correct / self.updates if self.updates else None,
+                'unpersisted_updates': self._unpersisted,
+                'bias': self.bias
+            }
+
+class FeedbackTrainer:
+    """Queue of trade feedback applied to the predictor in micro-batches
+    
+    Request handlers enqueue feedback and return immediately; a background
+    thread hands up to ``batch_size`` events at a time to ``update_model``,
+    once a full batch is pending or ``batch_interval`` seconds after the
+    oldest pending event. At most ``max_queue`` events wait; when full,
+    enqueueing waits up to ``enqueue_timeout`` for room and is then rejected
+    so callers can push back. Everything pending is applied on stop.
+    """
+    
+    def __init__(self, predictor: 'AIPredictor', batch_size: int = 256, batch_interval: float = 0.5,
+                 max_queue: int = 10000, enqueue_timeout: float = 0.05):
+        self.predictor = predictor
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_queue = max_queue
+        self.enqueue_timeout = enqueue_timeout
+        
+        self._pending = deque()
+        self._oldest_pending = None
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        
+        self.stats = {
+            'enqueued': 0,
+            'applied': 0,
+            'failed': 0,
+            'rejected': 0,
+            'batches': 0,
+            'max_queue_depth': 0,
+            'enqueue_waits': 0,
+            'last_batch_size': 0,
+            'last_batch_latency_ms': 0.0,
+            'max_batch_latency_ms': 0.0,
+            'total_batch_latency_ms': 0.0
+        }
+    
+    def start(self):
+        """Start the trainer thread if it is not running"""
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='feedback-trainer', daemon=True)
+            self._thread.start()
+    
+    def enqueue(self, feedback: Dict[str, Any]) -> bool:
+        """Queue one feedback event; False if the queue stayed full"""
+        return self.enqueue_many([feedback])
+    
+    def enqueue_many(self, feedback_data: List[Dict[str, Any]]) -> bool:
+        """Queue feedback events all together, or none of them if there is no room"""
+        count = len(feedback_data)
+        if not count:
+            return True
+        if count > self.max_queue:
+            with self._condition:
+                self.stats['rejected'] += count
+            return False
+        self.start()
+        with self._condition:
+            deadline = time.monotonic() + self.enqueue_timeout
+            if len(self._pending) + count > self.max_queue:
+                self.stats['enqueue_waits'] += 1
+            while len(self._pending) + count > self.max_queue:
+                self._condition.notify_all()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats['rejected'] += count
+                    logger.error(f"Feedback queue full, rejected {count} events")
+                    return False
+                self._condition.wait(remaining)
+            
+            self._pending.extend(feedback_data)
+            self.stats['enqueued'] += count
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], len(self._pending))
+            if self._oldest_pending is None:
+                # The trainer may be waiting with no timeout; let it schedule the interval batch
+                self._oldest_pending = time.monotonic()
+                self._condition.notify_all()
+            elif len(self._pending) >= self.batch_size:
+                self._condition.notify_all()
+        return True
+    
+    def _run(self):
+        """Trainer thread loop"""
+        while True:
+            with self._condition:
+                while not self._batch_due():
+                    if self._stopping and not self._pending:
+                        return
+                    self._condition.wait(self._wait_timeout())
+                batch = self._take_batch()
+                self._condition.notify_all()
+            self._apply(batch)
+    
+    def _batch_due(self) -> bool:
+        """Whether a batch should be applied now (caller holds the lock)"""
+        if not self._pending:
+            return False
+        if self._stopping or len(self._pending) >= self.batch_size:
+            return True
+        return time.monotonic() - self._oldest_pending >= self.batch_interval
+    
+    def _wait_timeout(self) -> Optional[float]:
+        """Seconds until the interval batch is due (caller holds the lock)"""
+        if self._oldest_pending is None:
+            return None
+        return max(0.0, self.batch_interval - (time.monotonic() - self._oldest_pending))
+    
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        """Pop up to one batch of pending events (caller holds the lock)"""
+        pending = self._pending
+        batch = [pending.popleft() for _ in range(min(self.batch_size, len(pending)))]
+        # Whatever is left is due straight away
+        self._oldest_pending = time.monotonic() - self.batch_interval if pending else None
+        return batch
+    
+    def _apply(self, batch: List[Dict[str, Any]]):
+        """Apply one batch and record its latency"""
+        started = time.perf_counter()
+        try:
+            applied = self.predictor.apply_feedback(batch)
+        except Exception as e:
+            logger.error(f"Error applying feedback batch: {e}")
+            applied = 0
+        latency_ms = (time.perf_counter() - started) * 1000
+        
+        with self._condition:
+            self.stats['batches'] += 1
+            self.stats['last_batch_size'] = len(batch)
+            self.stats['last_batch_latency_ms'] = latency_ms
+            self.stats['max_batch_latency_ms'] = max(self.stats['max_batch_latency_ms'], latency_ms)
+            self.stats['total_batch_latency_ms'] += latency_ms
+            self.stats['applied'] += applied
+            self.stats['failed'] += len(batch) - applied
+    
+    def stop(self, timeout: Optional[float] = None):
+        """Apply everything still pending and stop the trainer thread"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, backpressure and batch metrics"""
+        with self._condition:
+            stats = dict(self.stats)
+            stats['queue_depth'] = len(self._pending)
+            stats['queue_capacity'] = self.max_queue
+            stats['oldest_pending_age_s'] = (time.monotonic() - self._oldest_pending
+                                             if self._oldest_pending is not None else 0.0)
+            stats['running'] = self._thread is not None and self._thread.is_alive()
+        batches = stats['batches']
+        total_latency_ms = stats.pop('total_batch_latency_ms')
+        stats['avg_batch_latency_ms'] = total_latency_ms / batches if batches else 0.0
+        stats['queue_utilization'] = stats['queue_depth'] / self.max_queue if self.max_queue else 0.0
+        return stats
+
+class PredictionMemo:
+    """Recent predictions keyed by serving model, symbol and quantized raw inputs
+    
+    Expert advisors tend to ask for the same symbol many times per bar with
+    indicator values that differ only in the last digits. Inputs are
+    truncated to ``precision`` significant digits (as float64 mantissa bits,
+    so bins are relative to magnitude) and a match returns the earlier
+    prediction (with a fresh timestamp), skipping normalization and scoring;
+    inputs that differ only beyond that precision therefore share a result.
+    The memo belongs to one serving model: when the predictor's schema is
+    swapped (new model or learned weights) everything is dropped. At most
+    ``max_entries`` are kept, least recently used first out; 0 disables it.
+    """
+    
+    def __init__(self, predictor: 'AIPredictor', max_entries: int = 0, precision: int = 4):
+        self.predictor = predictor
+        self.max_entries = max_entries
+        self.precision = precision
+        # Keep the float64 sign, exponent and enough mantissa bits for the digits
+        kept_bits = min(52, max(1, math.ceil(precision * math.log2(10))))
+        self._mask = np.uint64((2 ** 64 - 1) ^ (2 ** (52 - kept_bits) - 1))
+        self._entries: 'OrderedDict[Tuple, Tuple[Dict[str, Any], List[float]]]' = OrderedDict()
+        self._schema = None
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def predict(self, symbol: str, features: Dict[str, Any]) -> Tuple[Dict[str, Any], List[float]]:
+        """Same as AIPredictor.predict_with_features, answered from the memo when possible"""
+        predictor = self.predictor
+        if not self.max_entries:
+            return predictor.predict_with_features(symbol, features)
+        schema = predictor.schema
+        try:
+            raw = schema.vector(features)
+        except Exception as e:
+            return _failed_prediction(e)
+        key = (symbol, (np.array(raw).view(np.uint64) & self._mask).tobytes())
+        
+        with self._lock:
+            if schema is not self._schema:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._schema = schema
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if cached is not None:
+            prediction, normalized = cached
+            return dict(prediction, timestamp=datetime.now().isoformat()), normalized
+        
+        prediction, normalized = predictor.predict_raw(symbol, schema, raw)
+        if 'error' not in prediction:
+            with self._lock:
+                if schema is self._schema:
+                    self._entries[key] = (prediction, normalized)
+                    if len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+        return prediction, normalized
+    
+    def clear(self) -> None:
+        """Drop every memoized prediction"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Size, hit rate and eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.max_entries > 0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'precision': self.precision,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
 class AIPredictor:
-    """AI Prediction service for trading signals"""
+    """AI Prediction service for trading signals
     
-    def __init__(self):
-        self.model_version = "1.0.0"
+    The serving model is ``self.schema``: version, layout and weights in one
+    object that is replaced, never modified, when a new model or learned
+    weights are installed. Predictions read it once, so they need no lock
+    and finish on the model they started with.
+    """
+    
+    def __init__(self, registry: Optional[ModelRegistry] = None):
         self.confidence_threshold = 0.7
-        self.feature_weights = {
+        self.schema = FeatureSchema("1.0.0", {
             'rsi': 0.2,
             'macd': 0.25,
             'bollinger': 0.15,
             'volume': 0.1,
             'support_resistance': 0.15,
             'trend': 0.15
-        }
+        })
+        # Bumped whenever learned weights or a new model are installed
+        self.weights_revision = 0
+        self.learner = OnlineLearner(self)
+        self.registry = registry or ModelRegistry(DEFAULT_MODEL_NAME, cache_path=None)
+        self.registry.install = self.install_model
+        self.trainer = FeedbackTrainer(self)
+        self.memo = PredictionMemo(self, PREDICTION_MEMO_SIZE, PREDICTION_MEMO_PRECISION)
+    
+    @property
+    def model_version(self) -> str:
+        """Version of the serving model"""
+        return self.schema.model_version
+    
+    @property
+    def feature_weights(self) -> Dict[str, float]:
+        """Weights of the serving model by feature name"""
+        return self.schema.weight_dict()
+    
+    def install_model(self, record: Dict[str, Any]) -> None:
+        """Build a model from an AIModel record and swap it in
+        
+        Weights are only accepted for the feature layout they were trained
+        on (same schema fingerprint); anything else raises ValueError and
+        leaves the serving model untouched.
+        """
+        parameters = record.get('parameters') or {}
+        fingerprint = (parameters.get('feature_schema') or {}).get('fingerprint')
+        current = self.schema
+        if fingerprint != current.fingerprint:
+            raise ValueError(f"Model schema {fingerprint} does not match {current.fingerprint}")
+        weights = record.get('weights') or {}
+        schema = current.with_weights([float(weights.get(name, 0.0)) for name in current.features],
+                                      str(record.get('version') or current.model_version))
+        if 'confidence_threshold' in parameters:
+            self.confidence_threshold = float(parameters['confidence_threshold'])
+        self.learner.install(schema, float(parameters.get('bias', 0.0)))
         
     def predict_signal(self, symbol: str, features: Dict[str, Any]) -> Dict[str, Any]:
         """Generate trading signal prediction"""
+        return self.predict_with_features(symbol, features)[0]
+    
+    def predict_with_features(self, symbol: str, features: Dict[str, Any]) -> Tuple[Dict[str, Any], List[float]]:
+        """Prediction plus the normalized feature vector it was made from
+        
+        Keep the vector with the prediction so trade feedback can be learned
+        from later (see OnlineLearner). The vector is empty on error.
+        """
+        schema = self.schema
+        try:
+            raw = schema.vector(features)
+        except Exception as e:
+            return _failed_prediction(e)
+        return self.predict_raw(symbol, schema, raw)
+    
+    def predict_raw(self, symbol: str, schema: FeatureSchema, raw: List[float]) -> Tuple[Dict[str, Any], List[float]]:
+        """Prediction from a raw input vector already extracted with ``schema``"""
+        normalized = []
         try:
-            # Extract and normalize features
-            normalized_features = self._normalize_features(features)
+            # Normalize features into schema slots
+            normalized = schema.normalize(raw)
             
             # Calculate prediction
-            signal_score = self._calculate_signal_score(normalized_features)
+            signal_score = schema.score(normalized)
             
             # Determine signal direction
             if signal_score > 0.7:
@@ -50,7 +734,7 @@ class AIPredictor:
                 confidence = 0.5
             
             # Add market context
-            market_context = self._analyze_market_context(symbol, features)
+            market_context = self._analyze_market_context(symbol, raw, schema)
             
             # Adjust confidence based on market conditions
             final_confidence = self._adjust_confidence(confidence, market_context)
@@ -60,100 +744,16 @@ class AIPredictor:
                 'confidence': final_confidence,
                 'signal_strength': abs(signal_score),
                 'market_context': market_context,
-                'features_used': list(normalized_features.keys()),
+                'features_used': schema.used(normalized),
                 'timestamp': datetime.now().isoformat(),
-                'model_version': self.model_version
-            }
-            
-        except Exception as e:
-            logger.error(f"Error in predict_signal: {e}")
-            return {
-                'signal': 0,
-                'confidence': 0.0,
-                'error': str(e),
-                'timestamp': datetime.now().isoformat()
-            }
-    
-    def _normalize_features(self, features: Dict[str, Any]) -> Dict[str, float]:
-        """Normalize input features"""
-        normalized = {}
-        
-        try:
-            # RSI normalization (0-100 to -1 to 1)
-            if 'rsi' in features:
-                rsi = float(features['rsi'])
-                normalized['rsi'] = (rsi - 50) / 50
-            
-            # MACD normalization
-            if 'macd' in features:
-                macd = float(features['macd'])
-                normalized['macd'] = max(-1, min(1, macd / 0.001))  # Normalize to [-1, 1]
-            
-            # MACD Signal
-            if 'macd_signal' in features:
-                macd_signal = float(features['macd_signal'])
-                normalized['macd_signal'] = max(-1, min(1, macd_signal / 0.001))
-            
-            # Bollinger Bands
-            if 'bb_upper' in features and 'bb_lower' in features and 'close' in features:
-                bb_upper = float(features['bb_upper'])
-                bb_lower = float(features['bb_lower'])
-                close = float(features['close'])
-                bb_position = (close - bb_lower) / (bb_upper - bb_lower)
-                normalized['bollinger'] = (bb_position - 0.5) * 2  # Convert to [-1, 1]
-            
-            # Volume (relative to average)
-            if 'volume' in features and 'volume_avg' in features:
-                volume = float(features['volume'])
-                volume_avg = float(features['volume_avg'])
-                if volume_avg > 0:
-                    normalized['volume'] = min(2, volume / volume_avg) - 1  # Convert to [-1, 1]
-            
-            # Support/Resistance levels
-            if 'support' in features and 'resistance' in features and 'close' in features:
-                support = float(features['support'])
-                resistance = float(features['resistance'])
-                close = float(features['close'])
-                if resistance > support:
-                    sr_position = (close - support) / (resistance - support)
-                    normalized['support_resistance'] = (sr_position - 0.5) * 2
-            
-            # Trend strength
-            if 'trend_strength' in features:
-                trend = float(features['trend_strength'])
-                normalized['trend'] = max(-1, min(1, trend))
-            
-            # Moving averages
-            if 'ma_fast' in features and 'ma_slow' in features:
-                ma_fast = float(features['ma_fast'])
-                ma_slow = float(features['ma_slow'])
-                if ma_slow > 0:
-                    normalized['ma_cross'] = (ma_fast - ma_slow) / ma_slow
+                'model_version': schema.model_version
+            }, normalized
             
         except Exception as e:
-            logger.error(f"Error normalizing features: {e}")
-        
-        return normalized
-    
-    def _calculate_signal_score(self, features: Dict[str, float]) -> float:
-        """Calculate weighted signal score"""
-        score = 0.0
-        total_weight = 0.0
-        
-        for feature, value in features.items():
-            if feature in self.feature_weights:
-                weight = self.feature_weights[feature]
-                score += value * weight
-                total_weight += weight
-        
-        # Normalize by total weight
-        if total_weight > 0:
-            score = score / total_weight
-        
-        return score
+            return _failed_prediction(e)
     
-    def _analyze_market_context(self, symbol: str, features: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze market context for better predictions"""
+    def _analyze_market_context(self, symbol: str, raw: List[float], schema: FeatureSchema) -> Dict[str, Any]:
+        """Analyze market context for better predictions (missing inputs leave the defaults)"""
         context = {
             'volatility': 'medium',
             'trend': 'neutral',
@@ -161,40 +761,29 @@ class AIPredictor:
             'risk_level': 'medium'
         }
         
-        try:
-            # Volatility analysis
-            if 'atr' in features:
-                atr = float(features['atr'])
-                if atr > 0.002:
-                    context['volatility'] = 'high'
-                elif atr < 0.001:
-                    context['volatility'] = 'low'
-            
-            # Trend analysis
-            if 'trend_strength' in features:
-                trend = float(features['trend_strength'])
-                if trend > 0.5:
-                    context['trend'] = 'bullish'
-                elif trend < -0.5:
-                    context['trend'] = 'bearish'
-            
-            # Market phase
-            if 'rsi' in features:
-                rsi = float(features['rsi'])
-                if rsi > 70:
-                    context['market_phase'] = 'overbought'
-                elif rsi < 30:
-                    context['market_phase'] = 'oversold'
-            
-            # Risk assessment
-            volatility = context['volatility']
-            if volatility == 'high':
-                context['risk_level'] = 'high'
-            elif volatility == 'low':
-                context['risk_level'] = 'low'
-            
-        except Exception as e:
-            logger.error(f"Error analyzing market context: {e}")
+        # Volatility analysis
+        atr = raw[schema.atr]
+        if atr > 0.002:
+            context['volatility'] = 'high'
+        elif atr < 0.001:
+            context['volatility'] = 'low'
+        
+        # Trend analysis
+        trend = raw[schema.trend_strength]
+        if trend > 0.5:
+            context['trend'] = 'bullish'
+        elif trend < -0.5:
+            context['trend'] = 'bearish'
+        
+        # Market phase
+        rsi = raw[schema.rsi]
+        if rsi > 70:
+            context['market_phase'] = 'overbought'
+        elif rsi < 30:
+            context['market_phase'] = 'oversold'
+        
+        # Risk assessment
+        context['risk_level'] = context['volatility']
         
         return context
     
@@ -216,39 +805,158 @@ class AIPredictor:
         
         return max(0.0, min(1.0, adjusted_confidence))
     
+    def feature_vector(self, features: Dict[str, Any]) -> List[float]:
+        """Normalized feature vector for raw features, as retained with predictions"""
+        schema = self.schema
+        return schema.normalize(schema.vector(features))
+    
+    def build_feature_matrix(self, feature_rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Pack raw feature dicts into a matrix in schema input order, NaN where missing"""
+        return self.schema.matrix(feature_rows)
+    
+    def score_matrix(self, feature_matrix: np.ndarray, schema: Optional[FeatureSchema] = None) -> Dict[str, np.ndarray]:
+        """Vectorized scoring of a raw input matrix (schema input order, NaN for missing)
+        
+        Normalization, the weighted score (one matrix-vector product),
+        thresholds, market context and confidence adjustments are all array
+        operations. Returns per-row arrays: signal, confidence, score,
+        volatility, trend, market_phase and the normalized feature matrix.
+        """
+        schema = schema or self.schema
+        raw = np.asarray(feature_matrix, dtype=np.float64)
+        if raw.ndim != 2 or raw.shape[1] != len(schema.inputs):
+            raise ValueError(f"feature_matrix must have shape (N, {len(schema.inputs)})")
+        
+        normalized = schema.normalize_matrix(raw)
+        
+        # Weighted average over the features each row actually has
+        weights = schema.weight_vector
+        present = ~np.isnan(normalized)
+        total_weight = present @ schema.weight_magnitudes
+        scores = np.where(total_weight > 0,
+                          np.nan_to_num(normalized) @ weights / np.where(total_weight > 0, total_weight, 1),
+                          0.0)
+        
+        signals = np.where(scores > 0.7, 1, np.where(scores < -0.7, -1, 0))
+        confidence = np.where(signals != 0, np.minimum(np.abs(scores), 0.95), 0.5)
+        
+        # Market context as array masks (missing inputs compare False)
+        atr = raw[:, schema.atr]
+        trend_strength = raw[:, schema.trend_strength]
+        rsi = raw[:, schema.rsi]
+        high_volatility = atr > 0.002
+        low_volatility = atr < 0.001
+        bullish = trend_strength > 0.5
+        bearish = trend_strength < -0.5
+        overbought = rsi > 70
+        oversold = rsi < 30
+        consolidation = ~(overbought | oversold)
+        
+        confidence = confidence * np.where(high_volatility, 0.8, 1.0)
+        confidence = confidence * np.where(bullish | bearish, 1.1, 1.0)
+        confidence = confidence * np.where(consolidation, 0.9, 1.0)
+        confidence = np.clip(confidence, 0.0, 1.0)
+        
+        return {
+            'signal': signals,
+            'confidence': confidence,
+            'score': scores,
+            'volatility': np.where(high_volatility, 'high', np.where(low_volatility, 'low', 'medium')),
+            'trend': np.where(bullish, 'bullish', np.where(bearish, 'bearish', 'neutral')),
+            'market_phase': np.where(overbought, 'overbought', np.where(oversold, 'oversold', 'consolidation')),
+            'normalized': normalized
+        }
+    
+    def predict_batch(self, symbols: List[str], feature_matrix: np.ndarray) -> List[Dict[str, Any]]:
+        """Score many symbols at once; dicts are only built for the returned results"""
+        if len(feature_matrix) != len(symbols):
+            raise ValueError("symbols and feature_matrix rows must match")
+        schema = self.schema
+        scored = self.score_matrix(feature_matrix, schema)
+        signals = scored['signal']
+        confidence = scored['confidence']
+        scores = scored['score']
+        volatility = scored['volatility']
+        trend = scored['trend']
+        phase = scored['market_phase']
+        normalized = scored['normalized']
+        
+        timestamp = datetime.now().isoformat()
+        results = []
+        for row, symbol in enumerate(symbols):
+            results.append({
+                'symbol': symbol,
+                'signal': int(signals[row]),
+                'confidence': float(confidence[row]),
+                'signal_strength': float(abs(scores[row])),
+                'market_context': {
+                    'volatility': str(volatility[row]),
+                    'trend': str(trend[row]),
+                    'market_phase': str(phase[row]),
+                    'risk_level': str(volatility[row])
+                },
+                'features_used': schema.used(normalized[row]),
+                'feature_vector': normalized[row].tolist(),
+                'timestamp': timestamp,
+                'model_version': schema.model_version
+            })
+        return results
+    
     def update_model(self, feedback_data: List[Dict[str, Any]]) -> bool:
         """Update model based on feedback"""
         try:
-            # Simple model update based on feedback
-            correct_predictions = 0
-            total_predictions = len(feedback_data)
-            
-            for feedback in feedback_data:
-                predicted_signal = feedback.get('predicted_signal', 0)
-                actual_result = feedback.get('actual_result', 0)
-                
-                # Check if prediction was correct
-                if (predicted_signal > 0 and actual_result > 0) or \
-                   (predicted_signal < 0 and actual_result < 0) or \
-                   (predicted_signal == 0 and abs(actual_result) < 0.1):
-                    correct_predictions += 1
-            
-            # Calculate accuracy
-            accuracy = correct_predictions / total_predictions if total_predictions > 0 else 0
-            
-            # Adjust confidence threshold based on accuracy
-            if accuracy > 0.8:
-                self.confidence_threshold = max(0.6, self.confidence_threshold - 0.05)
-            elif accuracy < 0.6:
-                self.confidence_threshold = min(0.8, self.confidence_threshold + 0.05)
-            
-            logger.info(f"Model updated. Accuracy: {accuracy:.2f}, New threshold: {self.confidence_threshold:.2f}")
+            self.apply_feedback(feedback_data)
             return True
-            
         except Exception as e:
             logger.error(f"Error updating model: {e}")
             return False
     
+    def apply_feedback(self, feedback_data: List[Dict[str, Any]]) -> int:
+        """Learn from a list of feedback events; returns how many were applied
+        
+        A malformed event (non-numeric outcome, wrong-sized feature vector)
+        is logged and skipped on its own, so it cannot discard the rest of
+        a batch.
+        """
+        correct_predictions = 0
+        applied = 0
+        
+        for feedback in feedback_data:
+            try:
+                predicted_signal = _feedback_number(feedback, 'predicted_signal')
+                actual_result = _feedback_number(feedback, 'actual_result')
+                
+                # Learn the realized direction from the features behind the prediction
+                if feedback.get('features') and abs(actual_result) >= 0.1:
+                    self.learner.learn(feedback['features'], 1 if actual_result > 0 else -1)
+            except (AttributeError, TypeError, ValueError) as e:
+                logger.error(f"Skipping invalid feedback: {e}")
+                continue
+            applied += 1
+            
+            # Check if prediction was correct
+            if (predicted_signal > 0 and actual_result > 0) or \
+               (predicted_signal < 0 and actual_result < 0) or \
+               (predicted_signal == 0 and abs(actual_result) < 0.1):
+                correct_predictions += 1
+        
+        self.learner.apply()
+        self.learner.maybe_persist()
+        if not applied:
+            return 0
+        
+        # Calculate accuracy
+        accuracy = correct_predictions / applied
+        
+        # Adjust confidence threshold based on accuracy
+        if accuracy > 0.8:
+            self.confidence_threshold = max(0.6, self.confidence_threshold - 0.05)
+        elif accuracy < 0.6:
+            self.confidence_threshold = min(0.8, self.confidence_threshold + 0.05)
+        
+        logger.info(f"Model updated. Accuracy: {accuracy:.2f}, New threshold: {self.confidence_threshold:.2f}")
+        return applied
+    
     def get_model_stats(self) -> Dict[str, Any]:
         """Get model statistics"""
         return {
@@ -256,6 +964,12 @@ class AIPredictor:
             'confidence_threshold': self.confidence_threshold,
             'feature_weights': self.feature_weights,
             'supported_features': list(self.feature_weights.keys()),
+            'feature_schema': self.schema.describe(),
+            'weights_revision': self.weights_revision,
+            'learner': self.learner.get_stats(),
+            'registry': self.registry.get_stats(),
+            'trainer': self.trainer.get_stats(),
+            'prediction_memo': self.memo.get_stats(),
             'last_updated': datetime.now().isoformat()
         }
 
@@ -264,137 +978,299 @@ class SmartMoneyAnalyzer:
     
     def __init__(self):
         self.lookback_period = 50
+        self._states: Dict[Tuple[str, str], SmartMoneyState] = {}
+        self._state_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._states_lock = threading.Lock()
         
-    def analyze_order_blocks(self, price_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _columns(self, price_data: CandleData) -> Dict[str, np.ndarray]:
+        """High/low/close arrays (plus timestamps when columnar) for either input form"""
+        if isinstance(price_data, dict):
+            return price_data
+        count = len(price_data)
+        return {name: np.fromiter((candle[name] for candle in price_data), dtype=np.float64, count=count)
+                for name in ('high', 'low', 'close')}
+    
+    def _timestamp_of(self, price_data: CandleData,
+                      timestamp_format: Optional[Callable[[int], Any]]) -> Callable[[int], Any]:
+        """JSON timestamp for a candle index"""
+        if isinstance(price_data, dict):
+            timestamps = price_data['timestamp']
+            if timestamp_format is None:
+                return lambda index: int(timestamps[index])
+            return lambda index: timestamp_format(int(timestamps[index]))
+        return lambda index: price_data[index]['timestamp']
+    
+    def scan_order_blocks(self, price_data: CandleData) -> np.ndarray:
+        """Order blocks as a ZONE_DTYPE array"""
+        columns = self._columns(price_data)
+        if len(columns['close']) < self.lookback_period:
+            return np.empty(0, dtype=ZONE_DTYPE)
+        return order_blocks(columns['high'], columns['low'], columns['close'],
+                            columns.get('timestamp'), start=self.lookback_period)
+    
+    def scan_fair_value_gaps(self, price_data: CandleData) -> np.ndarray:
+        """Fair value gaps as a ZONE_DTYPE array"""
+        columns = self._columns(price_data)
+        return fair_value_gaps(columns['high'], columns['low'], columns.get('timestamp'))
+    
+    def analyze_order_blocks(self, price_data: CandleData,
+                             timestamp_format: Optional[Callable[[int], Any]] = None) -> List[Dict[str, Any]]:
         """Identify order blocks in price data"""
-        order_blocks = []
+        blocks = []
         
         try:
-            if len(price_data) < self.lookback_period:
-                return order_blocks
-            
-            # Simple order block detection
-            for i in range(self.lookback_period, len(price_data)):
-                current = price_data[i]
-                prev = price_data[i-1]
-                
-                # Look for strong moves that create order blocks
-                if current['close'] > prev['high'] * 1.001:  # Strong bullish move
-                    order_blocks.append({
-                        'type': 'bullish',
-                        'price': prev['high'],
-                        'timestamp': current['timestamp'],
-                        'strength': 'medium'
-                    })
-                elif current['close'] < prev['low'] * 0.999:  # Strong bearish move
-                    order_blocks.append({
-                        'type': 'bearish',
-                        'price': prev['low'],
-                        'timestamp': current['timestamp'],
-                        'strength': 'medium'
-                    })
+            zones = self.scan_order_blocks(price_data)
+            timestamp_of = self._timestamp_of(price_data, timestamp_format)
+            for kind, upper, lower, index in zip(zones['kind'].tolist(), zones['upper'].tolist(),
+                                                 zones['lower'].tolist(), zones['index'].tolist()):
+                blocks.append({
+                    'type': ZONE_KINDS[kind],
+                    'price': upper if kind == BULLISH else lower,
+                    'timestamp': timestamp_of(index),
+                    'strength': 'medium'
+                })
             
         except Exception as e:
             logger.error(f"Error analyzing order blocks: {e}")
         
-        return order_blocks
+        return blocks
     
-    def detect_fair_value_gaps(self, price_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def detect_fair_value_gaps(self, price_data: CandleData,
+                               timestamp_format: Optional[Callable[[int], Any]] = None) -> List[Dict[str, Any]]:
         """Detect Fair Value Gaps (FVG)"""
         fvgs = []
         
         try:
-            if len(price_data) < 3:
-                return fvgs
-            
-            for i in range(2, len(price_data)):
-                prev_prev = price_data[i-2]
-                prev = price_data[i-1]
-                current = price_data[i]
-                
-                # Bullish FVG
-                if prev_prev['high'] < current['low']:
-                    fvgs.append({
-                        'type': 'bullish',
-                        'upper': current['low'],
-                        'lower': prev_prev['high'],
-                        'timestamp': current['timestamp']
-                    })
-                
-                # Bearish FVG
-                if prev_prev['low'] > current['high']:
-                    fvgs.append({
-                        'type': 'bearish',
-                        'upper': prev_prev['low'],
-                        'lower': current['high'],
-                        'timestamp': current['timestamp']
-                    })
+            zones = self.scan_fair_value_gaps(price_data)
+            timestamp_of = self._timestamp_of(price_data, timestamp_format)
+            for kind, upper, lower, index in zip(zones['kind'].tolist(), zones['upper'].tolist(),
+                                                 zones['lower'].tolist(), zones['index'].tolist()):
+                fvgs.append({
+                    'type': ZONE_KINDS[kind],
+                    'upper': upper,
+                    'lower': lower,
+                    'timestamp': timestamp_of(index)
+                })
             
         except Exception as e:
             logger.error(f"Error detecting FVGs: {e}")
         
         return fvgs
     
-    def analyze_liquidity_sweeps(self, price_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Analyze liquidity sweeps"""
+    def analyze_liquidity_sweeps(self, price_data: CandleData,
+                                 timestamp_format: Optional[Callable[[int], Any]] = None) -> List[Dict[str, Any]]:
+        """Analyze liquidity sweeps of swing highs and swing lows"""
         sweeps = []
         
         try:
-            if len(price_data) < 20:
+            columns = self._columns(price_data)
+            highs = columns['high']
+            lows = columns['low']
+            if len(highs) < 20:
                 return sweeps
             
-            # Find recent highs and lows
-            recent_highs = []
-            recent_lows = []
-            
-            for i in range(10, len(price_data)-10):
-                candle = price_data[i]
-                is_high = all(candle['high'] >= price_data[j]['high'] for j in range(i-5, i+6))
-                is_low = all(candle['low'] <= price_data[j]['low'] for j in range(i-5, i+6))
-                
-                if is_high:
-                    recent_highs.append({'price': candle['high'], 'index': i})
-                if is_low:
-                    recent_lows.append({'price': candle['low'], 'index': i})
+            high_levels, high_swept, low_levels, low_swept = liquidity_sweeps(highs, lows)
+            timestamp_of = self._timestamp_of(price_data, timestamp_format)
             
-            # Check for liquidity sweeps
-            for i in range(len(recent_highs)):
-                high_level = recent_highs[i]
-                for j in range(high_level['index'] + 1, len(price_data)):
-                    if price_data[j]['high'] > high_level['price']:
-                        sweeps.append({
-                            'type': 'high_sweep',
-                            'price': high_level['price'],
-                            'swept_at': price_data[j]['timestamp'],
-                            'strength': 'medium'
-                        })
-                        break
+            for sweep_type, prices, levels, swept in (('high_sweep', highs, high_levels, high_swept),
+                                                      ('low_sweep', lows, low_levels, low_swept)):
+                for level, index in zip(levels.tolist(), swept.tolist()):
+                    sweeps.append({
+                        'type': sweep_type,
+                        'price': float(prices[level]),
+                        'swept_at': timestamp_of(index),
+                        'strength': 'medium'
+                    })
             
         except Exception as e:
             logger.error(f"Error analyzing liquidity sweeps: {e}")
         
         return sweeps
+    
+    def _series_state(self, series: Any) -> Tuple[SmartMoneyState, threading.Lock]:
+        """State and lock for a series, created on first use"""
+        key = (series.symbol, series.timeframe)
+        with self._states_lock:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = SmartMoneyState(lookback=self.lookback_period)
+                self._state_locks[key] = threading.Lock()
+            return state, self._state_locks[key]
+    
+    def _sync_state(self, state: SmartMoneyState, series: Any) -> None:
+        """Feed the state the candles closed since its last update (caller holds its lock)
+        
+        The latest candle may still be forming, so it is left out until a newer
+        one arrives. A change to older history rebuilds the state from scratch.
+        """
+        if state.source_version != series.history_version:
+            state.reset()
+            state.source_version = series.history_version
+        columns = series.view()
+        closed = len(columns['timestamp']) - 1
+        state.update(columns['timestamp'][:closed], columns['high'][:closed],
+                     columns['low'][:closed], columns['close'][:closed])
+    
+    def analyze_series(self, series: Any, timestamp_format: Optional[Callable[[int], Any]] = None,
+                       price: Optional[float] = None) -> Dict[str, Any]:
+        """Active zones for a CandleSeries, consuming only candles closed since the last call
+        
+        ``price_zones`` locates ``price`` (default: the latest close) among them.
+        """
+        state, lock = self._series_state(series)
+        if price is None:
+            price = float(series.column('close', 1)[-1])
+        timestamp_format = timestamp_format or int
+        with lock:
+            self._sync_state(state, series)
+            result = self._state_dicts(state, timestamp_format)
+            result['price_zones'] = self._price_zones(state.zone_index(), price, timestamp_format)
+            return result
+    
+    def locate_price(self, series: Any, price: float,
+                     timestamp_format: Optional[Callable[[int], Any]] = None) -> Dict[str, Any]:
+        """Active zones containing ``price`` and the nearest ones above and below it"""
+        state, lock = self._series_state(series)
+        with lock:
+            self._sync_state(state, series)
+            return self._price_zones(state.zone_index(), price, timestamp_format or int)
+    
+    def _price_zones(self, index: ZoneIndex, price: float,
+                     timestamp_format: Callable[[int], Any]) -> Dict[str, Any]:
+        """JSON form of the zone lookups for one price"""
+        def zone_dict(zone) -> Optional[Dict[str, Any]]:
+            if zone is None:
+                return None
+            return {
+                'zone': 'order_block' if zone['source'] == ORDER_BLOCK else 'fair_value_gap',
+                'type': ZONE_KINDS[int(zone['kind'])],
+                'upper': float(zone['upper']),
+                'lower': float(zone['lower']),
+                'timestamp': timestamp_format(int(zone['timestamp']))
+            }
+        
+        return {
+            'price': price,
+            'containing': [zone_dict(zone) for zone in index.containing(price)],
+            'nearest_above': zone_dict(index.nearest_above(price)),
+            'nearest_below': zone_dict(index.nearest_below(price)),
+            'active_zones': len(index)
+        }
+    
+    def _state_dicts(self, state: SmartMoneyState, timestamp_format: Callable[[int], Any]) -> Dict[str, Any]:
+        """JSON form of a SmartMoneyState (caller holds its lock)"""
+        order_blocks = [{
+            'type': ZONE_KINDS[kind],
+            'price': upper if kind == BULLISH else lower,
+            'upper': upper,
+            'lower': lower,
+            'timestamp': timestamp_format(timestamp),
+            'strength': 'medium'
+        } for kind, upper, lower, _, timestamp in state.order_blocks.tolist()]
+        
+        fair_value_gaps = [{
+            'type': ZONE_KINDS[kind],
+            'upper': upper,
+            'lower': lower,
+            'timestamp': timestamp_format(timestamp)
+        } for kind, upper, lower, _, timestamp in state.fair_value_gaps.tolist()]
+        
+        liquidity_sweeps = [{
+            'type': 'high_sweep' if kind == BULLISH else 'low_sweep',
+            'price': price,
+            'level_timestamp': timestamp_format(timestamp),
+            'swept_at': timestamp_format(swept_at),
+            'strength': 'medium'
+        } for kind, price, timestamp, swept_at in state.sweeps.tolist()]
+        
+        liquidity_levels = [{
+            'type': 'buy_side' if kind == BULLISH else 'sell_side',
+            'price': price,
+            'timestamp': timestamp_format(timestamp)
+        } for kind, price, _, timestamp in state.liquidity.tolist()]
+        
+        mitigated_zones = [{
+            'zone': 'order_block' if source == ORDER_BLOCK else 'fair_value_gap',
+            'type': ZONE_KINDS[kind],
+            'upper': upper,
+            'lower': lower,
+            'timestamp': timestamp_format(timestamp),
+            'mitigated_at': timestamp_format(mitigated_at)
+        } for kind, upper, lower, _, timestamp, source, mitigated_at in state.mitigations.tolist()]
+        
+        return {
+            'order_blocks': order_blocks,
+            'fair_value_gaps': fair_value_gaps,
+            'liquidity_sweeps': liquidity_sweeps,
+            'liquidity_levels': liquidity_levels,
+            'mitigated_zones': mitigated_zones,
+            'candles_processed': state.processed
+        }
 
 # Global AI instances
-ai_predictor = AIPredictor()
+model_registry = ModelRegistry(DEFAULT_MODEL_NAME)
+ai_predictor = AIPredictor(model_registry)
 smart_money_analyzer = SmartMoneyAnalyzer()
+model_registry.start()
+# Registered last so it runs first at exit: drain feedback, then persist
+atexit.register(ai_predictor.learner.flush)
+atexit.register(ai_predictor.trainer.stop)
 
 def get_ai_prediction(symbol: str, features: Dict[str, Any]) -> Dict[str, Any]:
-    """Get AI prediction for symbol"""
-    return ai_predictor.predict_signal(symbol, features)
+    """Get AI prediction for symbol (memoized when PREDICTION_MEMO_SIZE is set)"""
+    return ai_predictor.memo.predict(symbol, features)[0]
 
-def analyze_smart_money(price_data: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Analyze smart money concepts"""
+def get_ai_prediction_with_features(symbol: str, features: Dict[str, Any]) -> Tuple[Dict[str, Any], List[float]]:
+    """Get AI prediction plus the feature vector to retain for feedback"""
+    return ai_predictor.memo.predict(symbol, features)
+
+def analyze_smart_money(price_data: CandleData,
+                        timestamp_format: Optional[Callable[[int], Any]] = None) -> Dict[str, Any]:
+    """Analyze smart money concepts
+    
+    ``price_data`` is a list of candle dicts or a mapping of column arrays
+    (e.g. CandleSeries.view()); for columns, ``timestamp_format`` renders the
+    epoch timestamps in the result.
+    """
     return {
-        'order_blocks': smart_money_analyzer.analyze_order_blocks(price_data),
-        'fair_value_gaps': smart_money_analyzer.detect_fair_value_gaps(price_data),
-        'liquidity_sweeps': smart_money_analyzer.analyze_liquidity_sweeps(price_data)
+        'order_blocks': smart_money_analyzer.analyze_order_blocks(price_data, timestamp_format),
+        'fair_value_gaps': smart_money_analyzer.detect_fair_value_gaps(price_data, timestamp_format),
+        'liquidity_sweeps': smart_money_analyzer.analyze_liquidity_sweeps(price_data, timestamp_format)
     }
 
+def analyze_smart_money_series(series: Any, timestamp_format: Optional[Callable[[int], Any]] = None,
+                               price: Optional[float] = None) -> Dict[str, Any]:
+    """Active smart money zones for a CandleSeries, updated incrementally"""
+    return smart_money_analyzer.analyze_series(series, timestamp_format, price)
+
+def get_ai_predictions_batch(symbols: List[str], feature_rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Get AI predictions for many symbols in one vectorized pass"""
+    return ai_predictor.predict_batch(symbols, ai_predictor.build_feature_matrix(feature_rows))
+
 def update_ai_model(feedback_data: List[Dict[str, Any]]) -> bool:
     """Update AI model with feedback"""
     return ai_predictor.update_model(feedback_data)
 
+def queue_ai_feedback(feedback_data: List[Dict[str, Any]]) -> bool:
+    """Queue feedback for the background trainer; False if the queue is full"""
+    return ai_predictor.trainer.enqueue_many(feedback_data)
+
+def get_ai_feature_vector(features: Dict[str, Any]) -> List[float]:
+    """Normalized feature vector for raw features, for feedback on past predictions"""
+    return ai_predictor.feature_vector(features)
+
+def get_ai_trainer_stats() -> Dict[str, Any]:
+    """Feedback queue and batch metrics"""
+    return ai_predictor.trainer.get_stats()
+
+def get_ai_model_version() -> str:
+    """Version of the model currently serving predictions, including learned weight updates"""
+    return f"{ai_predictor.model_version}+{ai_predictor.weights_revision}"
+
+def reload_ai_model() -> bool:
+    """Swap to the database's active model if it changed"""
+    return model_registry.refresh()
+
 def get_ai_model_info() -> Dict[str, Any]:
     """Get AI model information"""
     return ai_predictor.get_model_stats()
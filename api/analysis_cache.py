@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Analysis result cache for SVN Trading Bot
+Versioned per-series cache with single-flight computation of misses
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    """One in-progress computation that concurrent callers wait on"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class AnalysisCache:
+    """Results keyed by (series key, version key), dropped when the series changes
+
+    ``get_or_compute`` returns a cached result, joins a computation already
+    running for the same key, or runs ``compute`` itself. ``invalidate``
+    drops everything cached for a series; a computation that was running
+    while its series changed is still handed to its waiters but not cached.
+    At most ``max_series`` series are kept, least recently used first out,
+    each with at most ``max_per_series`` results, oldest first out.
+    Cached results are shared between callers and must be treated as
+    read-only.
+    """
+
+    def __init__(self, max_series: int = 1024, max_per_series: int = 16):
+        self.max_series = max_series
+        self.max_per_series = max_per_series
+        self._entries: 'OrderedDict[Hashable, Dict[Hashable, Any]]' = OrderedDict()
+        self._flights: Dict[Tuple[Hashable, Hashable], _Flight] = {}
+        self._generations: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, series_key: Hashable, version_key: Hashable,
+                       compute: Callable[[], Any]) -> Any:
+        """Cached result for the key, computing it at most once across concurrent callers"""
+        key = (series_key, version_key)
+        leader = False
+        with self._lock:
+            results = self._entries.get(series_key)
+            if results is not None and version_key in results:
+                self._entries.move_to_end(series_key)
+                self.hits += 1
+                return results[version_key]
+
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+            else:
+                flight = self._flights[key] = _Flight()
+                generation = self._generations.get(series_key, 0)
+                self.misses += 1
+                leader = True
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                if flight.error is None and self._generations.get(series_key, 0) == generation:
+                    results = self._entries.setdefault(series_key, {})
+                    results[version_key] = flight.result
+                    if len(results) > self.max_per_series:
+                        del results[next(iter(results))]
+                    self._entries.move_to_end(series_key)
+                    while len(self._entries) > self.max_series:
+                        self._entries.popitem(last=False)
+            flight.done.set()
+        return flight.result
+
+    def invalidate(self, series_key: Hashable) -> None:
+        """Drop every cached result for a series"""
+        with self._lock:
+            self._generations[series_key] = self._generations.get(series_key, 0) + 1
+            if self._entries.pop(series_key, None) is not None:
+                self.invalidations += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'series': len(self._entries),
+                'in_flight': len(self._flights),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'invalidations': self.invalidations,
+                'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0
+            }
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Backtesting for SVN Trading Bot
+Replays candle arrays through the indicator library and AIPredictor in
+vectorized batches, simulates ATR stop/target trades and reports metrics
+
+Usage: python -m api.backtest candles.csv [--confirm-sweeps N]
+"""
+
+import csv
+import math
+import sys
+import time
+import numpy as np
+from typing import Any, Dict, List, Optional
+import logging
+
+from .ai_service import AIPredictor, ai_predictor
+from .indicators import calculate_indicator_series
+from .market_store import parse_timestamp
+from .smart_money import liquidity_sweeps
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+# Why a trade was closed, stored in the ``exit_reason`` field
+EXIT_STOP = 0
+EXIT_TARGET = 1
+EXIT_TIME = 2
+EXIT_END = 3
+EXIT_REASONS = ('stop', 'target', 'time', 'end_of_data')
+
+# One simulated trade; prices in quote currency, return as a fraction of entry
+TRADE_DTYPE = np.dtype([
+    ('direction', 'i1'),
+    ('signal_index', 'i8'),
+    ('entry_index', 'i8'),
+    ('exit_index', 'i8'),
+    ('entry_time', 'i8'),
+    ('exit_time', 'i8'),
+    ('entry_price', 'f8'),
+    ('exit_price', 'f8'),
+    ('confidence', 'f8'),
+    ('return', 'f8'),
+    ('bars', 'i8'),
+    ('exit_reason', 'i1'),
+])
+
+# Candidate trades evaluated per vectorized step
+SIMULATION_CHUNK = 4096
+
+# CSV header aliases (MT5 exports use <DATE>, <TIME>, <TICKVOL>, ...)
+CSV_ALIASES = {'time': 'timestamp', 'datetime': 'timestamp', 'tickvol': 'volume', 'vol': 'real_volume'}
+
+def load_candles_csv(path: str) -> Dict[str, np.ndarray]:
+    """Read OHLCV candles from a CSV file into column arrays
+
+    Accepts a ``timestamp`` column (epoch, MT5 or ISO format) or MT5-style
+    separate DATE and TIME columns; comma, semicolon and tab delimiters.
+    Rows are sorted by timestamp.
+    """
+    with open(path, newline='') as handle:
+        sample = handle.read(4096)
+        handle.seek(0)
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        reader = csv.reader(handle, dialect)
+        header = [name.strip().strip('<>').lower() for name in next(reader)]
+        if 'date' in header and 'time' in header:
+            header[header.index('time')] = 'clock'
+        header = [CSV_ALIASES.get(name, name) for name in header]
+        position = {name: index for index, name in enumerate(header)}
+        missing = [name for name in ('open', 'high', 'low', 'close') if name not in position]
+        if missing or ('timestamp' not in position and 'date' not in position):
+            raise ValueError(f"CSV needs timestamp (or date/time), open, high, low and close columns; missing {missing}")
+
+        timestamps, rows = [], []
+        for line in reader:
+            if not line:
+                continue
+            if 'timestamp' in position:
+                stamp = line[position['timestamp']]
+            else:
+                stamp = line[position['date']]
+                if 'clock' in position:
+                    stamp = f"{stamp} {line[position['clock']]}"
+            timestamps.append(parse_timestamp(stamp))
+            rows.append(line)
+
+    columns = {'timestamp': np.array(timestamps, dtype=np.int64)}
+    for name in ('open', 'high', 'low', 'close', 'volume', 'spread'):
+        if name in position:
+            columns[name] = np.array([float(row[position[name]]) for row in rows])
+        else:
+            columns[name] = np.zeros(len(rows))
+    order = np.argsort(columns['timestamp'], kind='stable')
+    return {name: values[order] for name, values in columns.items()}
+
+def feature_matrix(candles: Dict[str, np.ndarray], indicators: Dict[str, np.ndarray],
+                   predictor: AIPredictor) -> np.ndarray:
+    """Raw predictor inputs for every candle, in the predictor's schema order"""
+    count = len(candles['close'])
+    matrix = np.full((count, len(predictor.schema.inputs)), np.nan)
+    for column, name in enumerate(predictor.schema.inputs):
+        source = candles.get(name) if name in ('close', 'volume') else indicators.get(name)
+        if source is not None:
+            matrix[:, column] = source
+    return matrix
+
+def sweep_confirmation(highs: np.ndarray, lows: np.ndarray, window: int) -> np.ndarray:
+    """+1 where a swing low was swept within the last ``window`` candles, -1 for a swing high, 0 otherwise
+
+    A sweep is only known at the candle that takes the level out, so this
+    never looks ahead. If both happened, the more recent one wins.
+    """
+    count = len(highs)
+    _, high_swept, _, low_swept = liquidity_sweeps(highs, lows)
+    last_low = np.full(count, -1, dtype=np.int64)
+    last_high = np.full(count, -1, dtype=np.int64)
+    last_low[low_swept] = low_swept
+    last_high[high_swept] = high_swept
+    last_low = np.maximum.accumulate(last_low)
+    last_high = np.maximum.accumulate(last_high)
+    now = np.arange(count)
+    low_recent = (last_low >= 0) & (now - last_low < window)
+    high_recent = (last_high >= 0) & (now - last_high < window)
+    return np.where(low_recent & (~high_recent | (last_low > last_high)), 1,
+                    np.where(high_recent, -1, 0))
+
+def simulate_trades(candles: Dict[str, np.ndarray], signals: np.ndarray, confidence: np.ndarray,
+                    atr: np.ndarray, stop_atr: float = 1.5, target_atr: float = 3.0,
+                    max_bars: int = 50, cost: float = 0.0) -> np.ndarray:
+    """Turn per-candle signals into non-overlapping trades
+
+    A signal on candle i enters at the open of candle i + 1 with a stop
+    ``stop_atr`` and a target ``target_atr`` ATRs away. The trade closes at
+    the first candle touching either (the stop if both, as the intrabar
+    order is unknown), else at the close after ``max_bars`` candles or at
+    the end of the data. Signals arriving while a trade is open are
+    skipped. Exit checks for all candidates are vectorized; only the walk
+    from one taken trade to the next is a Python loop. ``cost`` is a
+    round-trip cost as a fraction of the entry price.
+    """
+    opens, highs, lows, closes = candles['open'], candles['high'], candles['low'], candles['close']
+    timestamps = candles['timestamp']
+    count = len(closes)
+    candidates = np.flatnonzero((signals != 0) & np.isfinite(atr) & (atr > 0) & (np.arange(count) < count - 1))
+    if len(candidates) == 0:
+        return np.empty(0, dtype=TRADE_DTYPE)
+
+    exits = np.empty(len(candidates), dtype=np.int64)
+    exit_prices = np.empty(len(candidates))
+    reasons = np.empty(len(candidates), dtype=np.int8)
+    offsets = np.arange(max_bars)
+    for start in range(0, len(candidates), SIMULATION_CHUNK):
+        chunk = candidates[start:start + SIMULATION_CHUNK]
+        direction = signals[chunk][:, None]
+        entry = opens[chunk + 1][:, None]
+        stop = entry - direction * stop_atr * atr[chunk][:, None]
+        target = entry + direction * target_atr * atr[chunk][:, None]
+
+        bars = chunk[:, None] + 1 + offsets
+        inside = bars < count
+        bars = np.minimum(bars, count - 1)
+        long = direction > 0
+        stopped = inside & np.where(long, lows[bars] <= stop, highs[bars] >= stop)
+        reached = inside & np.where(long, highs[bars] >= target, lows[bars] <= target)
+        touched = stopped | reached
+        first = np.where(touched.any(axis=1), touched.argmax(axis=1), -1)
+
+        rows = np.arange(len(chunk))
+        last_bar = np.minimum(chunk + max_bars, count - 1)
+        hit = first >= 0
+        stop_first = hit & stopped[rows, np.maximum(first, 0)]
+        exits[start:start + len(chunk)] = np.where(hit, bars[rows, np.maximum(first, 0)], last_bar)
+        exit_prices[start:start + len(chunk)] = np.where(
+            stop_first, stop[:, 0], np.where(hit, target[:, 0], closes[last_bar]))
+        reasons[start:start + len(chunk)] = np.where(
+            stop_first, EXIT_STOP, np.where(hit, EXIT_TARGET,
+                                            np.where(chunk + max_bars < count, EXIT_TIME, EXIT_END)))
+
+    # Walk the candidates, taking each one that starts after the last exit
+    taken = []
+    position = 0
+    while position < len(candidates):
+        taken.append(position)
+        position = int(np.searchsorted(candidates, exits[position], side='left'))
+        if position <= taken[-1]:
+            position = taken[-1] + 1
+    taken = np.array(taken, dtype=np.int64)
+
+    chosen = candidates[taken]
+    trades = np.empty(len(taken), dtype=TRADE_DTYPE)
+    trades['direction'] = signals[chosen]
+    trades['signal_index'] = chosen
+    trades['entry_index'] = chosen + 1
+    trades['exit_index'] = exits[taken]
+    trades['entry_time'] = timestamps[chosen + 1]
+    trades['exit_time'] = timestamps[exits[taken]]
+    trades['entry_price'] = opens[chosen + 1]
+    trades['exit_price'] = exit_prices[taken]
+    trades['confidence'] = confidence[chosen]
+    trades['return'] = (trades['direction'] * (trades['exit_price'] - trades['entry_price'])
+                        / trades['entry_price'] - cost)
+    trades['bars'] = trades['exit_index'] - trades['entry_index'] + 1
+    trades['exit_reason'] = reasons[taken]
+    return trades
+
+def trade_metrics(trades: np.ndarray, span_seconds: float) -> Dict[str, Any]:
+    """Aggregate statistics over simulated trades
+
+    Equity compounds trade returns from 1.0; max drawdown is the largest
+    peak-to-trough fall of that curve. Sharpe is the per-trade mean over
+    standard deviation, annualized by the trades per year the span implies.
+    """
+    returns = trades['return']
+    count = len(returns)
+    if count == 0:
+        return {'trades': 0, 'win_rate': 0.0, 'profit_factor': 0.0, 'total_return': 0.0,
+                'average_return': 0.0, 'max_drawdown': 0.0, 'sharpe': 0.0, 'average_bars': 0.0,
+                'exit_reasons': {reason: 0 for reason in EXIT_REASONS}}
+
+    gains = returns[returns > 0].sum()
+    losses = -returns[returns < 0].sum()
+    equity = np.cumprod(1 + returns)
+    peaks = np.maximum.accumulate(np.concatenate(([1.0], equity)))[1:]
+    drawdown = float(((peaks - equity) / peaks).max())
+
+    deviation = returns.std(ddof=1) if count > 1 else 0.0
+    years = span_seconds / SECONDS_PER_YEAR if span_seconds > 0 else 0.0
+    sharpe = 0.0
+    if deviation > 0 and years > 0:
+        sharpe = float(returns.mean() / deviation * math.sqrt(count / years))
+
+    return {
+        'trades': count,
+        'win_rate': float((returns > 0).mean()),
+        'profit_factor': float(gains / losses) if losses > 0 else (math.inf if gains > 0 else 0.0),
+        'total_return': float(equity[-1] - 1),
+        'average_return': float(returns.mean()),
+        'max_drawdown': drawdown,
+        'sharpe': sharpe,
+        'average_bars': float(trades['bars'].mean()),
+        'exit_reasons': {reason: int((trades['exit_reason'] == code).sum())
+                         for code, reason in enumerate(EXIT_REASONS)}
+    }
+
+def run_backtest(candles: Dict[str, np.ndarray], predictor: Optional[AIPredictor] = None,
+                 min_confidence: float = 0.0, confirm_sweeps: int = 0,
+                 stop_atr: float = 1.5, target_atr: float = 3.0, max_bars: int = 50,
+                 cost: float = 0.0, batch_size: int = 100000) -> Dict[str, Any]:
+    """Backtest the predictor over candle column arrays (timestamp, open, high, low, close, volume)
+
+    Indicators are computed over the whole history at once and the
+    predictor scores ``batch_size`` candles per call. With
+    ``confirm_sweeps`` > 0 a buy needs a swept swing low (a sell a swept
+    swing high) within that many candles. Returns trades (TRADE_DTYPE),
+    metrics and per-stage timings with overall candles per second.
+    """
+    predictor = predictor or ai_predictor
+    started = time.perf_counter()
+    candles = {name: np.ascontiguousarray(values) for name, values in candles.items()}
+    count = len(candles['close'])
+    if 'volume' not in candles:
+        candles['volume'] = np.zeros(count)
+
+    indicators = calculate_indicator_series(candles['high'], candles['low'],
+                                            candles['close'], candles['volume'])
+    indicators_done = time.perf_counter()
+
+    signals = np.zeros(count, dtype=np.int64)
+    confidence = np.zeros(count)
+    matrix = feature_matrix(candles, indicators, predictor)
+    for start in range(0, count, batch_size):
+        scored = predictor.score_matrix(matrix[start:start + batch_size])
+        signals[start:start + batch_size] = scored['signal']
+        confidence[start:start + batch_size] = scored['confidence']
+    signals[confidence < min_confidence] = 0
+    if confirm_sweeps > 0:
+        confirmation = sweep_confirmation(candles['high'], candles['low'], confirm_sweeps)
+        signals[signals != confirmation] = 0
+    signals_done = time.perf_counter()
+
+    trades = simulate_trades(candles, signals, confidence, indicators['atr'],
+                             stop_atr, target_atr, max_bars, cost)
+    finished = time.perf_counter()
+
+    span = float(candles['timestamp'][-1] - candles['timestamp'][0]) if count else 0.0
+    elapsed = finished - started
+    return {
+        'candles': count,
+        'signals': int((signals != 0).sum()),
+        'model_version': predictor.model_version,
+        'trades': trades,
+        'metrics': trade_metrics(trades, span),
+        'timing': {
+            'indicators_seconds': indicators_done - started,
+            'signals_seconds': signals_done - indicators_done,
+            'simulation_seconds': finished - signals_done,
+            'total_seconds': elapsed,
+            'candles_per_second': count / elapsed if elapsed > 0 else 0.0
+        }
+    }
+
+def backtest_series(series: Any, **options) -> Dict[str, Any]:
+    """Backtest over a CandleSeries' retained candles (copied, so ingest can continue)"""
+    return run_backtest({name: values.copy() for name, values in series.view().items()}, **options)
+
+def trades_to_dicts(trades: np.ndarray) -> List[Dict[str, Any]]:
+    """JSON form of a TRADE_DTYPE array"""
+    names = TRADE_DTYPE.names
+    results = []
+    for row in trades.tolist():
+        trade = dict(zip(names, row))
+        trade['exit_reason'] = EXIT_REASONS[trade['exit_reason']]
+        results.append(trade)
+    return results
+
+def main(argv: List[str]) -> None:
+    if not argv:
+        print(__doc__.strip().splitlines()[-1])
+        return
+    confirm = int(argv[argv.index('--confirm-sweeps') + 1]) if '--confirm-sweeps' in argv else 0
+    candles = load_candles_csv(argv[0])
+    result = run_backtest(candles, confirm_sweeps=confirm)
+    print(f"candles: {result['candles']}  signals: {result['signals']}  model: {result['model_version']}")
+    for name, value in result['metrics'].items():
+        print(f"{name:>16}: {value}")
+    for name, value in result['timing'].items():
+        print(f"{name:>20}: {value:,.4f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
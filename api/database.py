@@ -5,10 +5,14 @@ Handles all database interactions and data persistence
 """
 
 import asyncio
+import atexit
 import json
 import os
+import threading
+import time
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 
 # Database connection (using environment variables)
 DATABASE_URL = os.environ.get('DATABASE_URL', '')
@@ -83,6 +87,33 @@ class DatabaseManager:
             print(f"Error getting performance stats: {e}")
             return {}
     
+    async def save_ai_model(self, model_data: Dict[str, Any]) -> bool:
+        """Upsert an AIModel row by name"""
+        try:
+            # Implementation for saving model weights and parameters
+            return True
+        except Exception as e:
+            print(f"Error saving AI model: {e}")
+            return False
+    
+    async def get_ai_model(self, name: str) -> Optional[Dict[str, Any]]:
+        """Get an AIModel row by name"""
+        try:
+            # Implementation for retrieving model weights and parameters
+            return None
+        except Exception as e:
+            print(f"Error getting AI model: {e}")
+            return None
+    
+    async def get_active_ai_model(self) -> Optional[Dict[str, Any]]:
+        """Get the AIModel row marked isActive"""
+        try:
+            # Implementation for retrieving the active model
+            return None
+        except Exception as e:
+            print(f"Error getting active AI model: {e}")
+            return None
+    
     async def save_market_data(self, market_data: Dict[str, Any]) -> bool:
         """Save market data"""
         try:
@@ -92,6 +123,24 @@ class DatabaseManager:
             print(f"Error saving market data: {e}")
             return False
     
+    async def save_market_data_bulk(self, market_data: List[Dict[str, Any]]) -> bool:
+        """Save many market data rows in a single write"""
+        try:
+            # Implementation for bulk saving market data
+            return True
+        except Exception as e:
+            print(f"Error saving market data batch: {e}")
+            return False
+    
+    async def save_market_data_records(self, blocks: List[Tuple[str, str, Any]]) -> bool:
+        """Save columnar (symbol, timeframe, records) blocks from binary ingest"""
+        try:
+            # Implementation for bulk saving columnar market data
+            return True
+        except Exception as e:
+            print(f"Error saving market data records: {e}")
+            return False
+    
     async def get_market_data(self, symbol: str, timeframe: str, limit: int = 100) -> List[Dict]:
         """Get market data"""
         try:
@@ -101,9 +150,206 @@ class DatabaseManager:
             print(f"Error getting market data: {e}")
             return []
 
+class MarketDataWriter:
+    """Write-behind queue that persists market data in bulk from a background thread
+
+    Ingest handlers enqueue rows and return immediately. The writer thread
+    flushes when ``flush_size`` rows are pending or ``flush_interval`` seconds
+    have passed since the oldest pending row, and drains everything on stop.
+    When the queue is full new rows are dropped and counted straight away,
+    unless ``enqueue_timeout`` opts in to waiting that long for room.
+    """
+    
+    def __init__(self, manager: DatabaseManager, flush_size: int = 500,
+                 flush_interval: float = 1.0, max_queue: int = 100000,
+                 enqueue_timeout: float = 0.0):
+        self.manager = manager
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.enqueue_timeout = enqueue_timeout
+        
+        # Pending items are tick dicts or (symbol, timeframe, records) blocks
+        self._ticks = deque()
+        self._blocks = deque()
+        self._pending_rows = 0
+        self._oldest_pending = None
+        self._flushing_rows = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        
+        self.stats = {
+            'enqueued_rows': 0,
+            'written_rows': 0,
+            'failed_rows': 0,
+            'dropped_rows': 0,
+            'flushes': 0,
+            'last_flush_latency_ms': 0.0,
+            'max_flush_latency_ms': 0.0,
+            'total_flush_latency_ms': 0.0
+        }
+    
+    def start(self):
+        """Start the writer thread if it is not running"""
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='market-data-writer', daemon=True)
+            self._thread.start()
+    
+    def enqueue_tick(self, market_tick: Dict[str, Any]) -> bool:
+        """Queue one market tick dict for persistence"""
+        return self._enqueue(self._ticks, market_tick, 1)
+    
+    def enqueue_ticks(self, market_ticks: List[Dict[str, Any]]) -> bool:
+        """Queue many market tick dicts for persistence"""
+        if not market_ticks:
+            return True
+        return self._enqueue(self._ticks, market_ticks, len(market_ticks), many=True)
+    
+    def enqueue_records(self, symbol: str, timeframe: str, records: Any) -> bool:
+        """Queue a columnar block of records for persistence"""
+        return self._enqueue(self._blocks, (symbol, timeframe, records), len(records))
+    
+    def _enqueue(self, target: deque, item: Any, rows: int, many: bool = False) -> bool:
+        """Add rows to a pending queue, dropping them when full (or after ``enqueue_timeout``)"""
+        self.start()
+        with self._condition:
+            deadline = time.monotonic() + self.enqueue_timeout
+            while self._pending_rows + rows > self.max_queue and self._pending_rows > 0:
+                self._condition.notify_all()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats['dropped_rows'] += rows
+                    print(f"Market data writer queue full, dropped {rows} rows")
+                    return False
+                self._condition.wait(remaining)
+            
+            if many:
+                target.extend(item)
+            else:
+                target.append(item)
+            self._pending_rows += rows
+            self.stats['enqueued_rows'] += rows
+            if self._oldest_pending is None:
+                # The writer may be waiting with no timeout; let it schedule the interval flush
+                self._oldest_pending = time.monotonic()
+                self._condition.notify_all()
+            elif self._pending_rows >= self.flush_size:
+                self._condition.notify_all()
+        return True
+    
+    def _run(self):
+        """Writer thread loop, owns a single event loop for all flushes"""
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                with self._condition:
+                    while not self._flush_due():
+                        if self._stopping and self._pending_rows == 0:
+                            return
+                        self._condition.wait(self._wait_timeout())
+                    ticks, blocks, rows = self._take_pending()
+                    self._flushing_rows = rows
+                    self._condition.notify_all()
+                
+                if rows:
+                    loop.run_until_complete(self._flush(ticks, blocks, rows))
+                with self._condition:
+                    self._flushing_rows = 0
+        finally:
+            loop.close()
+    
+    def _flush_due(self) -> bool:
+        """Whether pending rows should be written now (caller holds the lock)"""
+        if self._pending_rows == 0:
+            return False
+        if self._stopping or self._pending_rows >= self.flush_size:
+            return True
+        return time.monotonic() - self._oldest_pending >= self.flush_interval
+    
+    def _wait_timeout(self) -> Optional[float]:
+        """Seconds until the interval flush is due (caller holds the lock)"""
+        if self._oldest_pending is None:
+            return None
+        return max(0.0, self.flush_interval - (time.monotonic() - self._oldest_pending))
+    
+    def _take_pending(self):
+        """Swap out everything pending (caller holds the lock)"""
+        ticks = list(self._ticks)
+        blocks = list(self._blocks)
+        rows = self._pending_rows
+        self._ticks.clear()
+        self._blocks.clear()
+        self._pending_rows = 0
+        self._oldest_pending = None
+        return ticks, blocks, rows
+    
+    async def _flush(self, ticks: List[Dict[str, Any]], blocks: List[Tuple[str, str, Any]], rows: int):
+        """Write one batch and record its latency"""
+        started = time.perf_counter()
+        success = True
+        try:
+            if ticks:
+                success = await self.manager.save_market_data_bulk(ticks) and success
+            if blocks:
+                success = await self.manager.save_market_data_records(blocks) and success
+        except Exception as e:
+            print(f"Error flushing market data: {e}")
+            success = False
+        latency_ms = (time.perf_counter() - started) * 1000
+        
+        with self._condition:
+            self.stats['flushes'] += 1
+            self.stats['last_flush_latency_ms'] = latency_ms
+            self.stats['max_flush_latency_ms'] = max(self.stats['max_flush_latency_ms'], latency_ms)
+            self.stats['total_flush_latency_ms'] += latency_ms
+            if success:
+                self.stats['written_rows'] += rows
+            else:
+                self.stats['failed_rows'] += rows
+    
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """Flush everything still pending and stop the writer thread
+        
+        Returns False if the thread is still running after ``timeout`` seconds.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        if thread.is_alive():
+            with self._condition:
+                unwritten = self._pending_rows + self._flushing_rows
+            print(f"Market data writer did not stop within {timeout}s, {unwritten} rows not written")
+            return False
+        return True
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and flush metrics"""
+        with self._condition:
+            stats = dict(self.stats)
+            stats['queue_depth'] = self._pending_rows
+            stats['running'] = self._thread is not None and self._thread.is_alive()
+        flushes = stats['flushes']
+        total_latency_ms = stats.pop('total_flush_latency_ms')
+        stats['avg_flush_latency_ms'] = total_latency_ms / flushes if flushes else 0.0
+        return stats
+
 # Global database manager instance
 db_manager = DatabaseManager()
 
+# Global write-behind queue for market data, drained on interpreter exit
+# (bounded so a hung database cannot block shutdown)
+WRITER_STOP_TIMEOUT = 30.0
+market_data_writer = MarketDataWriter(db_manager)
+atexit.register(market_data_writer.stop, WRITER_STOP_TIMEOUT)
+
 async def init_database():
     """Initialize database connection"""
     return await db_manager.connect()
@@ -120,6 +366,18 @@ async def save_ai_prediction(prediction_data: Dict[str, Any]) -> bool:
     """Save AI prediction"""
     return await db_manager.save_prediction(prediction_data)
 
+async def save_ai_model(model_data: Dict[str, Any]) -> bool:
+    """Save AI model weights and parameters"""
+    return await db_manager.save_ai_model(model_data)
+
+async def load_ai_model(name: str) -> Optional[Dict[str, Any]]:
+    """Load AI model weights and parameters"""
+    return await db_manager.get_ai_model(name)
+
+async def load_active_ai_model() -> Optional[Dict[str, Any]]:
+    """Load the model currently marked active"""
+    return await db_manager.get_active_ai_model()
+
 async def update_account_data(account_data: Dict[str, Any]) -> bool:
     """Update account information"""
     return await db_manager.update_account_info(account_data)
@@ -132,6 +390,38 @@ async def save_market_tick(market_data: Dict[str, Any]) -> bool:
     """Save market data tick"""
     return await db_manager.save_market_data(market_data)
 
+async def save_market_ticks(market_data: List[Dict[str, Any]]) -> bool:
+    """Save a batch of market data ticks"""
+    return await db_manager.save_market_data_bulk(market_data)
+
+async def save_market_records(blocks: List[Tuple[str, str, Any]]) -> bool:
+    """Save columnar market data blocks"""
+    return await db_manager.save_market_data_records(blocks)
+
+def queue_market_tick(market_data: Dict[str, Any]) -> bool:
+    """Queue a market data tick for background persistence"""
+    return market_data_writer.enqueue_tick(market_data)
+
+def queue_market_ticks(market_data: List[Dict[str, Any]]) -> bool:
+    """Queue a batch of market data ticks for background persistence"""
+    return market_data_writer.enqueue_ticks(market_data)
+
+def queue_market_records(blocks: List[Tuple[str, str, Any]]) -> int:
+    """Queue columnar market data blocks for background persistence
+    
+    Every block is offered to the queue, even after one is rejected.
+    Returns the number of rows dropped because the queue was full.
+    """
+    dropped = 0
+    for symbol, timeframe, records in blocks:
+        if not market_data_writer.enqueue_records(symbol, timeframe, records):
+            dropped += len(records)
+    return dropped
+
+def get_market_writer_stats() -> Dict[str, Any]:
+    """Get write-behind queue metrics"""
+    return market_data_writer.get_stats()
+
 async def get_historical_data(symbol: str, timeframe: str, limit: int = 100) -> List[Dict]:
     """Get historical market data"""
     return await db_manager.get_market_data(symbol, timeframe, limit)
@@ -11,6 +11,8 @@ import json
 import jwt
 import hashlib
 import asyncio
+import math
+import uuid
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 
@@ -70,15 +72,17 @@ except ImportError:
 
 # Import other modules
 try:
-    from .ai_service import get_ai_prediction, analyze_smart_money, update_ai_model, get_ai_model_info
+    from .ai_service import get_ai_prediction_with_features, get_ai_predictions_batch, analyze_smart_money, queue_ai_feedback, get_ai_feature_vector, get_ai_trainer_stats, reload_ai_model, get_ai_model_info
     from .database import save_trade_data, save_ai_prediction, update_account_data, get_performance_statistics
+    from .prediction_store import PredictionStore, PredictionRecord
 except ImportError:
     # For standalone execution
     import sys
     import os
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-    from ai_service import get_ai_prediction, analyze_smart_money, update_ai_model, get_ai_model_info
+    from ai_service import get_ai_prediction_with_features, get_ai_predictions_batch, analyze_smart_money, queue_ai_feedback, get_ai_feature_vector, get_ai_trainer_stats, reload_ai_model, get_ai_model_info
     from database import save_trade_data, save_ai_prediction, update_account_data, get_performance_statistics
+    from prediction_store import PredictionStore, PredictionRecord
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -92,7 +96,13 @@ API_VERSION = '1.0.0'
 # In-memory storage for demo (replace with real database)
 users_db = {}
 trades_db = {}
-predictions_cache = {}
+# Recent predictions for feedback joins, bounded by count and age
+prediction_store = PredictionStore(
+    max_entries=int(os.environ.get('PREDICTION_STORE_SIZE', 100000)),
+    ttl=float(os.environ.get('PREDICTION_STORE_TTL', 7 * 24 * 3600))
+)
+MAX_BATCH_PREDICTIONS = 1000
+MAX_BULK_FEEDBACK = 5000
 statistics = {
     'total_trades': 0,
     'win_rate': 0.0,
@@ -112,6 +122,14 @@ market_data = {
 market_data_cache = {}
 symbol_subscriptions = set()
 
+def is_number(value: Any) -> bool:
+    """Whether a JSON value is a finite number (booleans excluded)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def new_prediction_id(symbol: str, timeframe: str, timestamp: datetime) -> str:
+    """Unique prediction ID, even for the same symbol and timeframe at the same instant"""
+    return f"{symbol}_{timeframe}_{timestamp.timestamp()}_{uuid.uuid4().hex}"
+
 def authenticate_request():
     """Helper function to authenticate requests"""
     auth_header = request.headers.get('Authorization', '')
@@ -145,7 +163,8 @@ def health_check():
         'status': 'healthy',
         'version': API_VERSION,
         'timestamp': datetime.now().isoformat(),
-        'database_status': 'connected' if DATABASE_URL else 'not_configured'
+        'database_status': 'connected' if DATABASE_URL else 'not_configured',
+        'prediction_store': prediction_store.get_stats()
     })
 
 @app.route('/api/auth/send-code', methods=['POST'])
@@ -241,17 +260,12 @@ def ai_predict():
         features = data['features']
         
         # Get AI prediction
-        prediction = get_ai_prediction(symbol, features)
+        prediction, feature_vector = get_ai_prediction_with_features(symbol, features)
         
-        # Store prediction in cache
-        prediction_id = f"{symbol}_{timeframe}_{datetime.now().timestamp()}"
-        predictions_cache[prediction_id] = {
-            'symbol': symbol,
-            'timeframe': timeframe,
-            'prediction': prediction['signal'],
-            'confidence': prediction['confidence'],
-            'timestamp': datetime.now().isoformat()
-        }
+        # Store prediction, with the feature vector feedback learns from
+        prediction_id = new_prediction_id(symbol, timeframe, datetime.now())
+        prediction_store.put(prediction_id, PredictionRecord(
+            symbol, timeframe, prediction['signal'], prediction['confidence'], feature_vector))
         
         # Save to database
         asyncio.run(save_ai_prediction({
@@ -277,6 +291,65 @@ def ai_predict():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/predict/batch', methods=['POST'])
+def ai_predict_batch():
+    """AI predictions for many symbols in one request (screening)"""
+    try:
+        # Authenticate request
+        auth_result = authenticate_request()
+        if not auth_result['success']:
+            return jsonify({'error': auth_result['error']}), 401
+        
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'items must be a non-empty list'}), 400
+        if len(items) > MAX_BATCH_PREDICTIONS:
+            return jsonify({'error': f'At most {MAX_BATCH_PREDICTIONS} items per batch'}), 400
+        
+        default_timeframe = data.get('timeframe')
+        invalid = [index for index, item in enumerate(items)
+                   if not isinstance(item, dict) or 'symbol' not in item
+                   or not isinstance(item.get('features'), dict)
+                   or not (item.get('timeframe') or default_timeframe)]
+        if invalid:
+            return jsonify({'error': 'Each item needs symbol, timeframe and features', 'invalid_items': invalid}), 400
+        
+        # Score every item in one vectorized pass
+        predictions = get_ai_predictions_batch([item['symbol'] for item in items],
+                                               [item['features'] for item in items])
+        
+        timestamp = datetime.now()
+        results = []
+        for item, prediction in zip(items, predictions):
+            symbol = item['symbol']
+            timeframe = item.get('timeframe') or default_timeframe
+            prediction_id = new_prediction_id(symbol, timeframe, timestamp)
+            prediction_store.put(prediction_id, PredictionRecord(
+                symbol, timeframe, prediction['signal'], prediction['confidence'], prediction['feature_vector']))
+            results.append({
+                'prediction_id': prediction_id,
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'signal': prediction['signal'],
+                'confidence': prediction['confidence'],
+                'signal_strength': prediction['signal_strength'],
+                'market_context': prediction['market_context']
+            })
+        
+        return jsonify({
+            'count': len(results),
+            'predictions': results,
+            'model_version': predictions[0]['model_version'],
+            'timestamp': timestamp.isoformat()
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/feedback', methods=['POST'])
 def trade_feedback():
     """Trade feedback endpoint for AI improvement"""
@@ -306,12 +379,11 @@ def trade_feedback():
         prediction_id = data['prediction_id']
         actual_result = data['actual_result']
         profit = data['profit']
+        if not is_number(actual_result) or not is_number(profit):
+            return jsonify({'error': 'actual_result and profit must be numbers'}), 400
         
         # Update prediction with actual result
-        if prediction_id in predictions_cache:
-            predictions_cache[prediction_id]['actual_result'] = actual_result
-            predictions_cache[prediction_id]['profit'] = profit
-            predictions_cache[prediction_id]['feedback_timestamp'] = datetime.now().isoformat()
+        cached = prediction_store.record_feedback(prediction_id, actual_result, profit)
         
         # Update statistics
         statistics['total_trades'] += 1
@@ -322,23 +394,96 @@ def trade_feedback():
             statistics['win_trades'] = win_trades
             statistics['win_rate'] = (win_trades / statistics['total_trades']) * 100
         
-        # Update AI model with feedback
+        # Queue feedback for the background trainer
         feedback_data = [{
-            'predicted_signal': predictions_cache.get(prediction_id, {}).get('prediction', 0),
+            'predicted_signal': cached.prediction if cached is not None else 0,
             'actual_result': actual_result,
-            'profit': profit
+            'profit': profit,
+            'features': cached.feature_vector if cached is not None else None
         }]
-        update_ai_model(feedback_data)
+        if not queue_ai_feedback(feedback_data):
+            return jsonify({'error': 'Feedback queue is full, retry later',
+                            'trainer': get_ai_trainer_stats()}), 503
         
         return jsonify({
             'status': 'success',
-            'message': 'Feedback received and processed',
+            'message': 'Feedback received and queued',
             'prediction_id': prediction_id
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/feedback/bulk', methods=['POST'])
+def trade_feedback_bulk():
+    """Backfill AI feedback for past trade outcomes
+    
+    Each item has actual_result and profit, plus either a prediction_id still
+    in the prediction store or the raw features (and optional
+    predicted_signal) of the original prediction. Items are queued for the
+    trainer all together; live trade statistics are not touched.
+    """
+    try:
+        # Authenticate request
+        auth_result = authenticate_request()
+        if not auth_result['success']:
+            return jsonify({'error': auth_result['error']}), 401
+        
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'items must be a non-empty list'}), 400
+        if len(items) > MAX_BULK_FEEDBACK:
+            return jsonify({'error': f'At most {MAX_BULK_FEEDBACK} items per request'}), 400
+        
+        feedback_data = []
+        invalid = []
+        unmatched = 0
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not is_number(item.get('actual_result')) \
+                    or not is_number(item.get('profit')) or not is_number(item.get('predicted_signal', 0)):
+                invalid.append(index)
+                continue
+            cached = prediction_store.get(item.get('prediction_id'))
+            if cached is not None:
+                predicted_signal = cached.prediction
+                feature_vector = cached.feature_vector
+            elif isinstance(item.get('features'), dict):
+                predicted_signal = item.get('predicted_signal', 0)
+                feature_vector = get_ai_feature_vector(item['features'])
+            else:
+                invalid.append(index)
+                continue
+            if not feature_vector:
+                unmatched += 1
+            feedback_data.append({
+                'predicted_signal': predicted_signal,
+                'actual_result': item['actual_result'],
+                'profit': item['profit'],
+                'features': feature_vector
+            })
+        if invalid:
+            return jsonify({'error': 'Each item needs numeric actual_result and profit, and a known prediction_id or features',
+                            'invalid_items': invalid}), 400
+        
+        if not queue_ai_feedback(feedback_data):
+            return jsonify({'error': 'Feedback queue is full, retry later',
+                            'trainer': get_ai_trainer_stats()}), 503
+        
+        return jsonify({
+            'status': 'success',
+            'queued': len(feedback_data),
+            'without_features': unmatched,
+            'trainer': get_ai_trainer_stats(),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/trades/save', methods=['POST'])
 def save_trade():
     """Save trade data endpoint"""
@@ -565,6 +710,34 @@ def update_user_role(user_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/admin/model/reload', methods=['POST'])
+def reload_model():
+    """Swap to the active AI model stored in the database (admin only)"""
+    try:
+        # Authenticate request
+        auth_result = authenticate_request()
+        if not auth_result['success']:
+            return jsonify({'error': auth_result['error']}), 401
+        
+        user = auth_result['user']
+        
+        # Check if user is admin
+        if user['email'] != 'admin@svn.com':
+            return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
+        
+        swapped = reload_ai_model()
+        model_info = get_ai_model_info()
+        
+        return jsonify({
+            'swapped': swapped,
+            'model_version': model_info['model_version'],
+            'registry': model_info['registry'],
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/profile', methods=['GET'])
 def get_profile():
     """Get user profile"""
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Technical indicators for SVN Trading Bot
+Streaming per-series indicator engine updated in O(1) per candle, plus
+NumPy-vectorized full-series indicators for backfills and research
+"""
+
+import math
+import numpy as np
+from collections import deque
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Iterable, Tuple
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Indicator values the streaming engine produces for every candle
+INDICATOR_COLUMNS = ('sma_20', 'sma_50', 'rsi', 'atr', 'support', 'resistance', 'volume_avg')
+
+NAN = float('nan')
+
+class RollingExtreme:
+    """Monotonic deque tracking the max (or min) of the last ``window`` values"""
+
+    def __init__(self, window: int, maximum: bool = True):
+        self.window = window
+        self.maximum = maximum
+        self._items = deque()
+
+    def push(self, index: int, value: float):
+        """Add value at a monotonically increasing index"""
+        items = self._items
+        if self.maximum:
+            while items and items[-1][1] <= value:
+                items.pop()
+        else:
+            while items and items[-1][1] >= value:
+                items.pop()
+        items.append((index, value))
+        while items[0][0] <= index - self.window:
+            items.popleft()
+
+    def peek(self) -> float:
+        """Current extreme, NaN when empty"""
+        return self._items[0][1] if self._items else NAN
+
+class StreamingIndicators:
+    """Incremental indicator state for one candle series
+
+    The latest candle is held as *pending* and only folded into the running
+    state when the next candle arrives. Every indicator is then the committed
+    state combined with the pending candle, so a new candle costs O(1) and a
+    resent forming bar can be re-evaluated without undoing anything.
+
+    RSI and ATR use Wilder smoothing seeded with a simple average; support and
+    resistance are the rolling min/max of lows/highs.
+    """
+
+    def __init__(self, sma_fast: int = 20, sma_slow: int = 50, rsi_period: int = 14,
+                 atr_period: int = 14, level_period: int = 20, volume_period: int = 20):
+        self.sma_fast = sma_fast
+        self.sma_slow = sma_slow
+        self.rsi_period = rsi_period
+        self.atr_period = atr_period
+        self.level_period = level_period
+        self.volume_period = volume_period
+        self.reset()
+
+    def reset(self):
+        """Clear all state"""
+        self._count = 0
+        self._pending = None
+
+        # Committed closes/volumes, enough history to expire window sums
+        self._closes = deque(maxlen=max(self.sma_fast, self.sma_slow))
+        self._volumes = deque(maxlen=self.volume_period)
+        # Sums over the last (period - 1) committed values
+        self._sum_fast = 0.0
+        self._sum_slow = 0.0
+        self._sum_volume = 0.0
+
+        self._prev_close = None
+        self._rsi_samples = 0
+        self._gain_seed = 0.0
+        self._loss_seed = 0.0
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+        self._tr_samples = 0
+        self._tr_seed = 0.0
+        self._avg_tr = 0.0
+
+        self._highs = RollingExtreme(self.level_period - 1, maximum=True)
+        self._lows = RollingExtreme(self.level_period - 1, maximum=False)
+
+    def update(self, high: float, low: float, close: float, volume: float) -> Dict[str, float]:
+        """Feed a new candle and return its indicator values"""
+        if self._pending is not None:
+            self._commit(*self._pending)
+        self._pending = (float(high), float(low), float(close), float(volume))
+        return self._evaluate(*self._pending)
+
+    def revise(self, high: float, low: float, close: float, volume: float) -> Dict[str, float]:
+        """Replace the latest candle (a resent forming bar) and return its indicator values"""
+        if self._pending is None:
+            return self.update(high, low, close, volume)
+        self._pending = (float(high), float(low), float(close), float(volume))
+        return self._evaluate(*self._pending)
+
+    def values(self) -> Dict[str, float]:
+        """Indicator values for the latest candle"""
+        if self._pending is None:
+            return {name: NAN for name in INDICATOR_COLUMNS}
+        return self._evaluate(*self._pending)
+
+    @staticmethod
+    def _wilder(avg: float, seed: float, samples: int, value: float, period: int) -> float:
+        """Wilder average after adding value to ``samples`` earlier samples"""
+        if samples + 1 < period:
+            return NAN
+        if samples + 1 == period:
+            return (seed + value) / period
+        return (avg * (period - 1) + value) / period
+
+    def _true_range(self, high: float, low: float) -> float:
+        """True range against the last committed close"""
+        if self._prev_close is None:
+            return high - low
+        return max(high - low, abs(high - self._prev_close), abs(low - self._prev_close))
+
+    def _evaluate(self, high: float, low: float, close: float, volume: float) -> Dict[str, float]:
+        """Indicators for committed state plus one candle (no mutation)"""
+        count = self._count + 1
+        values = {}
+
+        values['sma_20'] = (self._sum_fast + close) / self.sma_fast if count >= self.sma_fast else NAN
+        values['sma_50'] = (self._sum_slow + close) / self.sma_slow if count >= self.sma_slow else NAN
+
+        rsi = NAN
+        if self._prev_close is not None:
+            diff = close - self._prev_close
+            avg_gain = self._wilder(self._avg_gain, self._gain_seed, self._rsi_samples,
+                                    max(diff, 0.0), self.rsi_period)
+            avg_loss = self._wilder(self._avg_loss, self._loss_seed, self._rsi_samples,
+                                    max(-diff, 0.0), self.rsi_period)
+            if not math.isnan(avg_gain):
+                rsi = 100 - (100 / (1 + avg_gain / avg_loss)) if avg_loss != 0 else 100.0
+        values['rsi'] = rsi
+
+        values['atr'] = self._wilder(self._avg_tr, self._tr_seed, self._tr_samples,
+                                     self._true_range(high, low), self.atr_period)
+
+        if count >= self.level_period:
+            resistance = self._highs.peek()
+            support = self._lows.peek()
+            values['resistance'] = high if math.isnan(resistance) else max(resistance, high)
+            values['support'] = low if math.isnan(support) else min(support, low)
+        else:
+            values['resistance'] = NAN
+            values['support'] = NAN
+
+        values['volume_avg'] = (self._sum_volume + volume) / self.volume_period if count >= self.volume_period else NAN
+        return values
+
+    def _commit(self, high: float, low: float, close: float, volume: float):
+        """Fold a finished candle into the running state"""
+        index = self._count
+
+        # Window sums keep (period - 1) values so the pending candle completes them
+        closes = self._closes
+        closes.append(close)
+        self._sum_fast += close
+        if len(closes) >= self.sma_fast:
+            self._sum_fast -= closes[-self.sma_fast]
+        self._sum_slow += close
+        if len(closes) >= self.sma_slow:
+            self._sum_slow -= closes[-self.sma_slow]
+
+        volumes = self._volumes
+        volumes.append(volume)
+        self._sum_volume += volume
+        if len(volumes) >= self.volume_period:
+            self._sum_volume -= volumes[-self.volume_period]
+
+        # Periodically resync running sums to stop float drift
+        if index % 1024 == 1023:
+            recent = list(closes)
+            self._sum_fast = math.fsum(recent[-(self.sma_fast - 1):]) if self.sma_fast > 1 else 0.0
+            self._sum_slow = math.fsum(recent[-(self.sma_slow - 1):]) if self.sma_slow > 1 else 0.0
+            recent_volumes = list(volumes)
+            self._sum_volume = math.fsum(recent_volumes[-(self.volume_period - 1):]) if self.volume_period > 1 else 0.0
+
+        if self._prev_close is not None:
+            diff = close - self._prev_close
+            gain = max(diff, 0.0)
+            loss = max(-diff, 0.0)
+            if self._rsi_samples + 1 < self.rsi_period:
+                self._gain_seed += gain
+                self._loss_seed += loss
+            else:
+                self._avg_gain = self._wilder(self._avg_gain, self._gain_seed, self._rsi_samples, gain, self.rsi_period)
+                self._avg_loss = self._wilder(self._avg_loss, self._loss_seed, self._rsi_samples, loss, self.rsi_period)
+            self._rsi_samples += 1
+
+        true_range = self._true_range(high, low)
+        if self._tr_samples + 1 < self.atr_period:
+            self._tr_seed += true_range
+        else:
+            self._avg_tr = self._wilder(self._avg_tr, self._tr_seed, self._tr_samples, true_range, self.atr_period)
+        self._tr_samples += 1
+
+        if self.level_period > 1:
+            self._highs.push(index, high)
+            self._lows.push(index, low)
+
+        self._prev_close = close
+        self._count += 1
+
+def calculate_indicator_snapshot(candles: Iterable[Tuple[float, float, float, float]]) -> Dict[str, float]:
+    """Run the streaming engine over (high, low, close, volume) rows and return the last values"""
+    engine = StreamingIndicators()
+    values = engine.values()
+    for high, low, close, volume in candles:
+        values = engine.update(high, low, close, volume)
+    return {name: value for name, value in values.items() if not math.isnan(value)}
+
+# Vectorized full-series indicators
+#
+# Every function takes whole NumPy arrays and returns arrays of the same
+# length, NaN-padded during warm-up. Definitions match StreamingIndicators,
+# so a backfill and the live engine agree on every candle.
+
+def as_float_array(values: Iterable[float]) -> np.ndarray:
+    """Coerce input to a contiguous float64 array (shared by the array kernels)"""
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+def _recursive_smooth(values: np.ndarray, alpha: float, initial: float) -> np.ndarray:
+    """Evaluate y[i] = (1 - alpha) * y[i-1] + alpha * values[i] starting from ``initial``
+
+    The recurrence is solved in closed form block by block, with each block
+    short enough that the (1 - alpha)**-j scale factors stay in float range.
+    """
+    count = len(values)
+    result = np.empty(count)
+    if count == 0:
+        return result
+    if alpha >= 1.0:
+        result[:] = values
+        return result
+
+    decay = 1.0 - alpha
+    block = max(1, min(1024, int(200 * math.log(10) / -math.log(decay))))
+    offsets = np.arange(block, dtype=np.float64) + 1.0
+    growth = decay ** -offsets
+    shrink = decay ** offsets
+
+    previous = initial
+    for start in range(0, count, block):
+        chunk = values[start:start + block]
+        size = len(chunk)
+        chunk_result = shrink[:size] * (previous + alpha * np.cumsum(chunk * growth[:size]))
+        result[start:start + size] = chunk_result
+        previous = chunk_result[-1]
+    return result
+
+def _seeded_average(values: np.ndarray, period: int, alpha: float, seed_offset: int = 0) -> np.ndarray:
+    """Exponential/Wilder average seeded with the simple mean of the first ``period`` values"""
+    result = np.full(len(values), np.nan)
+    first = seed_offset + period - 1
+    if period <= 0 or len(values) <= first:
+        return result
+    seed = values[seed_offset:first + 1].mean()
+    result[first] = seed
+    result[first + 1:] = _recursive_smooth(values[first + 1:], alpha, seed)
+    return result
+
+def sma_series(values: Iterable[float], period: int) -> np.ndarray:
+    """Simple moving average"""
+    values = as_float_array(values)
+    result = np.full(len(values), np.nan)
+    if period > 0 and len(values) >= period:
+        result[period - 1:] = sliding_window_view(values, period).mean(axis=1)
+    return result
+
+def ema_series(values: Iterable[float], period: int) -> np.ndarray:
+    """Exponential moving average (alpha = 2 / (period + 1)), seeded with an SMA"""
+    return _seeded_average(as_float_array(values), period, 2.0 / (period + 1))
+
+def rolling_max_series(values: Iterable[float], period: int) -> np.ndarray:
+    """Rolling maximum over the last ``period`` values"""
+    values = as_float_array(values)
+    result = np.full(len(values), np.nan)
+    if period > 0 and len(values) >= period:
+        result[period - 1:] = sliding_window_view(values, period).max(axis=1)
+    return result
+
+def rolling_min_series(values: Iterable[float], period: int) -> np.ndarray:
+    """Rolling minimum over the last ``period`` values"""
+    values = as_float_array(values)
+    result = np.full(len(values), np.nan)
+    if period > 0 and len(values) >= period:
+        result[period - 1:] = sliding_window_view(values, period).min(axis=1)
+    return result
+
+def rsi_series(closes: Iterable[float], period: int = 14) -> np.ndarray:
+    """Relative Strength Index with Wilder smoothing"""
+    closes = as_float_array(closes)
+    result = np.full(len(closes), np.nan)
+    if len(closes) <= period:
+        return result
+
+    diffs = np.diff(closes)
+    avg_gain = _seeded_average(np.maximum(diffs, 0.0), period, 1.0 / period)
+    avg_loss = _seeded_average(np.maximum(-diffs, 0.0), period, 1.0 / period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, 100.0, rsi)
+    rsi[np.isnan(avg_gain)] = np.nan
+    result[1:] = rsi
+    return result
+
+def true_range_series(highs: Iterable[float], lows: Iterable[float], closes: Iterable[float]) -> np.ndarray:
+    """True range; the first candle uses high - low"""
+    highs = as_float_array(highs)
+    lows = as_float_array(lows)
+    closes = as_float_array(closes)
+    true_range = highs - lows
+    if len(closes) > 1:
+        previous = closes[:-1]
+        true_range[1:] = np.maximum(true_range[1:], np.maximum(
+            np.abs(highs[1:] - previous), np.abs(lows[1:] - previous)))
+    return true_range
+
+def atr_series(highs: Iterable[float], lows: Iterable[float], closes: Iterable[float],
+               period: int = 14) -> np.ndarray:
+    """Average True Range with Wilder smoothing"""
+    return _seeded_average(true_range_series(highs, lows, closes), period, 1.0 / period)
+
+def macd_series(closes: Iterable[float], fast: int = 12, slow: int = 26,
+                signal: int = 9) -> Dict[str, np.ndarray]:
+    """MACD line, signal line and histogram"""
+    closes = as_float_array(closes)
+    macd = ema_series(closes, fast) - ema_series(closes, slow)
+    macd_signal = _seeded_average(np.nan_to_num(macd), signal, 2.0 / (signal + 1), seed_offset=slow - 1)
+    return {
+        'macd': macd,
+        'macd_signal': macd_signal,
+        'macd_histogram': macd - macd_signal
+    }
+
+def bollinger_series(closes: Iterable[float], period: int = 20,
+                     deviations: float = 2.0) -> Dict[str, np.ndarray]:
+    """Bollinger Bands (population standard deviation)"""
+    closes = as_float_array(closes)
+    middle = np.full(len(closes), np.nan)
+    width = np.full(len(closes), np.nan)
+    if period > 0 and len(closes) >= period:
+        windows = sliding_window_view(closes, period)
+        middle[period - 1:] = windows.mean(axis=1)
+        width[period - 1:] = windows.std(axis=1) * deviations
+    return {
+        'bb_upper': middle + width,
+        'bb_middle': middle,
+        'bb_lower': middle - width
+    }
+
+def stochastic_series(highs: Iterable[float], lows: Iterable[float], closes: Iterable[float],
+                      k_period: int = 14, d_period: int = 3) -> Dict[str, np.ndarray]:
+    """Stochastic oscillator %K and %D"""
+    closes = as_float_array(closes)
+    highest = rolling_max_series(highs, k_period)
+    lowest = rolling_min_series(lows, k_period)
+    span = highest - lowest
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stoch_k = np.where(span > 0, 100 * (closes - lowest) / span, 50.0)
+    stoch_k[np.isnan(span)] = np.nan
+
+    stoch_d = np.full(len(closes), np.nan)
+    first = k_period - 1
+    if len(closes) - first >= d_period:
+        stoch_d[first + d_period - 1:] = sliding_window_view(stoch_k[first:], d_period).mean(axis=1)
+    return {'stoch_k': stoch_k, 'stoch_d': stoch_d}
+
+def calculate_indicator_series(highs: Iterable[float], lows: Iterable[float],
+                               closes: Iterable[float], volumes: Iterable[float]) -> Dict[str, np.ndarray]:
+    """Compute every indicator over whole candle arrays
+
+    Returns the streaming engine's columns plus EMA, MACD, Bollinger Bands,
+    Stochastic and the ``ma_fast``/``ma_slow`` aliases AIPredictor reads.
+    """
+    highs = as_float_array(highs)
+    lows = as_float_array(lows)
+    closes = as_float_array(closes)
+    volumes = as_float_array(volumes)
+
+    series = {
+        'sma_20': sma_series(closes, 20),
+        'sma_50': sma_series(closes, 50),
+        'ema_12': ema_series(closes, 12),
+        'ema_26': ema_series(closes, 26),
+        'rsi': rsi_series(closes, 14),
+        'atr': atr_series(highs, lows, closes, 14),
+        'support': rolling_min_series(lows, 20),
+        'resistance': rolling_max_series(highs, 20),
+        'volume_avg': sma_series(volumes, 20)
+    }
+    series.update(macd_series(closes))
+    series.update(bollinger_series(closes))
+    series.update(stochastic_series(highs, lows, closes))
+    series['ma_fast'] = series['sma_20']
+    series['ma_slow'] = series['sma_50']
+    return series
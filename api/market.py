@@ -4,16 +4,23 @@ Market Data API endpoints for SVN Trading Bot
 Handles market data collection, analysis, and distribution
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response
 from datetime import datetime, timedelta
 import json
+import hashlib
 import logging
 import asyncio
 from typing import Dict, List, Any, Optional
 
 from .auth import authenticate_api_key, verify_token
-from .ai_service import get_ai_prediction, analyze_smart_money
-from .database import save_market_tick, get_historical_data
+from .ai_service import get_ai_prediction, get_ai_model_version, analyze_smart_money_series
+from .database import queue_market_tick, queue_market_ticks, queue_market_records, get_market_writer_stats, get_historical_data
+from .indicators import calculate_indicator_snapshot
+from .patterns import PATTERN_NAMES, DEFAULT_TOLERANCE, scan_patterns
+from .signal_board import SignalBoard, candle_features
+from .market_codec import BINARY_CONTENT_TYPE, decode_candle_blocks
+from .analysis_cache import AnalysisCache
+from .market_store import MarketDataStore, RECORD_FIELDS, parse_timestamp, format_timestamp
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,10 +29,21 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 market_bp = Blueprint('market', __name__)
 
-# In-memory market data storage (replace with database)
-market_data_cache = {}
+# In-memory market data storage (last 1000 candles per symbol/timeframe);
+# M1 feeds are rolled up into M5/M15/H1/H4/D1 unless pushed directly
+market_data_cache = MarketDataStore(capacity=1000, aggregate_from='M1')
 symbol_subscriptions = set()
 
+# Signals for subscribed symbols, re-evaluated when their M15 series changes
+signal_board = SignalBoard(market_data_cache, get_ai_prediction, timeframe='M15')
+
+# Analysis responses per series, dropped whenever that series is written to
+analysis_cache = AnalysisCache()
+market_data_cache.add_listener(lambda series: analysis_cache.invalidate((series.symbol, series.timeframe)))
+
+MARKET_DATA_FIELDS = ['symbol', 'timeframe', 'timestamp', 'open', 'high', 'low', 'close', 'volume']
+MAX_BATCH_CANDLES = 10000
+
 @market_bp.route('/api/market/data', methods=['POST'])
 def receive_market_data():
     """Receive market data from MT5"""
@@ -44,53 +62,40 @@ def receive_market_data():
         if not auth_result['success']:
             return jsonify({'error': auth_result['error']}), 401
         
+        # Packed binary candles skip JSON parsing entirely
+        if request.mimetype == BINARY_CONTENT_TYPE:
+            return ingest_binary_market_data(request.get_data())
+        
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
         # Validate required fields
-        required_fields = ['symbol', 'timeframe', 'timestamp', 'open', 'high', 'low', 'close', 'volume']
-        missing_fields = [field for field in required_fields if field not in data]
+        missing_fields = [field for field in MARKET_DATA_FIELDS if field not in data]
         if missing_fields:
             return jsonify({'error': f'Missing required fields: {missing_fields}'}), 400
         
         # Process market data
         symbol = data['symbol']
         timeframe = data['timeframe']
+        try:
+            market_tick = build_market_tick(data, datetime.now().isoformat())
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid market data: {e}'}), 400
         
-        # Store in cache
-        cache_key = f"{symbol}_{timeframe}"
-        if cache_key not in market_data_cache:
-            market_data_cache[cache_key] = []
-        
-        market_tick = {
-            'symbol': symbol,
-            'timeframe': timeframe,
-            'timestamp': data['timestamp'],
-            'open': float(data['open']),
-            'high': float(data['high']),
-            'low': float(data['low']),
-            'close': float(data['close']),
-            'volume': int(data['volume']),
-            'spread': data.get('spread', 0.0),
-            'indicators': data.get('indicators', {}),
-            'received_at': datetime.now().isoformat()
-        }
-        
-        market_data_cache[cache_key].append(market_tick)
+        # Store in cache (upsert by timestamp, last 1000 candles kept)
+        action = store_market_tick(market_tick)
         
-        # Keep only last 1000 candles per symbol/timeframe
-        if len(market_data_cache[cache_key]) > 1000:
-            market_data_cache[cache_key] = market_data_cache[cache_key][-1000:]
-        
-        # Save to database (async)
-        asyncio.run(save_market_tick(market_tick))
+        # Queue for background persistence (write-behind)
+        persistence_dropped = 0 if queue_market_tick(market_tick) else 1
         
         return jsonify({
             'status': 'success',
             'message': 'Market data received',
             'symbol': symbol,
             'timeframe': timeframe,
+            'action': action,
+            'persistence_dropped': persistence_dropped,
             'timestamp': market_tick['received_at']
         })
         
@@ -98,6 +103,88 @@ def receive_market_data():
         logger.error(f"Error receiving market data: {e}")
         return jsonify({'error': str(e)}), 500
 
+@market_bp.route('/api/market/data/batch', methods=['POST'])
+def receive_market_data_batch():
+    """Receive many candles (any mix of symbols/timeframes) from MT5 in one request"""
+    try:
+        # Authenticate request once for the whole batch
+        auth_header = request.headers.get('Authorization', '')
+        if auth_header.startswith('Bearer '):
+            api_key = auth_header[7:]
+        else:
+            api_key = request.headers.get('X-API-Key', '')
+        
+        if not api_key:
+            return jsonify({'error': 'API key required'}), 401
+        
+        auth_result = authenticate_api_key(api_key)
+        if not auth_result['success']:
+            return jsonify({'error': auth_result['error']}), 401
+        
+        # Packed binary candles skip JSON parsing entirely
+        if request.mimetype == BINARY_CONTENT_TYPE:
+            return ingest_binary_market_data(request.get_data())
+        
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        candles = data.get('candles')
+        if not isinstance(candles, list) or not candles:
+            return jsonify({'error': 'Candles list is required'}), 400
+        if len(candles) > MAX_BATCH_CANDLES:
+            return jsonify({'error': f'Batch too large (max {MAX_BATCH_CANDLES} candles)'}), 413
+        
+        # Top-level symbol/timeframe act as defaults for every row
+        defaults = {key: data[key] for key in ('symbol', 'timeframe') if key in data}
+        
+        # Validate all rows before storing any of them
+        received_at = datetime.now().isoformat()
+        market_ticks = []
+        errors = []
+        for index, candle in enumerate(candles):
+            row = {**defaults, **candle} if isinstance(candle, dict) else {}
+            missing_fields = [field for field in MARKET_DATA_FIELDS if field not in row]
+            if missing_fields:
+                errors.append({'index': index, 'error': f'Missing required fields: {missing_fields}'})
+                continue
+            try:
+                market_ticks.append(build_market_tick(row, received_at))
+            except (TypeError, ValueError) as e:
+                errors.append({'index': index, 'error': str(e)})
+        
+        if errors:
+            return jsonify({
+                'error': 'Invalid candles in batch',
+                'invalid_rows': len(errors),
+                'details': errors[:20]
+            }), 400
+        
+        # Store in cache, then queue the whole batch for one bulk write
+        actions = {}
+        with signal_board.deferred():
+            for market_tick in market_ticks:
+                action = store_market_tick(market_tick)
+                actions[action] = actions.get(action, 0) + 1
+        
+        persistence_dropped = 0 if queue_market_ticks(market_ticks) else len(market_ticks)
+        
+        series_keys = {(tick['symbol'], tick['timeframe']) for tick in market_ticks}
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'Market data batch received',
+            'candles': len(market_ticks),
+            'series': len(series_keys),
+            'actions': actions,
+            'persistence_dropped': persistence_dropped,
+            'timestamp': received_at
+        })
+        
+    except Exception as e:
+        logger.error(f"Error receiving market data batch: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @market_bp.route('/api/market/analyze', methods=['POST'])
 def analyze_market_data():
     """Analyze market data for trading signals"""
@@ -125,47 +212,54 @@ def analyze_market_data():
             return jsonify({'error': 'Symbol is required'}), 400
         
         # Get market data from cache
-        cache_key = f"{symbol}_{timeframe}"
-        price_data = market_data_cache.get(cache_key, [])
+        series = market_data_cache.get(symbol, timeframe)
         
-        if len(price_data) < 50:
+        if series is None or len(series) < 50:
             return jsonify({'error': 'Insufficient market data for analysis'}), 400
         
-        # Perform smart money analysis
-        smart_money_analysis = analyze_smart_money(price_data)
-        
-        # Get latest market data for AI prediction
-        latest_data = price_data[-1]
-        features = latest_data.get('indicators', {})
-        
-        # Add price action features
-        features.update({
-            'close': latest_data['close'],
-            'volume': latest_data['volume'],
-            'spread': latest_data.get('spread', 0),
-        })
-        
-        # Get AI prediction
-        ai_prediction = get_ai_prediction(symbol, features)
+        price = data.get('price')
+        if price is not None:
+            try:
+                price = float(price)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'price must be a number'}), 400
         
-        return jsonify({
-            'symbol': symbol,
-            'timeframe': timeframe,
-            'analysis_timestamp': datetime.now().isoformat(),
-            'smart_money': smart_money_analysis,
-            'ai_prediction': ai_prediction,
-            'market_context': {
-                'latest_price': latest_data['close'],
-                'volume': latest_data['volume'],
-                'spread': latest_data.get('spread', 0),
-                'data_points': len(price_data)
-            }
-        })
+        # Identical requests against the same data and model share one computation
+        version_key = (series.version, series.last_timestamp(), get_ai_model_version(), price)
+        analysis = analysis_cache.get_or_compute((symbol, timeframe), version_key,
+                                                 lambda: build_market_analysis(series, price))
+        return jsonify(analysis)
         
     except Exception as e:
         logger.error(f"Error analyzing market data: {e}")
         return jsonify({'error': str(e)}), 500
 
+def build_market_analysis(series, price: Optional[float] = None) -> Dict[str, Any]:
+    """Smart money zones plus an AI prediction for the latest candle of a series"""
+    # Active smart money zones, advanced over the candles closed since the last call
+    smart_money_analysis = analyze_smart_money_series(series, format_timestamp, price)
+    
+    # Get latest market data for AI prediction
+    latest_data = series.latest()
+    features = candle_features(latest_data)
+    
+    # Get AI prediction
+    ai_prediction = get_ai_prediction(series.symbol, features)
+    
+    return {
+        'symbol': series.symbol,
+        'timeframe': series.timeframe,
+        'analysis_timestamp': datetime.now().isoformat(),
+        'smart_money': smart_money_analysis,
+        'ai_prediction': ai_prediction,
+        'market_context': {
+            'latest_price': latest_data['close'],
+            'volume': latest_data['volume'],
+            'spread': latest_data.get('spread', 0),
+            'data_points': len(series)
+        }
+    }
+
 @market_bp.route('/api/market/subscribe', methods=['POST'])
 def subscribe_to_symbol():
     """Subscribe to market data for a symbol"""
@@ -191,8 +285,9 @@ def subscribe_to_symbol():
             return jsonify({'error': 'Symbols list is required'}), 400
         
         # Add symbols to subscription list
-        for symbol in symbols:
-            symbol_subscriptions.add(symbol.upper())
+        symbols = [symbol.upper() for symbol in symbols]
+        symbol_subscriptions.update(symbols)
+        signal_board.subscribe(symbols)
         
         return jsonify({
             'status': 'success',
@@ -227,53 +322,137 @@ def get_market_history():
         if not symbol:
             return jsonify({'error': 'Symbol is required'}), 400
         
-        # Get data from cache
-        cache_key = f"{symbol}_{timeframe}"
-        price_data = market_data_cache.get(cache_key, [])
+        # Optional range (since/until inclusive), paging cursor and field selection
+        try:
+            since = parse_optional_timestamp(request.args.get('since'))
+            until = parse_optional_timestamp(request.args.get('until'))
+            cursor = parse_optional_timestamp(request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({'error': f'Invalid timestamp: {e}'}), 400
+        
+        fields = None
+        if request.args.get('fields'):
+            fields = tuple(field.strip() for field in request.args['fields'].split(',') if field.strip())
+            unknown_fields = [field for field in fields if field not in RECORD_FIELDS]
+            if unknown_fields:
+                return jsonify({'error': f'Unknown fields: {unknown_fields}'}), 400
         
-        # Limit data
+        # Get data from cache
+        series = market_data_cache.get(symbol, timeframe)
+        if series is None:
+            return jsonify({
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'data_points': 0,
+                'data': [],
+                'last_timestamp': None,
+                'next_cursor': None,
+                'timestamp': datetime.now().isoformat()
+            })
+        
+        # ETag changes with every write to the series and differs per page and projection
+        last_timestamp = series.last_timestamp()
+        query = f"{since}|{until}|{cursor}|{limit}|{','.join(fields) if fields else ''}"
+        query_hash = hashlib.blake2s(query.encode(), digest_size=8).hexdigest()
+        etag = f"{symbol}-{timeframe}-{series.version}-{last_timestamp}-{query_hash}"
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+            response.set_etag(etag)
+            return response
+        
+        first, last = series.find_range(since=since, until=until, after=cursor)
+        next_cursor = None
         if limit > 0:
-            price_data = price_data[-limit:]
+            if since is not None or cursor is not None:
+                # Page forward from the lower bound
+                if last - first > limit:
+                    last = first + limit
+                    next_cursor = series.timestamp_at(last - 1)
+            else:
+                first = max(first, last - limit)
         
-        return jsonify({
+        price_data = series.records(first, last, fields)
+        
+        response = jsonify({
             'symbol': symbol,
             'timeframe': timeframe,
             'data_points': len(price_data),
             'data': price_data,
+            'last_timestamp': last_timestamp,
+            'next_cursor': next_cursor,
             'timestamp': datetime.now().isoformat()
         })
+        response.set_etag(etag)
+        return response
         
     except Exception as e:
         logger.error(f"Error getting market history: {e}")
         return jsonify({'error': str(e)}), 500
 
+@market_bp.route('/api/market/patterns', methods=['GET'])
+def get_market_patterns():
+    """Chart patterns found across the stored history of a symbol"""
+    try:
+        # Authenticate request
+        auth_header = request.headers.get('Authorization', '')
+        if auth_header.startswith('Bearer '):
+            token = auth_header[7:]
+            auth_result = verify_token(token)
+        else:
+            api_key = request.headers.get('X-API-Key', '')
+            auth_result = authenticate_api_key(api_key)
+        
+        if not auth_result['success']:
+            return jsonify({'error': auth_result['error']}), 401
+        
+        symbol = request.args.get('symbol')
+        timeframe = request.args.get('timeframe', 'M15')
+        if not symbol:
+            return jsonify({'error': 'Symbol is required'}), 400
+        
+        try:
+            order = int(request.args.get('order', 5))
+            tolerance = float(request.args.get('tolerance', DEFAULT_TOLERANCE))
+        except ValueError:
+            return jsonify({'error': 'order must be an integer and tolerance a number'}), 400
+        if order < 1 or tolerance <= 0:
+            return jsonify({'error': 'order and tolerance must be positive'}), 400
+        
+        series = market_data_cache.get(symbol, timeframe)
+        patterns = detect_price_patterns(series.view(), order, tolerance) if series is not None else []
+        
+        return jsonify({
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'order': order,
+            'data_points': len(series) if series is not None else 0,
+            'patterns': patterns,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error detecting market patterns: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @market_bp.route('/api/market/status', methods=['GET'])
 def get_market_status():
     """Get market data status and statistics"""
     try:
-        # Calculate statistics
-        total_symbols = len(set(key.split('_')[0] for key in market_data_cache.keys()))
-        total_data_points = sum(len(data) for data in market_data_cache.values())
-        
-        # Get latest data timestamps for each symbol
-        latest_data = {}
-        for cache_key, data in market_data_cache.items():
-            if data:
-                symbol = cache_key.split('_')[0]
-                latest_timestamp = data[-1]['timestamp']
-                if symbol not in latest_data or latest_timestamp > latest_data[symbol]:
-                    latest_data[symbol] = latest_timestamp
+        # Statistics are maintained by the store at ingest time
+        store_statistics = market_data_cache.get_statistics()
         
         return jsonify({
             'status': 'active',
             'statistics': {
-                'total_symbols': total_symbols,
-                'total_data_points': total_data_points,
+                'total_symbols': store_statistics['total_symbols'],
+                'total_data_points': store_statistics['total_data_points'],
                 'subscribed_symbols': len(symbol_subscriptions),
-                'cache_keys': len(market_data_cache)
+                'cache_keys': store_statistics['cache_keys']
             },
+            'persistence': get_market_writer_stats(),
+            'analysis_cache': analysis_cache.get_stats(),
             'subscribed_symbols': list(symbol_subscriptions),
-            'latest_data': latest_data,
+            'latest_data': store_statistics['latest_data'],
             'timestamp': datetime.now().isoformat()
         })
         
@@ -297,42 +476,13 @@ def get_trading_signals():
         if not auth_result['success']:
             return jsonify({'error': auth_result['error']}), 401
         
-        signals = []
-        
-        # Generate signals for each subscribed symbol
-        for symbol in symbol_subscriptions:
-            cache_key = f"{symbol}_M15"  # Use M15 timeframe for signals
-            price_data = market_data_cache.get(cache_key, [])
-            
-            if len(price_data) >= 50:
-                # Get latest data
-                latest_data = price_data[-1]
-                features = latest_data.get('indicators', {})
-                
-                # Add price features
-                features.update({
-                    'close': latest_data['close'],
-                    'volume': latest_data['volume'],
-                    'spread': latest_data.get('spread', 0)
-                })
-                
-                # Get AI prediction
-                prediction = get_ai_prediction(symbol, features)
-                
-                if prediction['confidence'] > 0.7:  # Only include high-confidence signals
-                    signals.append({
-                        'symbol': symbol,
-                        'signal': prediction['signal'],
-                        'confidence': prediction['confidence'],
-                        'signal_strength': prediction.get('signal_strength', 0),
-                        'market_context': prediction.get('market_context', {}),
-                        'timestamp': prediction['timestamp'],
-                        'current_price': latest_data['close']
-                    })
+        # Signals are precomputed on ingest; serve the published snapshot
+        signals, generated_at = signal_board.snapshot()
         
         return jsonify({
             'signals': signals,
             'total_signals': len(signals),
+            'generated_at': generated_at,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -341,124 +491,117 @@ def get_trading_signals():
         return jsonify({'error': str(e)}), 500
 
 # Helper functions
+def build_market_tick(data: Dict[str, Any], received_at: str) -> Dict[str, Any]:
+    """Build a validated market tick from a raw candle payload"""
+    return {
+        'symbol': data['symbol'],
+        'timeframe': data['timeframe'],
+        'timestamp': data['timestamp'],
+        'epoch': parse_timestamp(data['timestamp']),
+        'open': float(data['open']),
+        'high': float(data['high']),
+        'low': float(data['low']),
+        'close': float(data['close']),
+        'volume': int(data['volume']),
+        'spread': float(data.get('spread', 0.0)),
+        'indicators': data.get('indicators', {}),
+        'received_at': received_at
+    }
+
+def ingest_binary_market_data(payload: bytes):
+    """Decode packed candle blocks straight into the market store"""
+    try:
+        blocks = decode_candle_blocks(payload)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid binary market data: {e}'}), 400
+    
+    if not blocks:
+        return jsonify({'error': 'No data provided'}), 400
+    candle_count = sum(len(records) for _, _, records in blocks)
+    if candle_count > MAX_BATCH_CANDLES:
+        return jsonify({'error': f'Batch too large (max {MAX_BATCH_CANDLES} candles)'}), 413
+    
+    actions = {}
+    with signal_board.deferred():
+        for symbol, timeframe, records in blocks:
+            for action, count in market_data_cache.extend(symbol, timeframe, records).items():
+                actions[action] = actions.get(action, 0) + count
+    
+    persistence_dropped = queue_market_records(blocks)
+    if persistence_dropped:
+        logger.warning(f"Persistence queue full, {persistence_dropped} candles kept in memory only")
+    
+    return jsonify({
+        'status': 'success',
+        'message': 'Market data received',
+        'candles': candle_count,
+        'series': len({(symbol, timeframe) for symbol, timeframe, _ in blocks}),
+        'actions': actions,
+        'persistence_dropped': persistence_dropped,
+        'timestamp': datetime.now().isoformat()
+    })
+
+def parse_optional_timestamp(value: Optional[str]) -> Optional[int]:
+    """Parse a query-string timestamp, None when absent"""
+    if value is None or value == '':
+        return None
+    return parse_timestamp(value)
+
+def store_market_tick(market_tick: Dict[str, Any]) -> str:
+    """Upsert a market tick into the in-memory candle store"""
+    return market_data_cache.append(
+        market_tick['symbol'], market_tick['timeframe'], market_tick['epoch'],
+        market_tick['open'], market_tick['high'], market_tick['low'],
+        market_tick['close'], market_tick['volume'], market_tick['spread'],
+        market_tick['indicators']
+    )
+
 def calculate_technical_indicators(price_data: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Calculate technical indicators from price data"""
+    """Calculate technical indicators from price data
+    
+    Series in the market store already carry these values per candle (see
+    CandleSeries.latest_indicators); this helper is for ad-hoc candle lists.
+    """
     if len(price_data) < 20:
         return {}
     
-    closes = [float(candle['close']) for candle in price_data]
-    highs = [float(candle['high']) for candle in price_data]
-    lows = [float(candle['low']) for candle in price_data]
-    volumes = [int(candle['volume']) for candle in price_data]
-    
-    indicators = {}
-    
     try:
-        # Simple Moving Averages
-        if len(closes) >= 20:
-            indicators['sma_20'] = sum(closes[-20:]) / 20
-        if len(closes) >= 50:
-            indicators['sma_50'] = sum(closes[-50:]) / 50
-        
-        # RSI (simplified)
-        if len(closes) >= 14:
-            gains = []
-            losses = []
-            for i in range(1, min(15, len(closes))):
-                diff = closes[-i] - closes[-i-1]
-                if diff > 0:
-                    gains.append(diff)
-                    losses.append(0)
-                else:
-                    gains.append(0)
-                    losses.append(abs(diff))
-            
-            avg_gain = sum(gains) / len(gains) if gains else 0
-            avg_loss = sum(losses) / len(losses) if losses else 0
-            
-            if avg_loss != 0:
-                rs = avg_gain / avg_loss
-                indicators['rsi'] = 100 - (100 / (1 + rs))
-            else:
-                indicators['rsi'] = 100
-        
-        # Support and Resistance (simplified)
-        recent_highs = highs[-20:] if len(highs) >= 20 else highs
-        recent_lows = lows[-20:] if len(lows) >= 20 else lows
-        
-        indicators['resistance'] = max(recent_highs)
-        indicators['support'] = min(recent_lows)
-        
-        # Volume average
-        if len(volumes) >= 20:
-            indicators['volume_avg'] = sum(volumes[-20:]) / 20
-        
-        # ATR (simplified)
-        if len(price_data) >= 14:
-            true_ranges = []
-            for i in range(1, min(15, len(price_data))):
-                current = price_data[-i]
-                previous = price_data[-i-1]
-                
-                tr1 = current['high'] - current['low']
-                tr2 = abs(current['high'] - previous['close'])
-                tr3 = abs(current['low'] - previous['close'])
-                
-                true_ranges.append(max(tr1, tr2, tr3))
-            
-            indicators['atr'] = sum(true_ranges) / len(true_ranges)
-        
+        return calculate_indicator_snapshot(
+            (float(candle['high']), float(candle['low']), float(candle['close']), int(candle['volume']))
+            for candle in price_data
+        )
     except Exception as e:
         logger.error(f"Error calculating indicators: {e}")
-    
-    return indicators
+        return {}
 
-def detect_price_patterns(price_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Detect common price patterns"""
+def detect_price_patterns(price_data: Any, order: int = 5,
+                          tolerance: float = DEFAULT_TOLERANCE) -> List[Dict[str, Any]]:
+    """Detect double tops/bottoms, head-and-shoulders and triangles across the data
+    
+    ``price_data`` is a list of candle dicts or a mapping of column arrays
+    (e.g. CandleSeries.view()).
+    """
     patterns = []
     
     try:
-        if len(price_data) < 10:
-            return patterns
-        
-        # Look for double tops/bottoms (simplified)
-        highs = [candle['high'] for candle in price_data[-20:]]
-        lows = [candle['low'] for candle in price_data[-20:]]
-        
-        # Find recent peaks and troughs
-        peaks = []
-        troughs = []
-        
-        for i in range(2, len(highs)-2):
-            if highs[i] > highs[i-1] and highs[i] > highs[i+1] and highs[i] > highs[i-2] and highs[i] > highs[i+2]:
-                peaks.append({'index': i, 'price': highs[i]})
-            
-            if lows[i] < lows[i-1] and lows[i] < lows[i+1] and lows[i] < lows[i-2] and lows[i] < lows[i+2]:
-                troughs.append({'index': i, 'price': lows[i]})
-        
-        # Check for double tops
-        if len(peaks) >= 2:
-            last_peak = peaks[-1]
-            second_last_peak = peaks[-2]
-            
-            if abs(last_peak['price'] - second_last_peak['price']) / second_last_peak['price'] < 0.002:  # Within 0.2%
-                patterns.append({
-                    'type': 'double_top',
-                    'confidence': 0.7,
-                    'price_level': (last_peak['price'] + second_last_peak['price']) / 2
-                })
-        
-        # Check for double bottoms
-        if len(troughs) >= 2:
-            last_trough = troughs[-1]
-            second_last_trough = troughs[-2]
-            
-            if abs(last_trough['price'] - second_last_trough['price']) / second_last_trough['price'] < 0.002:  # Within 0.2%
-                patterns.append({
-                    'type': 'double_bottom',
-                    'confidence': 0.7,
-                    'price_level': (last_trough['price'] + second_last_trough['price']) / 2
-                })
+        if isinstance(price_data, dict):
+            highs, lows = price_data['high'], price_data['low']
+            timestamp_of = lambda index: format_timestamp(int(price_data['timestamp'][index]))
+        else:
+            highs = [candle['high'] for candle in price_data]
+            lows = [candle['low'] for candle in price_data]
+            timestamp_of = lambda index: price_data[index]['timestamp']
+        
+        for code, start, end, _, _, price_level, neckline, confidence in scan_patterns(
+                highs, lows, order=order, tolerance=tolerance).tolist():
+            patterns.append({
+                'type': PATTERN_NAMES[code],
+                'confidence': confidence,
+                'price_level': price_level,
+                'neckline': neckline,
+                'start': timestamp_of(start),
+                'end': timestamp_of(end)
+            })
         
     except Exception as e:
         logger.error(f"Error detecting patterns: {e}")
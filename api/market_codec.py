@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Binary wire format for SVN Trading Bot market data
+Fixed-layout little-endian candle blocks decoded straight into NumPy arrays
+"""
+
+import struct
+import numpy as np
+from typing import List, Tuple
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Content type the EA sends instead of application/json
+BINARY_CONTENT_TYPE = 'application/x-svn-candles'
+
+# Block header: magic, version, reserved, symbol, timeframe, record count
+BLOCK_MAGIC = b'SVNC'
+BLOCK_VERSION = 1
+BLOCK_HEADER = struct.Struct('<4sBB16s8sI')
+
+# One candle record (56 bytes), field names match the market store columns
+CANDLE_RECORD_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<i8'),
+    ('spread', '<f8'),
+])
+
+def decode_candle_blocks(payload: bytes) -> List[Tuple[str, str, np.ndarray]]:
+    """Decode a body of concatenated candle blocks
+
+    Each block is a header followed by ``count`` packed records. Records are
+    returned as read-only structured arrays viewing the payload, so no
+    per-candle Python objects are created. Raises ValueError on malformed input.
+    """
+    blocks = []
+    offset = 0
+    total = len(payload)
+
+    while offset < total:
+        if total - offset < BLOCK_HEADER.size:
+            raise ValueError(f"Truncated block header at byte {offset}")
+
+        magic, version, _, symbol, timeframe, count = BLOCK_HEADER.unpack_from(payload, offset)
+        if magic != BLOCK_MAGIC:
+            raise ValueError(f"Bad block magic at byte {offset}")
+        if version != BLOCK_VERSION:
+            raise ValueError(f"Unsupported block version {version}")
+        offset += BLOCK_HEADER.size
+
+        size = count * CANDLE_RECORD_DTYPE.itemsize
+        if total - offset < size:
+            raise ValueError(f"Block declares {count} records but payload is truncated")
+
+        symbol = symbol.rstrip(b'\x00').decode('ascii')
+        timeframe = timeframe.rstrip(b'\x00').decode('ascii')
+        if not symbol or not timeframe:
+            raise ValueError(f"Block at byte {offset - BLOCK_HEADER.size} has no symbol or timeframe")
+
+        records = np.frombuffer(payload, dtype=CANDLE_RECORD_DTYPE, count=count, offset=offset)
+        blocks.append((symbol, timeframe, records))
+        offset += size
+
+    return blocks
+
+def encode_candle_block(symbol: str, timeframe: str, records: np.ndarray) -> bytes:
+    """Encode one symbol/timeframe worth of candles as a binary block"""
+    records = np.asarray(records, dtype=CANDLE_RECORD_DTYPE)
+    header = BLOCK_HEADER.pack(BLOCK_MAGIC, BLOCK_VERSION, 0,
+                               symbol.encode('ascii'), timeframe.encode('ascii'),
+                               len(records))
+    return header + records.tobytes()
@@ -0,0 +1,787 @@
+#!/usr/bin/env python3
+"""
+Columnar market data store for SVN Trading Bot
+Keeps recent candles per symbol/timeframe in fixed-capacity NumPy ring buffers
+"""
+
+import threading
+import numpy as np
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Any, Optional, Tuple
+import logging
+
+from .indicators import StreamingIndicators, INDICATOR_COLUMNS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 1000
+
+# Column layout shared by every series
+CANDLE_COLUMNS = {
+    'timestamp': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.int64,
+    'spread': np.float64,
+    'received_at': np.float64,
+}
+
+# Timeframe lengths in seconds, used for server-side aggregation
+TIMEFRAME_SECONDS = {
+    'M1': 60,
+    'M5': 300,
+    'M15': 900,
+    'M30': 1800,
+    'H1': 3600,
+    'H4': 14400,
+    'D1': 86400,
+}
+DEFAULT_AGGREGATE_TIMEFRAMES = ('M5', 'M15', 'H1', 'H4', 'D1')
+
+# Keys of a materialized candle dict, in output order
+RECORD_FIELDS = ('symbol', 'timeframe', 'timestamp', 'open', 'high', 'low', 'close',
+                 'volume', 'spread', 'indicators', 'received_at')
+
+# Outcomes of upserting a candle into a series
+APPENDED = 'appended'
+UPDATED = 'updated'
+INSERTED = 'inserted'
+IGNORED = 'ignored'
+
+MT5_TIME_FORMATS = ('%Y.%m.%d %H:%M:%S', '%Y.%m.%d %H:%M', '%Y.%m.%d')
+
+def parse_timestamp(value: Any) -> int:
+    """Convert an epoch number, ISO string or MT5 time string to epoch seconds (UTC)"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return int(value)
+
+    text = str(value).strip()
+    try:
+        return int(float(text))
+    except ValueError:
+        pass
+
+    for fmt in MT5_TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt)
+            return int(parsed.replace(tzinfo=timezone.utc).timestamp())
+        except ValueError:
+            continue
+
+    parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+def format_timestamp(epoch: int) -> str:
+    """Format epoch seconds as an ISO 8601 UTC string"""
+    return datetime.fromtimestamp(int(epoch), tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+class CandleSeries:
+    """Fixed-capacity ring buffer of candles for one symbol/timeframe
+
+    Every column is allocated at twice the capacity and each value is written
+    to both halves, so the most recent N candles are always one contiguous
+    slice. Appends are O(1) and ``view`` returns NumPy views without copying.
+    Candles are kept sorted by epoch timestamp with at most one per timestamp.
+    Views are live: once the buffer wraps, later appends overwrite the oldest
+    slots, so copy a view if it has to outlive the next write.
+    """
+
+    def __init__(self, symbol: str, timeframe: str, capacity: int = DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.capacity = capacity
+        self._columns = {
+            name: np.zeros(capacity * 2, dtype=dtype)
+            for name, dtype in CANDLE_COLUMNS.items()
+        }
+        # Server-computed indicators stored next to each candle
+        self._computed = {
+            name: np.full(capacity * 2, np.nan)
+            for name in INDICATOR_COLUMNS
+        }
+        self._engine = StreamingIndicators()
+        # Client-supplied indicator dicts, mirrored like the numeric columns
+        self._indicators = np.empty(capacity * 2, dtype=object)
+        self._pos = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        # Bumped on every write; listener is called with (series, size_delta)
+        self.version = 0
+        # Bumped only when a candle older than the latest is changed or inserted
+        self.history_version = 0
+        self.listener = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def last_timestamp(self) -> Optional[int]:
+        """Epoch timestamp of the latest candle, None when empty"""
+        if self._size == 0:
+            return None
+        return int(self._columns['timestamp'][(self._pos - 1) % self.capacity])
+
+    def _notify(self, size_delta: int) -> None:
+        """Tell the listener about a write (called after the lock is released)"""
+        if self.listener is not None:
+            self.listener(self, size_delta)
+
+    def append(self, timestamp: int, open_price: float, high: float, low: float,
+               close: float, volume: int, spread: float = 0.0,
+               indicators: Optional[Dict[str, Any]] = None,
+               received_at: Optional[float] = None) -> str:
+        """Upsert one candle by its epoch timestamp
+
+        A newer timestamp is appended (overwriting the oldest candle when
+        full), a resend of the latest timestamp updates that slot in place,
+        and an older timestamp is placed at its sorted position. Returns
+        APPENDED, UPDATED, INSERTED or IGNORED.
+        """
+        if received_at is None:
+            received_at = datetime.now().timestamp()
+
+        with self._lock:
+            previous_size = self._size
+            action = self._upsert((timestamp, open_price, high, low, close,
+                                   volume, spread, received_at), indicators)
+            if action != IGNORED:
+                self.version += 1
+            size_delta = self._size - previous_size
+        if action != IGNORED:
+            self._notify(size_delta)
+        return action
+
+    def _upsert(self, values: Tuple, indicators: Optional[Dict[str, Any]]) -> str:
+        """Route one row to append, in-place update or sorted insert (caller holds the lock)"""
+        timestamp, _, high, low, close, volume = values[:6]
+        if self._size:
+            last_slot = (self._pos - 1) % self.capacity
+            last_timestamp = self._columns['timestamp'][last_slot]
+            if timestamp == last_timestamp:
+                computed = self._engine.revise(high, low, close, volume)
+                self._write(last_slot, values, indicators, computed)
+                return UPDATED
+            if timestamp < last_timestamp:
+                return self._place(values, indicators)
+
+        computed = self._engine.update(high, low, close, volume)
+        self._write(self._pos, values, indicators, computed)
+        self._pos = (self._pos + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+        return APPENDED
+
+    def _place(self, values: Tuple, indicators: Optional[Dict[str, Any]]) -> str:
+        """Update or insert an out-of-order candle (caller holds the lock)
+
+        This is the rare path: the retained window is copied, modified and
+        reloaded, and indicators are recomputed from the changed candle on.
+        """
+        timestamp = values[0]
+        timestamps = self.column('timestamp')
+        index = int(np.searchsorted(timestamps, timestamp))
+        window = self._window(None)
+        candles = {name: column[window].copy() for name, column in self._columns.items()}
+        previous = {name: column[window].copy() for name, column in self._computed.items()}
+        client = list(self._indicators[window])
+
+        if index < self._size and timestamps[index] == timestamp:
+            for column, value in zip(candles.values(), values):
+                column[index] = value
+            client[index] = indicators
+            self._reload(candles, client, previous, index, 0)
+            return UPDATED
+
+        if self._size == self.capacity and index == 0:
+            # Older than everything the buffer retains
+            return IGNORED
+
+        candles = {name: np.insert(column, index, value)
+                   for (name, column), value in zip(candles.items(), values)}
+        client.insert(index, indicators)
+        dropped = 1 if self._size == self.capacity else 0
+        if dropped:
+            candles = {name: column[1:] for name, column in candles.items()}
+            client = client[1:]
+        self._reload(candles, client, previous, index - dropped, dropped)
+        return INSERTED
+
+    def _reload(self, candles: Dict[str, np.ndarray], client: List[Any],
+                previous: Dict[str, np.ndarray], unchanged: int, dropped: int) -> None:
+        """Rewrite the buffer from logical (oldest-first) arrays and rebuild the indicator engine
+
+        The first ``unchanged`` rows keep their previously computed indicators,
+        which were derived from longer history than the buffer holds.
+        """
+        size = len(candles['timestamp'])
+        engine = StreamingIndicators()
+        computed = {name: np.empty(size) for name in INDICATOR_COLUMNS}
+        for row, (high, low, close, volume) in enumerate(zip(
+                candles['high'].tolist(), candles['low'].tolist(),
+                candles['close'].tolist(), candles['volume'].tolist())):
+            for name, value in engine.update(high, low, close, volume).items():
+                computed[name][row] = value
+        for name, values in computed.items():
+            values[:unchanged] = previous[name][dropped:dropped + unchanged]
+
+        capacity = self.capacity
+        for name, column in self._columns.items():
+            column[:size] = candles[name]
+            column[capacity:capacity + size] = candles[name]
+        for name, column in self._computed.items():
+            column[:size] = computed[name]
+            column[capacity:capacity + size] = computed[name]
+        objects = np.empty(size, dtype=object)
+        objects[:] = client
+        self._indicators[:size] = objects
+        self._indicators[capacity:capacity + size] = objects
+
+        self._engine = engine
+        self._size = size
+        self._pos = size % capacity
+        self.history_version += 1
+
+    def extend(self, records: np.ndarray, received_at: Optional[float] = None,
+               row_actions: Optional[List[str]] = None) -> Dict[str, int]:
+        """Upsert many candles at once from a structured array or dict of columns
+
+        Only the numeric columns present in ``records`` are written; missing ones
+        are zero-filled. Client indicator dicts are cleared for these rows.
+        Rows newer than the latest candle and strictly increasing take the
+        vectorized path; anything else (resends, backfill) is upserted row by row.
+        Returns a count per action; ``row_actions``, if given, receives the
+        action for every row in order.
+        """
+        actions = {APPENDED: 0, UPDATED: 0, INSERTED: 0, IGNORED: 0}
+        count = len(records['timestamp'])
+        if count == 0:
+            return actions
+        if received_at is None:
+            received_at = datetime.now().timestamp()
+
+        fields = self._record_fields(records)
+        timestamps = np.asarray(records['timestamp'], dtype=np.int64)
+
+        with self._lock:
+            previous_size = self._size
+            # Only a trailing run of rows newer than everything before them
+            # (the latest candle and every earlier row of the batch) can be
+            # bulk-appended; earlier rows are upserted
+            newest = np.empty(count, dtype=np.int64)
+            newest[0] = (self._columns['timestamp'][(self._pos - 1) % self.capacity]
+                         if self._size else np.iinfo(np.int64).min)
+            np.maximum.accumulate(timestamps[:-1], out=newest[1:])
+            np.maximum(newest[1:], newest[0], out=newest[1:])
+            bulk = timestamps > newest
+            rejected = np.flatnonzero(~bulk)
+            start = int(rejected[-1]) + 1 if len(rejected) else 0
+
+            if start:
+                columns = {name: (np.asarray(records[name][:start]).tolist() if name in fields
+                                  else [received_at if name == 'received_at' else 0] * start)
+                           for name in CANDLE_COLUMNS}
+                for values in zip(*columns.values()):
+                    action = self._upsert(values, None)
+                    actions[action] += 1
+                    if row_actions is not None:
+                        row_actions.append(action)
+            if start < count:
+                tail_records = {name: records[name][start:] for name in fields}
+                self._extend_sorted(tail_records, fields, received_at)
+                actions[APPENDED] += count - start
+                if row_actions is not None:
+                    row_actions.extend([APPENDED] * (count - start))
+            changed = actions[IGNORED] < count
+            if changed:
+                self.version += 1
+            size_delta = self._size - previous_size
+        if changed:
+            self._notify(size_delta)
+        return actions
+
+    def _extend_sorted(self, records: Dict[str, np.ndarray], fields: Tuple[str, ...],
+                       received_at: float) -> None:
+        """Vectorized append of strictly newer, increasing rows (caller holds the lock)"""
+        count = len(records['timestamp'])
+
+        # Every row goes through the indicator engine, even ones that
+        # fall outside the buffer, so warm-up state stays correct
+        computed = {name: np.empty(count) for name in INDICATOR_COLUMNS}
+        update = self._engine.update
+        for row, (high, low, close, volume) in enumerate(zip(
+                np.asarray(records['high']).tolist(), np.asarray(records['low']).tolist(),
+                np.asarray(records['close']).tolist(), np.asarray(records['volume']).tolist())):
+            for name, value in update(high, low, close, volume).items():
+                computed[name][row] = value
+
+        if count > self.capacity:
+            records = {name: records[name][-self.capacity:] for name in fields}
+            computed = {name: values[-self.capacity:] for name, values in computed.items()}
+            count = self.capacity
+
+        slots = (self._pos + np.arange(count)) % self.capacity
+        mirrors = slots + self.capacity
+        for name, column in self._columns.items():
+            if name in fields:
+                values = records[name]
+            elif name == 'received_at':
+                values = received_at
+            else:
+                values = 0
+            column[slots] = values
+            column[mirrors] = values
+        for name, column in self._computed.items():
+            column[slots] = computed[name]
+            column[mirrors] = computed[name]
+        self._indicators[slots] = None
+        self._indicators[mirrors] = None
+        self._pos = (self._pos + count) % self.capacity
+        self._size = min(self._size + count, self.capacity)
+
+    @staticmethod
+    def _record_fields(records: Any) -> Tuple[str, ...]:
+        """Column names carried by a structured array or dict of columns"""
+        names = getattr(getattr(records, 'dtype', None), 'names', None)
+        return tuple(names) if names else tuple(records.keys())
+
+    def _write(self, slot: int, values: Tuple, indicators: Optional[Dict[str, Any]],
+               computed: Dict[str, float]) -> None:
+        """Write one row into both mirrored halves of every column"""
+        mirror = slot + self.capacity
+        for column, value in zip(self._columns.values(), values):
+            column[slot] = value
+            column[mirror] = value
+        for name, column in self._computed.items():
+            column[slot] = column[mirror] = computed[name]
+        self._indicators[slot] = indicators
+        self._indicators[mirror] = indicators
+
+    def _window(self, n: Optional[int]) -> slice:
+        """Slice covering the last n candles in the mirrored buffers"""
+        if n is None or n > self._size:
+            n = self._size
+        end = self._pos + self.capacity
+        return slice(end - max(n, 0), end)
+
+    def range_view(self, start: int, end: int) -> Dict[str, np.ndarray]:
+        """Zero-copy views of candles with start <= timestamp < end"""
+        window = self._window(None)
+        timestamps = self._columns['timestamp'][window]
+        first = window.start + int(np.searchsorted(timestamps, start, side='left'))
+        last = window.start + int(np.searchsorted(timestamps, end, side='left'))
+        return {name: column[first:last] for name, column in self._columns.items()}
+
+    def column(self, name: str, n: Optional[int] = None) -> np.ndarray:
+        """Zero-copy view of the last n values of one column (oldest first)
+
+        Accepts candle columns and server-computed indicator columns.
+        """
+        column = self._columns.get(name)
+        if column is None:
+            column = self._computed[name]
+        return column[self._window(n)]
+
+    def view(self, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Zero-copy views of the last n values of every numeric column"""
+        window = self._window(n)
+        return {name: column[window] for name, column in self._columns.items()}
+
+    def computed_view(self, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Zero-copy views of the last n server-computed indicator values"""
+        window = self._window(n)
+        return {name: column[window] for name, column in self._computed.items()}
+
+    def latest_indicators(self) -> Dict[str, float]:
+        """Server-computed indicators for the most recent candle (warm-up values omitted)"""
+        if self._size == 0:
+            return {}
+        return self._computed_at(self._pos + self.capacity - 1)
+
+    def _computed_at(self, index: int) -> Dict[str, float]:
+        """Non-NaN computed indicators at one buffer position"""
+        values = {}
+        for name, column in self._computed.items():
+            value = column[index]
+            if value == value:
+                values[name] = float(value)
+        return values
+
+    def indicators(self, n: Optional[int] = None) -> np.ndarray:
+        """Client-supplied indicator dicts for the last n candles"""
+        return self._indicators[self._window(n)]
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Most recent candle as a dict, or None when empty"""
+        if self._size == 0:
+            return None
+        return self._row(self._pos + self.capacity - 1)
+
+    def _row(self, index: int) -> Dict[str, Any]:
+        """Materialize one buffer position as a candle dict"""
+        columns = self._columns
+        indicators = self._computed_at(index)
+        client_indicators = self._indicators[index]
+        if client_indicators:
+            indicators.update(client_indicators)
+        return {
+            'symbol': self.symbol,
+            'timeframe': self.timeframe,
+            'timestamp': format_timestamp(columns['timestamp'][index]),
+            'open': float(columns['open'][index]),
+            'high': float(columns['high'][index]),
+            'low': float(columns['low'][index]),
+            'close': float(columns['close'][index]),
+            'volume': int(columns['volume'][index]),
+            'spread': float(columns['spread'][index]),
+            'indicators': indicators,
+            'received_at': datetime.fromtimestamp(columns['received_at'][index]).isoformat()
+        }
+
+    def to_dicts(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Materialize the last n candles as dicts (for the JSON boundary only)"""
+        window = self._window(n)
+        return self.records(window.start, window.stop)
+
+    def find_range(self, since: Optional[int] = None, until: Optional[int] = None,
+                   after: Optional[int] = None) -> Tuple[int, int]:
+        """Buffer bounds [first, last) of candles in a timestamp range
+
+        ``since`` and ``until`` are inclusive, ``after`` is exclusive (a paging
+        cursor). Each bound is a binary search over the sorted timestamps.
+        """
+        window = self._window(None)
+        timestamps = self._columns['timestamp'][window]
+        first, last = 0, len(timestamps)
+        if since is not None:
+            first = max(first, int(np.searchsorted(timestamps, since, side='left')))
+        if after is not None:
+            first = max(first, int(np.searchsorted(timestamps, after, side='right')))
+        if until is not None:
+            last = int(np.searchsorted(timestamps, until, side='right'))
+        return window.start + first, window.start + max(first, last)
+
+    def timestamp_at(self, index: int) -> int:
+        """Epoch timestamp at a buffer position returned by find_range"""
+        return int(self._columns['timestamp'][index])
+
+    def records(self, first: int, last: int,
+                fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+        """Materialize buffer positions [first, last) as dicts, optionally only some fields
+
+        Built column by column so only the requested fields are touched.
+        """
+        fields = fields or RECORD_FIELDS
+        count = max(last - first, 0)
+        columns = []
+        for name in fields:
+            if name == 'symbol':
+                values = [self.symbol] * count
+            elif name == 'timeframe':
+                values = [self.timeframe] * count
+            elif name == 'timestamp':
+                values = [format_timestamp(epoch) for epoch in self._columns['timestamp'][first:last].tolist()]
+            elif name == 'received_at':
+                values = [datetime.fromtimestamp(epoch).isoformat()
+                          for epoch in self._columns['received_at'][first:last].tolist()]
+            elif name == 'indicators':
+                values = []
+                for index in range(first, last):
+                    indicators = self._computed_at(index)
+                    client_indicators = self._indicators[index]
+                    if client_indicators:
+                        indicators.update(client_indicators)
+                    values.append(indicators)
+            else:
+                values = self._columns[name][first:last].tolist()
+            columns.append(values)
+        return [dict(zip(fields, row)) for row in zip(*columns)]
+
+    def memory_usage(self) -> int:
+        """Bytes held by the numeric column buffers"""
+        return (sum(column.nbytes for column in self._columns.values())
+                + sum(column.nbytes for column in self._computed.values())
+                + self._indicators.nbytes)
+
+class TimeframeAggregator:
+    """Rolls one symbol's base-timeframe candles up into higher timeframes
+
+    Each target keeps the OHLCV of the *finished* base candles in its current
+    bucket; the latest base candle is pending (it may still be resent) and is
+    combined on top whenever the target bar is emitted. Emitting upserts the
+    bucket bar into the target series, so it is appended when a bucket opens
+    and updated in place until the bucket closes.
+
+    Out-of-order base candles recompute their bucket from the base series when
+    it still holds the whole bucket; otherwise they are merged into the bar
+    (high/low extended, volume added for new candles).
+    """
+
+    def __init__(self, store: 'MarketDataStore', symbol: str, base_timeframe: str,
+                 targets: Tuple[str, ...]):
+        self.store = store
+        self.symbol = symbol
+        self.base_timeframe = base_timeframe
+        self.targets = tuple(tf for tf in targets if TIMEFRAME_SECONDS[tf] > TIMEFRAME_SECONDS[base_timeframe])
+        # Per target: [bucket, open, high, low, close, volume, spread] of finished candles
+        self._state: Dict[str, Optional[List[Any]]] = {tf: None for tf in self.targets}
+        self._pending: Optional[Tuple] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bucket(timestamp: int, timeframe: str) -> int:
+        """Start of the target bucket containing timestamp"""
+        period = TIMEFRAME_SECONDS[timeframe]
+        return timestamp - timestamp % period
+
+    def on_candle(self, action: str, row: Tuple) -> None:
+        """Feed one upserted base candle (timestamp, open, high, low, close, volume, spread)"""
+        if action == IGNORED:
+            return
+        with self._lock:
+            pending = self._pending
+            if pending is None or row[0] > pending[0]:
+                if pending is not None:
+                    for timeframe in self.targets:
+                        self._fold(timeframe, pending)
+                self._pending = row
+            elif row[0] == pending[0]:
+                self._pending = row
+            else:
+                for timeframe in self.targets:
+                    self._place(timeframe, action, row)
+                return
+
+            for timeframe in self.targets:
+                self._emit(timeframe)
+
+    def _fold(self, timeframe: str, row: Tuple) -> None:
+        """Add a finished base candle to the target's bucket state"""
+        bucket = self._bucket(row[0], timeframe)
+        state = self._state[timeframe]
+        if state is None or state[0] != bucket:
+            self._state[timeframe] = [bucket, row[1], row[2], row[3], row[4], row[5], row[6]]
+        else:
+            state[2] = max(state[2], row[2])
+            state[3] = min(state[3], row[3])
+            state[4] = row[4]
+            state[5] += row[5]
+            state[6] = row[6]
+
+    def _emit(self, timeframe: str) -> None:
+        """Upsert the current bucket bar (finished candles plus pending one)"""
+        if not self.store.accepts_aggregate(self.symbol, timeframe):
+            return
+        row = self._pending
+        bucket = self._bucket(row[0], timeframe)
+        state = self._state[timeframe]
+        if state is not None and state[0] == bucket:
+            bar = (bucket, state[1], max(state[2], row[2]), min(state[3], row[3]),
+                   row[4], state[5] + row[5], row[6])
+        else:
+            bar = (bucket,) + tuple(row[1:])
+        self.store.get_or_create(self.symbol, timeframe).append(*bar)
+
+    def _place(self, timeframe: str, action: str, row: Tuple) -> None:
+        """Apply an out-of-order base candle to its (possibly closed) bucket"""
+        bucket = self._bucket(row[0], timeframe)
+        end = bucket + TIMEFRAME_SECONDS[timeframe]
+        current = self._bucket(self._pending[0], timeframe) == bucket
+        base = self.store.get(self.symbol, self.base_timeframe)
+        covered = len(base) > 0 and base.column('timestamp', base.capacity)[0] <= bucket
+
+        if current:
+            state = self._state[timeframe]
+            if covered:
+                # Rebuild finished-candle state exactly (pending is the last row)
+                rows = base.range_view(bucket, end)
+                finished = {name: values[:-1] for name, values in rows.items()}
+                self._state[timeframe] = None
+                if len(finished['timestamp']):
+                    self._state[timeframe] = [bucket, float(finished['open'][0]),
+                                              float(finished['high'].max()), float(finished['low'].min()),
+                                              float(finished['close'][-1]), int(finished['volume'].sum()),
+                                              float(finished['spread'][-1])]
+            elif state is None or state[0] != bucket:
+                self._state[timeframe] = [bucket] + list(row[1:])
+            else:
+                if row[0] == bucket:
+                    state[1] = row[1]
+                state[2] = max(state[2], row[2])
+                state[3] = min(state[3], row[3])
+                if action == INSERTED:
+                    state[5] += row[5]
+            self._emit(timeframe)
+            return
+
+        if not self.store.accepts_aggregate(self.symbol, timeframe):
+            return
+        target = self.store.get_or_create(self.symbol, timeframe)
+        if covered:
+            rows = base.range_view(bucket, end)
+            bar = (bucket, float(rows['open'][0]), float(rows['high'].max()), float(rows['low'].min()),
+                   float(rows['close'][-1]), int(rows['volume'].sum()), float(rows['spread'][-1]))
+        else:
+            existing = target.range_view(bucket, bucket + 1)
+            if not len(existing['timestamp']):
+                bar = (bucket,) + tuple(row[1:])
+            else:
+                volume = int(existing['volume'][0]) + (row[5] if action == INSERTED else 0)
+                bar = (bucket, row[1] if row[0] == bucket else float(existing['open'][0]),
+                       max(float(existing['high'][0]), row[2]), min(float(existing['low'][0]), row[3]),
+                       float(existing['close'][0]), volume, float(existing['spread'][0]))
+        target.append(*bar)
+
+class MarketDataStore:
+    """Registry of candle series keyed by (symbol, timeframe)
+
+    When ``aggregate_from`` is set, candles of that timeframe are rolled up
+    server-side into each of ``aggregate_to`` for the same symbol, unless a
+    terminal pushes that higher timeframe directly.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, aggregate_from: Optional[str] = None,
+                 aggregate_to: Tuple[str, ...] = DEFAULT_AGGREGATE_TIMEFRAMES):
+        if aggregate_from is not None and aggregate_from not in TIMEFRAME_SECONDS:
+            raise ValueError(f"Unknown timeframe: {aggregate_from}")
+        self.capacity = capacity
+        self.aggregate_from = aggregate_from
+        self.aggregate_to = tuple(aggregate_to)
+        self._series: Dict[Tuple[str, str], CandleSeries] = {}
+        self._aggregators: Dict[str, TimeframeAggregator] = {}
+        # Series fed directly by terminals; aggregation never overwrites them
+        self._direct = set()
+        self._lock = threading.Lock()
+
+        # Status aggregates maintained at write time
+        self._symbols = set()
+        self._total_candles = 0
+        self._watermarks: Dict[str, int] = {}
+        self._latest_data: Dict[str, str] = {}
+        self._stats_lock = threading.Lock()
+        self._listeners: List[Callable[[CandleSeries], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self._series
+
+    def get(self, symbol: str, timeframe: str) -> Optional[CandleSeries]:
+        """Get the series for symbol/timeframe if it exists"""
+        return self._series.get((symbol, timeframe))
+
+    def get_or_create(self, symbol: str, timeframe: str) -> CandleSeries:
+        """Get the series for symbol/timeframe, creating it on first use"""
+        key = (symbol, timeframe)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.get(key)
+                if series is None:
+                    series = CandleSeries(symbol, timeframe, self.capacity)
+                    series.listener = self._on_series_change
+                    self._series[key] = series
+                    self._symbols.add(symbol)
+        return series
+
+    def _on_series_change(self, series: CandleSeries, size_delta: int) -> None:
+        """Keep candle count and per-symbol latest-timestamp watermark current"""
+        latest = series.last_timestamp()
+        with self._stats_lock:
+            self._total_candles += size_delta
+            if latest is not None and latest > self._watermarks.get(series.symbol, -1):
+                self._watermarks[series.symbol] = latest
+                self._latest_data[series.symbol] = format_timestamp(latest)
+        for listener in self._listeners:
+            listener(series)
+
+    def add_listener(self, listener: Callable[[CandleSeries], None]) -> None:
+        """Register a callback run after every write to any series"""
+        self._listeners.append(listener)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Store-wide counters, independent of how many series exist"""
+        with self._stats_lock:
+            return {
+                'total_symbols': len(self._symbols),
+                'total_data_points': self._total_candles,
+                'cache_keys': len(self._series),
+                'latest_data': dict(self._latest_data)
+            }
+
+    def append(self, symbol: str, timeframe: str, timestamp: Any, open_price: float,
+               high: float, low: float, close: float, volume: int, spread: float = 0.0,
+               indicators: Optional[Dict[str, Any]] = None) -> str:
+        """Upsert one candle into its series, returning the action taken"""
+        self._mark_direct(symbol, timeframe)
+        series = self.get_or_create(symbol, timeframe)
+        timestamp = parse_timestamp(timestamp)
+        action = series.append(timestamp, open_price, high, low, close,
+                               volume, spread, indicators)
+        aggregator = self._aggregator(symbol, timeframe)
+        if aggregator is not None:
+            aggregator.on_candle(action, (timestamp, float(open_price), float(high), float(low),
+                                          float(close), int(volume), float(spread)))
+        return action
+
+    def extend(self, symbol: str, timeframe: str, records: np.ndarray) -> Dict[str, int]:
+        """Upsert many candles (structured array or dict of columns) into their series"""
+        self._mark_direct(symbol, timeframe)
+        series = self.get_or_create(symbol, timeframe)
+        aggregator = self._aggregator(symbol, timeframe)
+        if aggregator is None:
+            return series.extend(records)
+
+        row_actions = []
+        actions = series.extend(records, row_actions=row_actions)
+        count = len(row_actions)
+        fields = CandleSeries._record_fields(records)
+        columns = [np.asarray(records[name]).tolist() if name in fields else [0] * count
+                   for name in ('timestamp', 'open', 'high', 'low', 'close', 'volume', 'spread')]
+        for action, row in zip(row_actions, zip(*columns)):
+            aggregator.on_candle(action, row)
+        return actions
+
+    def _mark_direct(self, symbol: str, timeframe: str) -> None:
+        """Remember that a terminal feeds this series itself"""
+        if timeframe != self.aggregate_from and (symbol, timeframe) not in self._direct:
+            self._direct.add((symbol, timeframe))
+
+    def accepts_aggregate(self, symbol: str, timeframe: str) -> bool:
+        """Whether server-side aggregation may write this series"""
+        return (symbol, timeframe) not in self._direct
+
+    def _aggregator(self, symbol: str, timeframe: str) -> Optional[TimeframeAggregator]:
+        """Aggregator for a base-timeframe series, None for any other series"""
+        if timeframe != self.aggregate_from:
+            return None
+        aggregator = self._aggregators.get(symbol)
+        if aggregator is None:
+            with self._lock:
+                aggregator = self._aggregators.get(symbol)
+                if aggregator is None:
+                    aggregator = TimeframeAggregator(self, symbol, timeframe, self.aggregate_to)
+                    self._aggregators[symbol] = aggregator
+        return aggregator
+
+    def keys(self) -> List[Tuple[str, str]]:
+        """All (symbol, timeframe) keys"""
+        return list(self._series.keys())
+
+    def items(self) -> List[Tuple[Tuple[str, str], CandleSeries]]:
+        """All ((symbol, timeframe), series) pairs"""
+        return list(self._series.items())
+
+    def memory_usage(self) -> int:
+        """Bytes held by all series buffers"""
+        return sum(series.memory_usage() for series in self._series.values())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Model registry for SVN Trading Bot
+Tracks the active AIModel record, with a local file cache for cold starts
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+import logging
+
+try:
+    from .database import save_ai_model, load_active_ai_model
+except ImportError:
+    # For standalone execution
+    from database import save_ai_model, load_active_ai_model
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODEL_CACHE_PATH = os.environ.get('AI_MODEL_CACHE', os.path.join(tempfile.gettempdir(), 'svn_ai_model.json'))
+
+def _identity(record: Dict[str, Any]) -> tuple:
+    """What distinguishes one stored model state from another"""
+    return (record.get('name'), record.get('version'), record.get('last_trained'),
+            json.dumps(record.get('weights'), sort_keys=True))
+
+class ModelRegistry:
+    """The active model record and how it reaches the predictor
+
+    ``start`` activates the file-cached record straight away, then fetches
+    the active AIModel row from the database (in the background by default)
+    and activates it if it differs. Activation hands the record to
+    ``install``, which must build the new model completely and publish it
+    with a single reference assignment: predictions never take a lock and
+    ones already running finish on the model they started with. The lock
+    here only serializes activations, saves and cache writes.
+    """
+
+    def __init__(self, name: str, cache_path: Optional[str] = MODEL_CACHE_PATH,
+                 install: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.name = name
+        self.cache_path = cache_path
+        self.install = install
+        self.active: Optional[Dict[str, Any]] = None
+        self.source: Optional[str] = None
+        self.activated_at: Optional[str] = None
+        self.swaps = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def start(self, background: bool = True) -> None:
+        """Activate the cached model, then refresh from the database"""
+        cached = self._read_cache()
+        if cached is not None:
+            self.activate(cached, source='file')
+        if background:
+            threading.Thread(target=self.refresh, daemon=True).start()
+        else:
+            self.refresh()
+
+    def refresh(self) -> bool:
+        """Activate the database's active model if it is not the one serving"""
+        try:
+            record = asyncio.run(load_active_ai_model())
+        except Exception as e:
+            logger.error(f"Error loading active model: {e}")
+            return False
+        if not record:
+            return False
+        active = self.active
+        if active is not None and _identity(record) == _identity(active):
+            return False
+        return self.activate(record, source='database')
+
+    def activate(self, record: Dict[str, Any], source: str = 'manual') -> bool:
+        """Install a model record and make it the active one"""
+        with self._lock:
+            try:
+                if self.install is not None:
+                    self.install(record)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Error activating model {record.get('name')} {record.get('version')}: {e}")
+                return False
+            self.active = record
+            self.source = source
+            self.activated_at = datetime.now().isoformat()
+            self.swaps += 1
+            if source != 'file':
+                self._write_cache(record)
+        logger.info(f"Activated model {record.get('name')} {record.get('version')} from {source}")
+        return True
+
+    def save(self, record: Dict[str, Any]) -> bool:
+        """Persist the serving model's current state to the database and file cache
+
+        The record is not installed: it describes weights the predictor
+        already has (e.g. learned online), so a later ``refresh`` that finds
+        it in the database is a no-op.
+        """
+        try:
+            saved = asyncio.run(save_ai_model(record))
+        except Exception as e:
+            logger.error(f"Error saving model: {e}")
+            return False
+        if not saved:
+            logger.error(f"Failed to save model {record.get('name')}")
+            return False
+        with self._lock:
+            # A model activated while this save was running stays active
+            active = self.active
+            if active is None or active.get('version') == record.get('version'):
+                self.active = record
+                self._write_cache(record)
+        return True
+
+    def _read_cache(self) -> Optional[Dict[str, Any]]:
+        """Record from the local file cache, if present and for this model"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading model cache {self.cache_path}: {e}")
+            return None
+        if not isinstance(record, dict) or record.get('name') != self.name:
+            return None
+        return record
+
+    def _write_cache(self, record: Dict[str, Any]) -> None:
+        """Replace the file cache atomically (caller holds the lock)"""
+        if not self.cache_path:
+            return
+        try:
+            directory = os.path.dirname(self.cache_path) or '.'
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.model-', suffix='.json')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(record, f)
+            os.replace(temp_path, self.cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Error writing model cache {self.cache_path}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Active model and swap counters"""
+        active = self.active or {}
+        return {
+            'name': self.name,
+            'active_version': active.get('version'),
+            'last_trained': active.get('last_trained'),
+            'source': self.source,
+            'activated_at': self.activated_at,
+            'swaps': self.swaps,
+            'failures': self.failures,
+            'cache_path': self.cache_path
+        }
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Chart pattern detection for SVN Trading Bot
+Vectorized swing-point extraction and a full-history scanner for double
+tops/bottoms, head-and-shoulders and triangles
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Iterable, Optional
+import logging
+
+from .indicators import as_float_array
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Swing kinds
+PEAK = 1
+TROUGH = -1
+
+# One swing point: candle index, its high (peak) or low (trough), and kind
+SWING_DTYPE = np.dtype([
+    ('index', 'i8'),
+    ('price', 'f8'),
+    ('kind', 'i1'),
+])
+
+# Pattern codes stored in the ``pattern`` field, indexing PATTERN_NAMES
+DOUBLE_TOP = 0
+DOUBLE_BOTTOM = 1
+HEAD_AND_SHOULDERS = 2
+INVERSE_HEAD_AND_SHOULDERS = 3
+ASCENDING_TRIANGLE = 4
+DESCENDING_TRIANGLE = 5
+SYMMETRICAL_TRIANGLE = 6
+PATTERN_NAMES = ('double_top', 'double_bottom', 'head_and_shoulders', 'inverse_head_and_shoulders',
+                 'ascending_triangle', 'descending_triangle', 'symmetrical_triangle')
+
+# One detected pattern: first and last swing candle, the level it forms
+# (the matched tops/bottoms, the head, or the flat side) and its neckline
+# (the level between, or the opposite side for triangles)
+PATTERN_DTYPE = np.dtype([
+    ('pattern', 'i1'),
+    ('start', 'i8'),
+    ('end', 'i8'),
+    ('start_time', 'i8'),
+    ('end_time', 'i8'),
+    ('price_level', 'f8'),
+    ('neckline', 'f8'),
+    ('confidence', 'f8'),
+])
+
+# Relative difference under which two swing prices count as equal
+DEFAULT_TOLERANCE = 0.002
+
+def _strict_extrema(values: np.ndarray, order: int, maximum: bool) -> np.ndarray:
+    """Indices strictly above (or below) the ``order`` values on each side"""
+    count = len(values)
+    if order < 1 or count < 2 * order + 1:
+        return np.empty(0, dtype=np.int64)
+    windows = sliding_window_view(values, order)
+    # windows[k] covers values[k:k + order]
+    if maximum:
+        side = windows.max(axis=1)
+    else:
+        side = windows.min(axis=1)
+    centre = values[order:count - order]
+    left = side[:count - 2 * order]
+    right = side[order + 1:]
+    hits = centre > np.maximum(left, right) if maximum else centre < np.minimum(left, right)
+    return np.flatnonzero(hits) + order
+
+def pattern_swings(highs: Iterable[float], lows: Iterable[float], order: int = 5) -> np.ndarray:
+    """Alternating peaks and troughs over the whole series, for pattern matching
+
+    A peak is a high strictly above the ``order`` highs on either side, a
+    trough a low strictly below the ``order`` lows on either side. Runs of
+    consecutive peaks (or troughs) are collapsed to their most extreme
+    member, so the result alternates. Returns a SWING_DTYPE array in
+    candle order.
+
+    Unlike ``smart_money.swing_points``, which marks liquidity levels and so
+    keeps ties (every bar of a flat top), skips a margin at each end and
+    handles highs and lows separately, patterns need one point per turn
+    with strictly alternating kinds.
+    """
+    highs = as_float_array(highs)
+    lows = as_float_array(lows)
+    peaks = _strict_extrema(highs, order, True)
+    troughs = _strict_extrema(lows, order, False)
+
+    swings = np.empty(len(peaks) + len(troughs), dtype=SWING_DTYPE)
+    swings['index'] = np.concatenate((peaks, troughs))
+    swings['price'] = np.concatenate((highs[peaks], lows[troughs]))
+    swings['kind'] = np.concatenate((np.full(len(peaks), PEAK), np.full(len(troughs), TROUGH)))
+    if len(swings) == 0:
+        return swings
+    # Peak before trough on the same candle keeps the result deterministic
+    swings = swings[np.lexsort((-swings['kind'], swings['index']))]
+
+    # Collapse runs of the same kind to the most extreme swing in each run
+    kind = swings['kind']
+    run = np.concatenate(([0], np.cumsum(kind[1:] != kind[:-1])))
+    strength = swings['price'] * kind
+    order_in_run = np.lexsort((swings['index'], -strength, run))
+    first = np.concatenate(([True], run[order_in_run][1:] != run[order_in_run][:-1]))
+    keep = np.sort(order_in_run[first])
+    return swings[keep]
+
+def _relative_gap(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """|a - b| relative to their mean"""
+    return np.abs(a - b) / ((np.abs(a) + np.abs(b)) / 2)
+
+def _patterns(code: int, mask: np.ndarray, first: np.ndarray, last: np.ndarray, swings: np.ndarray,
+              timestamps: Optional[np.ndarray], level: np.ndarray, neckline: np.ndarray,
+              confidence: np.ndarray) -> np.ndarray:
+    """Pack the windows selected by ``mask`` into a PATTERN_DTYPE array"""
+    hits = np.flatnonzero(mask)
+    patterns = np.empty(len(hits), dtype=PATTERN_DTYPE)
+    patterns['pattern'] = code
+    patterns['start'] = swings['index'][first[hits]]
+    patterns['end'] = swings['index'][last[hits]]
+    if timestamps is None:
+        patterns['start_time'] = patterns['start']
+        patterns['end_time'] = patterns['end']
+    else:
+        patterns['start_time'] = timestamps[patterns['start']]
+        patterns['end_time'] = timestamps[patterns['end']]
+    patterns['price_level'] = level[hits]
+    patterns['neckline'] = neckline[hits]
+    patterns['confidence'] = confidence[hits]
+    return patterns
+
+def scan_patterns(highs: Iterable[float], lows: Iterable[float], timestamps: Optional[np.ndarray] = None,
+                  order: int = 5, tolerance: float = DEFAULT_TOLERANCE,
+                  swings: Optional[np.ndarray] = None) -> np.ndarray:
+    """Every double top/bottom, head-and-shoulders and triangle across the series
+
+    Patterns are matched on windows of consecutive alternating swings, all
+    windows at once:
+
+    * double top / bottom: peak, trough, peak (or the mirror) with the two
+      outer swings within ``tolerance`` of each other
+    * head-and-shoulders (and inverse): five swings where the middle peak
+      tops both shoulders, shoulders within 5 * ``tolerance`` and the
+      neckline troughs within 5 * ``tolerance``
+    * triangles: two peaks and two troughs; ascending has flat tops and
+      rising bottoms, descending flat bottoms and falling tops, symmetrical
+      falling tops and rising bottoms
+
+    Confidence falls from 0.9 to 0.5 as the matched levels drift apart
+    within their tolerance. Returns a PATTERN_DTYPE array sorted by end.
+    """
+    highs = as_float_array(highs)
+    lows = as_float_array(lows)
+    if timestamps is not None:
+        timestamps = np.asarray(timestamps)
+    if swings is None:
+        swings = pattern_swings(highs, lows, order)
+
+    price = swings['price']
+    kind = swings['kind']
+    count = len(swings)
+    found = [np.empty(0, dtype=PATTERN_DTYPE)]
+
+    def confidence(gap: np.ndarray, limit: float) -> np.ndarray:
+        return 0.9 - 0.4 * np.clip(gap / limit, 0, 1)
+
+    if count >= 3:
+        a, b, c = price[:-2], price[1:-1], price[2:]
+        first = np.arange(count - 2)
+        last = first + 2
+        gap = _relative_gap(a, c)
+        matched = gap < tolerance
+        top = kind[:-2] == PEAK
+        level = (a + c) / 2
+        found.append(_patterns(DOUBLE_TOP, matched & top, first, last, swings, timestamps,
+                               level, b, confidence(gap, tolerance)))
+        found.append(_patterns(DOUBLE_BOTTOM, matched & ~top, first, last, swings, timestamps,
+                               level, b, confidence(gap, tolerance)))
+
+    if count >= 5:
+        left, neck_left, head, neck_right, right = (price[k:count - 4 + k] for k in range(5))
+        first = np.arange(count - 4)
+        last = first + 4
+        shoulder_limit = 5 * tolerance
+        shoulder_gap = _relative_gap(left, right)
+        neck_gap = _relative_gap(neck_left, neck_right)
+        top = kind[:-4] == PEAK
+        shaped = (shoulder_gap < shoulder_limit) & (neck_gap < shoulder_limit)
+        head_out = np.where(top, (head > left) & (head > right), (head < left) & (head < right))
+        neckline = (neck_left + neck_right) / 2
+        score = confidence(np.maximum(shoulder_gap, neck_gap), shoulder_limit)
+        found.append(_patterns(HEAD_AND_SHOULDERS, shaped & head_out & top, first, last, swings,
+                               timestamps, head, neckline, score))
+        found.append(_patterns(INVERSE_HEAD_AND_SHOULDERS, shaped & head_out & ~top, first, last, swings,
+                               timestamps, head, neckline, score))
+
+    if count >= 4:
+        first = np.arange(count - 3)
+        last = first + 3
+        starts_high = kind[:-3] == PEAK
+        even, odd = price[:-3], price[1:-2]
+        even_next, odd_next = price[2:-1], price[3:]
+        top_1 = np.where(starts_high, even, odd)
+        top_2 = np.where(starts_high, even_next, odd_next)
+        bottom_1 = np.where(starts_high, odd, even)
+        bottom_2 = np.where(starts_high, odd_next, even_next)
+
+        top_gap = _relative_gap(top_1, top_2)
+        bottom_gap = _relative_gap(bottom_1, bottom_2)
+        flat_top = top_gap < tolerance
+        flat_bottom = bottom_gap < tolerance
+        rising_bottom = (bottom_2 > bottom_1) & ~flat_bottom
+        falling_top = (top_2 < top_1) & ~flat_top
+        top_level = (top_1 + top_2) / 2
+        bottom_level = (bottom_1 + bottom_2) / 2
+
+        found.append(_patterns(ASCENDING_TRIANGLE, flat_top & rising_bottom, first, last, swings,
+                               timestamps, top_level, bottom_2, confidence(top_gap, tolerance)))
+        found.append(_patterns(DESCENDING_TRIANGLE, flat_bottom & falling_top, first, last, swings,
+                               timestamps, bottom_level, top_2, confidence(bottom_gap, tolerance)))
+        convergence = np.minimum(top_1 - top_2, bottom_2 - bottom_1) / np.maximum(top_1 - bottom_1, 1e-12)
+        found.append(_patterns(SYMMETRICAL_TRIANGLE, falling_top & rising_bottom, first, last, swings,
+                               timestamps, top_2, bottom_2, 0.5 + 0.4 * np.clip(convergence * 4, 0, 1)))
+
+    patterns = np.concatenate(found)
+    return patterns[np.lexsort((patterns['pattern'], patterns['end']))]
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Prediction store for SVN Trading Bot
+Bounded in-memory record of recent predictions, looked up by prediction ID
+when trade feedback arrives
+"""
+
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class PredictionRecord:
+    """One served prediction and, once reported, its outcome
+
+    ``feature_vector`` is the normalized vector the prediction was made
+    from, held as a float array rather than a list.
+    """
+
+    __slots__ = ('symbol', 'timeframe', 'prediction', 'confidence', 'feature_vector', 'created',
+                 'expires', 'actual_result', 'profit', 'feedback_time')
+
+    def __init__(self, symbol: str, timeframe: str, prediction: int, confidence: float,
+                 feature_vector: Optional[Iterable[float]] = None):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.prediction = prediction
+        self.confidence = confidence
+        self.feature_vector = array('d', feature_vector) if feature_vector else None
+        self.created = time.time()
+        self.expires = 0.0
+        self.actual_result = None
+        self.profit = None
+        self.feedback_time = None
+
+class PredictionStore:
+    """Predictions by ID, expiring after ``ttl`` seconds, at most ``max_entries`` kept
+
+    Entries are kept in least-recently-used order: a lookup moves an entry
+    to the back, and inserts evict from the front, first anything expired,
+    then the least recently used once the store is full. An expired entry
+    that is not at the front is dropped when it is next looked up.
+    """
+
+    def __init__(self, max_entries: int = 100000, ttl: float = 7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._records: 'OrderedDict[str, PredictionRecord]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.inserts = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def put(self, prediction_id: str, record: PredictionRecord) -> None:
+        """Store a prediction, evicting expired and least recently used entries"""
+        record.expires = time.monotonic() + self.ttl
+        with self._lock:
+            records = self._records
+            records[prediction_id] = record
+            records.move_to_end(prediction_id)
+            self.inserts += 1
+            now = time.monotonic()
+            while records:
+                oldest = next(iter(records.values()))
+                if oldest.expires <= now:
+                    self.expired += 1
+                elif len(records) > self.max_entries:
+                    self.evicted += 1
+                else:
+                    break
+                records.popitem(last=False)
+
+    def get(self, prediction_id: Optional[str]) -> Optional[PredictionRecord]:
+        """The stored prediction, or None if unknown or expired"""
+        with self._lock:
+            record = self._records.get(prediction_id)
+            if record is None:
+                self.misses += 1
+                return None
+            if record.expires <= time.monotonic():
+                del self._records[prediction_id]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._records.move_to_end(prediction_id)
+            self.hits += 1
+            return record
+
+    def record_feedback(self, prediction_id: str, actual_result: float,
+                        profit: float) -> Optional[PredictionRecord]:
+        """Attach a trade outcome to its prediction; None if it is no longer stored"""
+        record = self.get(prediction_id)
+        if record is not None:
+            record.actual_result = actual_result
+            record.profit = profit
+            record.feedback_time = time.time()
+        return record
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Size, lookup and eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._records),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'inserts': self.inserts,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'evicted': self.evicted,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
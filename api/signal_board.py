@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Signal board for SVN Trading Bot
+Keeps the latest trading signal per subscribed symbol, re-evaluated on ingest
+"""
+
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Any, Tuple
+import logging
+
+from .market_store import MarketDataStore, CandleSeries
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def candle_features(latest_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Prediction features for a candle: its indicators plus price action"""
+    features = dict(latest_data.get('indicators', {}))
+    features.update({
+        'close': latest_data['close'],
+        'volume': latest_data['volume'],
+        'spread': latest_data.get('spread', 0),
+    })
+    return features
+
+class SignalBoard:
+    """Precomputed signals for subscribed symbols
+
+    A symbol is re-evaluated only when a write lands on its signal timeframe
+    series; inside ``deferred()`` that waits until the block ends, so a
+    batch ingest costs one evaluation per changed series rather than one
+    per candle. Each evaluation publishes a new (signals, published_at)
+    tuple in a single assignment; readers get that tuple as-is and must
+    treat it (and the dicts in it) as read-only.
+    """
+
+    def __init__(self, store: MarketDataStore, predict: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+                 timeframe: str = 'M15', min_candles: int = 50, min_confidence: float = 0.7):
+        self.store = store
+        self.predict = predict
+        self.timeframe = timeframe
+        self.min_candles = min_candles
+        self.min_confidence = min_confidence
+
+        self._subscriptions = set()
+        self._signals: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        self._board: Tuple[Tuple[Dict[str, Any], ...], str] = ((), datetime.now().isoformat())
+        self._lock = threading.Lock()
+        # Series changed inside deferred() on this thread, by symbol
+        self._local = threading.local()
+        self.evaluations = 0
+
+        store.add_listener(self._on_series_change)
+
+    def subscribe(self, symbols: List[str]) -> None:
+        """Track symbols and evaluate them against the data already stored"""
+        with self._lock:
+            self._subscriptions.update(symbols)
+        for symbol in symbols:
+            series = self.store.get(symbol, self.timeframe)
+            if series is not None:
+                self._evaluate(series)
+
+    def snapshot(self) -> Tuple[Tuple[Dict[str, Any], ...], str]:
+        """Current signals and the time they were published"""
+        return self._board
+
+    @contextmanager
+    def deferred(self) -> Iterator[None]:
+        """Hold evaluations for writes made by this thread until the block ends"""
+        pending = getattr(self._local, 'pending', None)
+        if pending is not None:
+            yield  # Nested: the outermost block evaluates
+            return
+        pending = self._local.pending = {}
+        try:
+            yield
+        finally:
+            self._local.pending = None
+            for series in pending.values():
+                self._evaluate(series)
+
+    def _on_series_change(self, series: CandleSeries) -> None:
+        """Store listener: re-evaluate subscribed symbols on their signal timeframe"""
+        if series.timeframe == self.timeframe and series.symbol in self._subscriptions:
+            pending = getattr(self._local, 'pending', None)
+            if pending is not None:
+                pending[series.symbol] = series
+            else:
+                self._evaluate(series)
+
+    def _evaluate(self, series: CandleSeries) -> None:
+        """Score the latest candle of a series and republish the board if it changed"""
+        symbol = series.symbol
+        version = series.version
+        if self._versions.get(symbol) == version:
+            return
+
+        signal = None
+        if len(series) >= self.min_candles:
+            latest_data = series.latest()
+            try:
+                prediction = self.predict(symbol, candle_features(latest_data))
+            except Exception as e:
+                logger.error(f"Error evaluating signal for {symbol}: {e}")
+                return
+            self.evaluations += 1
+
+            if prediction['confidence'] > self.min_confidence:  # Only include high-confidence signals
+                signal = {
+                    'symbol': symbol,
+                    'signal': prediction['signal'],
+                    'confidence': prediction['confidence'],
+                    'signal_strength': prediction.get('signal_strength', 0),
+                    'market_context': prediction.get('market_context', {}),
+                    'timestamp': prediction['timestamp'],
+                    'current_price': latest_data['close']
+                }
+
+        with self._lock:
+            if self._versions.get(symbol, -1) > version:
+                return  # A newer evaluation already published
+            self._versions[symbol] = version
+            previous = self._signals.pop(symbol, None)
+            if signal is not None:
+                self._signals[symbol] = signal
+            if signal is not None or previous is not None:
+                self._board = (tuple(self._signals.values()), datetime.now().isoformat())
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Smart Money Concepts kernels for SVN Trading Bot
+Array-based swing, sweep and zone detection used by SmartMoneyAnalyzer
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from bisect import bisect_right
+from typing import Iterable, List, Optional, Tuple
+import logging
+
+try:
+    from .indicators import as_float_array
+except ImportError:
+    # For standalone execution
+    from indicators import as_float_array
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Swing points need ``SWING_RADIUS`` candles on each side and are only taken
+# from ``SWING_MARGIN`` candles in from either end of the history
+SWING_RADIUS = 5
+SWING_MARGIN = 10
+
+# Zone direction codes stored in the ``kind`` field
+BULLISH = 1
+BEARISH = -1
+ZONE_KINDS = {BULLISH: 'bullish', BEARISH: 'bearish'}
+
+# One detected zone: price band, index of the candle that confirmed it and
+# that candle's timestamp
+ZONE_DTYPE = np.dtype([
+    ('kind', 'i1'),
+    ('upper', 'f8'),
+    ('lower', 'f8'),
+    ('index', 'i8'),
+    ('timestamp', 'i8'),
+])
+
+# Close beyond the previous candle's range by this fraction marks an order block
+ORDER_BLOCK_THRESHOLD = 0.001
+
+# An untaken swing high (kind BULLISH side = buy-side liquidity above price)
+# or swing low (BEARISH = sell-side liquidity below price)
+LIQUIDITY_DTYPE = np.dtype([
+    ('kind', 'i1'),
+    ('price', 'f8'),
+    ('index', 'i8'),
+    ('timestamp', 'i8'),
+])
+
+# A swing level that price traded through
+SWEEP_DTYPE = np.dtype([
+    ('kind', 'i1'),
+    ('price', 'f8'),
+    ('timestamp', 'i8'),
+    ('swept_at', 'i8'),
+])
+
+# Zone source codes for mitigated zones
+ORDER_BLOCK = 0
+FAIR_VALUE_GAP = 1
+
+# An active zone tagged with where it came from
+ACTIVE_ZONE_DTYPE = np.dtype(ZONE_DTYPE.descr + [('source', 'i1')])
+
+# A zone that price traded through, and when
+MITIGATION_DTYPE = np.dtype(ACTIVE_ZONE_DTYPE.descr + [('mitigated_at', 'i8')])
+
+# Sweeps and mitigations remembered per series
+EVENT_HISTORY = 50
+
+# Candles consumed per vectorized step when catching up on a long backlog
+STATE_CHUNK = 1024
+
+def _zones(kind: np.ndarray, upper: np.ndarray, lower: np.ndarray, index: np.ndarray,
+           timestamps: Optional[np.ndarray]) -> np.ndarray:
+    """Pack zone columns into a ZONE_DTYPE array"""
+    zones = np.empty(len(index), dtype=ZONE_DTYPE)
+    zones['kind'] = kind
+    zones['upper'] = upper
+    zones['lower'] = lower
+    zones['index'] = index
+    zones['timestamp'] = index if timestamps is None else np.asarray(timestamps)[index]
+    return zones
+
+def order_blocks(highs: Iterable[float], lows: Iterable[float], closes: Iterable[float],
+                 timestamps: Optional[np.ndarray] = None, start: int = 1,
+                 threshold: float = ORDER_BLOCK_THRESHOLD) -> np.ndarray:
+    """Order blocks: the previous candle's range when a close breaks out of it
+
+    A close above the previous high by ``threshold`` leaves a bullish block,
+    a close below the previous low a bearish one. Candles before ``start``
+    are not scanned. Returns a ZONE_DTYPE array in candle order.
+    """
+    highs = as_float_array(highs)
+    lows = as_float_array(lows)
+    closes = as_float_array(closes)
+    start = max(start, 1)
+    if len(closes) <= start:
+        return np.empty(0, dtype=ZONE_DTYPE)
+
+    current = closes[start:]
+    previous_high = highs[start - 1:-1]
+    previous_low = lows[start - 1:-1]
+    bullish = current > previous_high * (1 + threshold)
+    bearish = current < previous_low * (1 - threshold)
+
+    hits = np.flatnonzero(bullish | bearish)
+    index = hits + start
+    return _zones(np.where(bullish[hits], BULLISH, BEARISH), previous_high[hits],
+                  previous_low[hits], index, timestamps)
+
+def fair_value_gaps(highs: Iterable[float], lows: Iterable[float],
+                    timestamps: Optional[np.ndarray] = None, start: int = 2) -> np.ndarray:
+    """Fair value gaps: three-candle imbalances between candle i-2 and candle i
+
+    Bullish when high[i-2] < low[i], bearish when low[i-2] > high[i]. Returns
+    a ZONE_DTYPE array in candle order, the zone being the untraded gap.
+    """
+    highs = as_float_array(highs)
+    lows = as_float_array(lows)
+    start = max(start, 2)
+    if len(highs) <= start:
+        return np.empty(0, dtype=ZONE_DTYPE)
+
+    first_high = highs[start - 2:-2]
+    first_low = lows[start - 2:-2]
+    third_high = highs[start:]
+    third_low = lows[start:]
+    bullish = first_high < third_low
+    bearish = first_low > third_high
+
+    hits = np.flatnonzero(bullish | bearish)
+    up = bullish[hits]
+    return _zones(np.where(up, BULLISH, BEARISH),
+                  np.where(up, third_low[hits], first_low[hits]),
+                  np.where(up, first_high[hits], third_high[hits]),
+                  hits + start, timestamps)
+
+def swing_points(values: Iterable[float], maximum: bool = True,
+                 radius: int = SWING_RADIUS, margin: int = SWING_MARGIN) -> np.ndarray:
+    """Indices whose value is the max (or min) of the centred 2 * radius + 1 window
+
+    Ties count, so a flat top of equal highs yields every bar in it.
+    """
+    values = as_float_array(values)
+    margin = max(margin, radius)
+    count = len(values)
+    if count < 2 * radius + 1 or count <= 2 * margin:
+        return np.empty(0, dtype=np.int64)
+
+    windows = sliding_window_view(values, 2 * radius + 1)
+    extreme = windows.max(axis=1) if maximum else windows.min(axis=1)
+    # windows[k] is centred on index k + radius
+    candidates = np.arange(margin, count - margin)
+    hits = values[candidates] == extreme[candidates - radius]
+    return candidates[hits]
+
+def next_breach(values: Iterable[float], above: bool = True) -> np.ndarray:
+    """For every index, the first later index strictly above (or below) it, -1 if none
+
+    Single right-to-left monotonic stack pass, O(n) overall.
+    """
+    values = as_float_array(values)
+    result = np.full(len(values), -1, dtype=np.int64)
+    stack = []
+    items = values.tolist()
+    for index in range(len(items) - 1, -1, -1):
+        value = items[index]
+        if above:
+            while stack and items[stack[-1]] <= value:
+                stack.pop()
+        else:
+            while stack and items[stack[-1]] >= value:
+                stack.pop()
+        if stack:
+            result[index] = stack[-1]
+        stack.append(index)
+    return result
+
+def liquidity_sweeps(highs: Iterable[float], lows: Iterable[float],
+                     radius: int = SWING_RADIUS, margin: int = SWING_MARGIN
+                     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Swing highs/lows that price later took out
+
+    Returns (high_levels, high_swept, low_levels, low_swept): swing indices
+    and the index of the first candle trading beyond each of them.
+    """
+    highs = as_float_array(highs)
+    lows = as_float_array(lows)
+
+    high_levels = swing_points(highs, True, radius, margin)
+    low_levels = swing_points(lows, False, radius, margin)
+
+    high_swept = next_breach(highs, above=True)[high_levels]
+    low_swept = next_breach(lows, above=False)[low_levels]
+
+    high_taken = high_swept >= 0
+    low_taken = low_swept >= 0
+    return high_levels[high_taken], high_swept[high_taken], low_levels[low_taken], low_swept[low_taken]
+
+class _IntervalNode:
+    """Centred interval tree node: the zones straddling ``center`` plus both subtrees"""
+
+    __slots__ = ('center', 'by_lower', 'lowers', 'by_upper', 'uppers', 'left', 'right')
+
+    def __init__(self, center: float, by_lower: List[int], lowers: List[float],
+                 by_upper: List[int], uppers: List[float]):
+        self.center = center
+        # Straddling zones ascending by lower edge, and descending by upper
+        # edge (``uppers`` holds the negated edges so bisect works ascending)
+        self.by_lower = by_lower
+        self.lowers = lowers
+        self.by_upper = by_upper
+        self.uppers = uppers
+        self.left = None
+        self.right = None
+
+class ZoneIndex:
+    """Price lookups over a fixed set of zones (rows with ``lower``/``upper`` fields)
+
+    ``containing(price)`` walks a centred interval tree in O(log n + k);
+    ``nearest_above``/``nearest_below`` bisect the sorted zone edges in
+    O(log n). The index is immutable: build a new one when the zones change.
+    """
+
+    def __init__(self, zones: np.ndarray):
+        self.zones = zones
+        lowers = zones['lower'].astype(np.float64)
+        uppers = zones['upper'].astype(np.float64)
+
+        # Nearest-zone lookups: lower edges ascending, upper edges ascending
+        self._lower_order = np.argsort(lowers, kind='stable')
+        self._sorted_lowers = lowers[self._lower_order]
+        self._upper_order = np.argsort(uppers, kind='stable')
+        self._sorted_uppers = uppers[self._upper_order]
+
+        self._root = self._build(np.arange(len(zones)), lowers, uppers)
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    @staticmethod
+    def _build(ids: np.ndarray, lowers: np.ndarray, uppers: np.ndarray) -> Optional[_IntervalNode]:
+        """Build the tree iteratively (depth is O(log n) but avoids recursion limits anyway)"""
+        if len(ids) == 0:
+            return None
+        root = None
+        stack = [(ids, None, False)]
+        while stack:
+            ids, parent, is_right = stack.pop()
+            center = float(np.median((lowers[ids] + uppers[ids]) / 2))
+            left = uppers[ids] < center
+            right = lowers[ids] > center
+            straddle = ids[~(left | right)]
+
+            order = np.argsort(lowers[straddle], kind='stable')
+            by_lower = straddle[order]
+            order = np.argsort(-uppers[straddle], kind='stable')
+            by_upper = straddle[order]
+            node = _IntervalNode(center, by_lower.tolist(), lowers[by_lower].tolist(),
+                                 by_upper.tolist(), (-uppers[by_upper]).tolist())
+
+            if parent is None:
+                root = node
+            elif is_right:
+                parent.right = node
+            else:
+                parent.left = node
+            if left.any():
+                stack.append((ids[left], node, False))
+            if right.any():
+                stack.append((ids[right], node, True))
+        return root
+
+    def containing(self, price: float) -> np.ndarray:
+        """Zones with lower <= price <= upper"""
+        found = []
+        node = self._root
+        while node is not None:
+            if price < node.center:
+                # Straddling zones reach past price on the right; keep those starting at or below it
+                found.extend(node.by_lower[:bisect_right(node.lowers, price)])
+                node = node.left
+            elif price > node.center:
+                found.extend(node.by_upper[:bisect_right(node.uppers, -price)])
+                node = node.right
+            else:
+                found.extend(node.by_lower)
+                break
+        return self.zones[np.sort(np.array(found, dtype=np.int64))]
+
+    def nearest_above(self, price: float) -> Optional[np.void]:
+        """Zone whose lower edge is the closest one strictly above price"""
+        position = int(np.searchsorted(self._sorted_lowers, price, side='right'))
+        if position == len(self._sorted_lowers):
+            return None
+        return self.zones[self._lower_order[position]]
+
+    def nearest_below(self, price: float) -> Optional[np.void]:
+        """Zone whose upper edge is the closest one strictly below price"""
+        position = int(np.searchsorted(self._sorted_uppers, price, side='left')) - 1
+        if position < 0:
+            return None
+        return self.zones[self._upper_order[position]]
+
+class SmartMoneyState:
+    """Active smart-money zones for one series, advanced incrementally
+
+    ``update`` consumes only candles newer than the last one it saw, so the
+    cost per tick is proportional to the new candles plus the active zones.
+    A zone is mitigated, and dropped, once a later candle trades through its
+    far edge (low at or below ``lower`` for bullish zones, high at or above
+    ``upper`` for bearish ones); a swing level is swept, and dropped, once
+    a later candle trades beyond it. The most recent mitigations and sweeps
+    are kept in bounded logs. Indices are positions in the stream of
+    candles consumed since the last reset. Not thread-safe; callers lock.
+    """
+
+    def __init__(self, lookback: int = 50, radius: int = SWING_RADIUS, history: int = EVENT_HISTORY):
+        self.lookback = lookback
+        self.radius = radius
+        self.history = history
+        # Candles carried over so patterns spanning two updates are still seen
+        self.context = max(2 * radius, 2)
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything"""
+        self.order_blocks = np.empty(0, dtype=ZONE_DTYPE)
+        self.fair_value_gaps = np.empty(0, dtype=ZONE_DTYPE)
+        self.liquidity = np.empty(0, dtype=LIQUIDITY_DTYPE)
+        self.sweeps = np.empty(0, dtype=SWEEP_DTYPE)
+        self.mitigations = np.empty(0, dtype=MITIGATION_DTYPE)
+        self.processed = 0
+        self.last_timestamp = None
+        # Set by the owner to whatever identifies the history consumed
+        self.source_version = None
+        # ZoneIndex over the active zones, rebuilt lazily after they change
+        self._index = None
+        self._tail = {name: np.empty(0, dtype=np.int64 if name == 'timestamp' else np.float64)
+                      for name in ('timestamp', 'high', 'low', 'close')}
+
+    def update(self, timestamps: np.ndarray, highs: np.ndarray, lows: np.ndarray,
+               closes: np.ndarray) -> int:
+        """Consume candles (sorted, oldest first); ones not newer than the last seen are skipped
+
+        Returns the number of candles consumed.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        first = 0
+        if self.last_timestamp is not None:
+            first = int(np.searchsorted(timestamps, self.last_timestamp, side='right'))
+        for start in range(first, len(timestamps), STATE_CHUNK):
+            end = min(start + STATE_CHUNK, len(timestamps))
+            self._advance(timestamps[start:end], as_float_array(highs[start:end]),
+                          as_float_array(lows[start:end]), as_float_array(closes[start:end]))
+        return len(timestamps) - first
+
+    def _advance(self, timestamps: np.ndarray, highs: np.ndarray, lows: np.ndarray,
+                 closes: np.ndarray) -> None:
+        """Consume one chunk of new candles"""
+        tail = self._tail
+        offset = len(tail['timestamp'])
+        timestamps = np.concatenate((tail['timestamp'], timestamps))
+        highs = np.concatenate((tail['high'], highs))
+        lows = np.concatenate((tail['low'], lows))
+        closes = np.concatenate((tail['close'], closes))
+        # Stream index of local position 0
+        base = self.processed - offset
+
+        # Zones confirmed by the new candles
+        new_blocks = order_blocks(highs, lows, closes, timestamps,
+                                  start=max(offset, self.lookback - base, 1))
+        new_gaps = fair_value_gaps(highs, lows, timestamps, start=max(offset, 2))
+        new_blocks['index'] += base
+        new_gaps['index'] += base
+
+        # Swing levels whose full window ends in the new candles
+        radius = self.radius
+        levels = []
+        for kind, prices, maximum in ((BULLISH, highs, True), (BEARISH, lows, False)):
+            index = swing_points(prices, maximum, radius, radius)
+            index = index[index >= offset - radius]
+            found = np.empty(len(index), dtype=LIQUIDITY_DTYPE)
+            found['kind'] = kind
+            found['price'] = prices[index]
+            found['index'] = index + base
+            found['timestamp'] = timestamps[index]
+            levels.append(found)
+
+        # Extremes of every suffix, with a sentinel for "no later candle"
+        lowest_after = np.append(np.minimum.accumulate(lows[::-1])[::-1], np.inf)
+        highest_after = np.append(np.maximum.accumulate(highs[::-1])[::-1], -np.inf)
+
+        mitigations = [self.mitigations]
+        active = len(self.order_blocks) + len(self.fair_value_gaps) + len(new_blocks) + len(new_gaps)
+        self.order_blocks = self._mitigate(np.concatenate((self.order_blocks, new_blocks)), ORDER_BLOCK,
+                                           base, offset, timestamps, lows, highs,
+                                           lowest_after, highest_after, mitigations)
+        self.fair_value_gaps = self._mitigate(np.concatenate((self.fair_value_gaps, new_gaps)), FAIR_VALUE_GAP,
+                                              base, offset, timestamps, lows, highs,
+                                              lowest_after, highest_after, mitigations)
+        self.mitigations = np.concatenate(mitigations)[-self.history:]
+        if len(new_blocks) or len(new_gaps) or len(self.order_blocks) + len(self.fair_value_gaps) != active:
+            self._index = None
+
+        liquidity = np.concatenate([self.liquidity] + levels)
+        start = np.maximum(liquidity['index'] - base + 1, offset)
+        buy_side = liquidity['kind'] == BULLISH
+        swept = np.where(buy_side, highest_after[start] > liquidity['price'],
+                         lowest_after[start] < liquidity['price'])
+        if swept.any():
+            events = np.empty(int(swept.sum()), dtype=SWEEP_DTYPE)
+            for row, level in enumerate(np.flatnonzero(swept).tolist()):
+                first = start[level]
+                price = liquidity['price'][level]
+                if buy_side[level]:
+                    hit = first + int(np.argmax(highs[first:] > price))
+                else:
+                    hit = first + int(np.argmax(lows[first:] < price))
+                events[row] = (liquidity['kind'][level], price, liquidity['timestamp'][level], timestamps[hit])
+            self.sweeps = np.concatenate((self.sweeps, events))[-self.history:]
+        self.liquidity = liquidity[~swept]
+
+        self.processed = base + len(timestamps)
+        self.last_timestamp = int(timestamps[-1])
+        keep = self.context
+        self._tail = {'timestamp': timestamps[-keep:], 'high': highs[-keep:],
+                      'low': lows[-keep:], 'close': closes[-keep:]}
+
+    def zone_index(self) -> 'ZoneIndex':
+        """Index over the active order blocks and fair value gaps (cached until they change)
+
+        ``index.zones`` is a ACTIVE_ZONE_DTYPE array; query results are rows of it.
+        """
+        if self._index is None:
+            zones = np.empty(len(self.order_blocks) + len(self.fair_value_gaps), dtype=ACTIVE_ZONE_DTYPE)
+            for name in ZONE_DTYPE.names:
+                zones[name] = np.concatenate((self.order_blocks[name], self.fair_value_gaps[name]))
+            zones['source'][:len(self.order_blocks)] = ORDER_BLOCK
+            zones['source'][len(self.order_blocks):] = FAIR_VALUE_GAP
+            self._index = ZoneIndex(zones)
+        return self._index
+
+    @staticmethod
+    def _mitigate(zones: np.ndarray, source: int, base: int, offset: int, timestamps: np.ndarray,
+                  lows: np.ndarray, highs: np.ndarray, lowest_after: np.ndarray,
+                  highest_after: np.ndarray, mitigations: list) -> np.ndarray:
+        """Drop zones traded through by candles after them, logging when"""
+        if len(zones) == 0:
+            return zones
+        start = np.maximum(zones['index'] - base + 1, offset)
+        bullish = zones['kind'] == BULLISH
+        filled = np.where(bullish, lowest_after[start] <= zones['lower'],
+                          highest_after[start] >= zones['upper'])
+        if filled.any():
+            events = np.empty(int(filled.sum()), dtype=MITIGATION_DTYPE)
+            for name in ZONE_DTYPE.names:
+                events[name] = zones[name][filled]
+            events['source'] = source
+            for row, zone in enumerate(np.flatnonzero(filled).tolist()):
+                first = start[zone]
+                if bullish[zone]:
+                    hit = first + int(np.argmax(lows[first:] <= zones['lower'][zone]))
+                else:
+                    hit = first + int(np.argmax(highs[first:] >= zones['upper'][zone]))
+                events['mitigated_at'][row] = timestamps[hit]
+            mitigations.append(events)
+        return zones[~filled]
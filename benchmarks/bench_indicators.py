@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Indicator benchmark for SVN Trading Bot
+Compares full-series indicator computation: the original per-candle
+recompute loop, the streaming engine, and the vectorized library
+
+Usage: python -m benchmarks.bench_indicators [candles ...]
+"""
+
+import sys
+import time
+import numpy as np
+from typing import Dict, List, Any
+
+from api.indicators import StreamingIndicators, calculate_indicator_series
+
+def make_candles(count: int, seed: int = 7) -> Dict[str, np.ndarray]:
+    """Random-walk OHLCV arrays"""
+    rng = np.random.default_rng(seed)
+    closes = 1.1 + np.cumsum(rng.normal(0, 0.0005, count))
+    return {
+        'high': closes + rng.random(count) * 0.0005,
+        'low': closes - rng.random(count) * 0.0005,
+        'close': closes,
+        'volume': rng.integers(1, 1000, count).astype(np.float64)
+    }
+
+def legacy_indicators(price_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The original calculate_technical_indicators body, kept as the baseline"""
+    if len(price_data) < 20:
+        return {}
+    closes = [float(candle['close']) for candle in price_data]
+    highs = [float(candle['high']) for candle in price_data]
+    lows = [float(candle['low']) for candle in price_data]
+    volumes = [int(candle['volume']) for candle in price_data]
+    indicators = {'sma_20': sum(closes[-20:]) / 20}
+    if len(closes) >= 50:
+        indicators['sma_50'] = sum(closes[-50:]) / 50
+    gains, losses = [], []
+    for i in range(1, min(15, len(closes))):
+        diff = closes[-i] - closes[-i-1]
+        gains.append(max(diff, 0))
+        losses.append(max(-diff, 0))
+    avg_gain = sum(gains) / len(gains)
+    avg_loss = sum(losses) / len(losses)
+    indicators['rsi'] = 100 - (100 / (1 + avg_gain / avg_loss)) if avg_loss else 100
+    indicators['resistance'] = max(highs[-20:])
+    indicators['support'] = min(lows[-20:])
+    indicators['volume_avg'] = sum(volumes[-20:]) / 20
+    true_ranges = []
+    for i in range(1, 15):
+        current, previous = price_data[-i], price_data[-i-1]
+        true_ranges.append(max(current['high'] - current['low'],
+                               abs(current['high'] - previous['close']),
+                               abs(current['low'] - previous['close'])))
+    indicators['atr'] = sum(true_ranges) / len(true_ranges)
+    return indicators
+
+def run_legacy(candles: Dict[str, np.ndarray]) -> None:
+    """Per-candle recompute over a growing list of dicts (capped at 1000 like the old cache)"""
+    price_data = []
+    for high, low, close, volume in zip(candles['high'].tolist(), candles['low'].tolist(),
+                                        candles['close'].tolist(), candles['volume'].tolist()):
+        price_data.append({'high': high, 'low': low, 'close': close, 'volume': volume})
+        if len(price_data) > 1000:
+            price_data = price_data[-1000:]
+        legacy_indicators(price_data)
+
+def run_streaming(candles: Dict[str, np.ndarray]) -> None:
+    """O(1) streaming engine, one Python call per candle"""
+    engine = StreamingIndicators()
+    for high, low, close, volume in zip(candles['high'].tolist(), candles['low'].tolist(),
+                                        candles['close'].tolist(), candles['volume'].tolist()):
+        engine.update(high, low, close, volume)
+
+def run_vectorized(candles: Dict[str, np.ndarray]) -> None:
+    """Whole-array computation including EMA, MACD, Bollinger and Stochastic"""
+    calculate_indicator_series(candles['high'], candles['low'], candles['close'], candles['volume'])
+
+def timed(func, candles: Dict[str, np.ndarray]) -> float:
+    """Wall-clock seconds for one run"""
+    started = time.perf_counter()
+    func(candles)
+    return time.perf_counter() - started
+
+def main(sizes: List[int]) -> None:
+    print(f"{'candles':>10} {'method':>12} {'seconds':>10} {'candles/s':>14}")
+    for size in sizes:
+        candles = make_candles(size)
+        for name, func in (('legacy', run_legacy), ('streaming', run_streaming),
+                           ('vectorized', run_vectorized)):
+            if name == 'legacy' and size > 100000:
+                continue
+            seconds = timed(func, candles)
+            print(f"{size:>10} {name:>12} {seconds:>10.4f} {size / seconds:>14,.0f}")
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000, 1000000])
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Pattern scanner benchmark for SVN Trading Bot
+Times swing extraction and the full-history pattern scan, up to a year of M1
+
+Usage: python -m benchmarks.bench_patterns [candles ...]
+"""
+
+import sys
+import time
+import numpy as np
+from typing import List
+
+from api.patterns import PATTERN_NAMES, pattern_swings, scan_patterns
+from benchmarks.bench_indicators import make_candles
+
+MINUTES_PER_YEAR = 365 * 24 * 60
+
+def main(sizes: List[int], order: int = 5) -> None:
+    print(f"{'candles':>10} {'swings':>8} {'patterns':>9} {'seconds':>10} {'candles/s':>14}")
+    for size in sizes:
+        candles = make_candles(size)
+        timestamps = 1700000000 + 60 * np.arange(size, dtype=np.int64)
+        started = time.perf_counter()
+        swings = pattern_swings(candles['high'], candles['low'], order)
+        patterns = scan_patterns(candles['high'], candles['low'], timestamps, order, swings=swings)
+        seconds = time.perf_counter() - started
+        print(f"{size:>10} {len(swings):>8} {len(patterns):>9} {seconds:>10.4f} {size / seconds:>14,.0f}")
+    counts = {PATTERN_NAMES[code]: int((patterns['pattern'] == code).sum()) for code in range(len(PATTERN_NAMES))}
+    print(f"last run: {counts}")
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, MINUTES_PER_YEAR])
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Smart money benchmark for SVN Trading Bot
+Compares the original per-candle order block and fair value gap loops over
+lists of dicts with the vectorized scanners over column arrays
+
+Usage: python -m benchmarks.bench_smart_money [candles ...]
+"""
+
+import sys
+import time
+import numpy as np
+from typing import Dict, List, Any
+
+from api.smart_money import order_blocks, fair_value_gaps
+from benchmarks.bench_indicators import make_candles
+
+LOOKBACK_PERIOD = 50
+
+def legacy_order_blocks(price_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The original analyze_order_blocks body, kept as the baseline"""
+    blocks = []
+    if len(price_data) < LOOKBACK_PERIOD:
+        return blocks
+    for i in range(LOOKBACK_PERIOD, len(price_data)):
+        current = price_data[i]
+        prev = price_data[i-1]
+        if current['close'] > prev['high'] * 1.001:
+            blocks.append({'type': 'bullish', 'price': prev['high'],
+                           'timestamp': current['timestamp'], 'strength': 'medium'})
+        elif current['close'] < prev['low'] * 0.999:
+            blocks.append({'type': 'bearish', 'price': prev['low'],
+                           'timestamp': current['timestamp'], 'strength': 'medium'})
+    return blocks
+
+def legacy_fair_value_gaps(price_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The original detect_fair_value_gaps body, kept as the baseline"""
+    fvgs = []
+    for i in range(2, len(price_data)):
+        prev_prev = price_data[i-2]
+        current = price_data[i]
+        if prev_prev['high'] < current['low']:
+            fvgs.append({'type': 'bullish', 'upper': current['low'],
+                         'lower': prev_prev['high'], 'timestamp': current['timestamp']})
+        if prev_prev['low'] > current['high']:
+            fvgs.append({'type': 'bearish', 'upper': prev_prev['low'],
+                         'lower': current['high'], 'timestamp': current['timestamp']})
+    return fvgs
+
+def make_columns(count: int) -> Dict[str, np.ndarray]:
+    """Random-walk candles with enough spread between bars to produce zones"""
+    candles = make_candles(count)
+    rng = np.random.default_rng(11)
+    candles['close'] = candles['close'] + rng.normal(0, 0.001, count)
+    candles['timestamp'] = 1700000000 + 60 * np.arange(count, dtype=np.int64)
+    return candles
+
+def to_dicts(columns: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """The list-of-dicts form the original scanners consumed"""
+    return [{'high': high, 'low': low, 'close': close, 'timestamp': timestamp}
+            for high, low, close, timestamp in zip(columns['high'].tolist(), columns['low'].tolist(),
+                                                   columns['close'].tolist(), columns['timestamp'].tolist())]
+
+def run_legacy(columns: Dict[str, np.ndarray], price_data: List[Dict[str, Any]]) -> int:
+    """Both original scanners"""
+    return len(legacy_order_blocks(price_data)) + len(legacy_fair_value_gaps(price_data))
+
+def run_vectorized(columns: Dict[str, np.ndarray], price_data: List[Dict[str, Any]]) -> int:
+    """Both boolean-mask scanners, returning structured zone arrays"""
+    blocks = order_blocks(columns['high'], columns['low'], columns['close'],
+                          columns['timestamp'], start=LOOKBACK_PERIOD)
+    gaps = fair_value_gaps(columns['high'], columns['low'], columns['timestamp'])
+    return len(blocks) + len(gaps)
+
+def main(sizes: List[int]) -> None:
+    print(f"{'candles':>10} {'method':>12} {'zones':>8} {'seconds':>10} {'candles/s':>14} {'speedup':>8}")
+    for size in sizes:
+        columns = make_columns(size)
+        price_data = to_dicts(columns)
+        baseline = None
+        for name, func in (('legacy', run_legacy), ('vectorized', run_vectorized)):
+            started = time.perf_counter()
+            zones = func(columns, price_data)
+            seconds = time.perf_counter() - started
+            baseline = baseline or seconds
+            print(f"{size:>10} {name:>12} {zones:>8} {seconds:>10.4f} {size / seconds:>14,.0f} "
+                  f"{baseline / seconds:>7.1f}x")
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Market store tests for SVN Trading Bot
+Batch upserts must leave a series in the same sorted state as row-by-row appends
+"""
+
+import numpy as np
+import pytest
+
+from api.market_store import CandleSeries, APPENDED, INSERTED
+
+def make_records(timestamps):
+    """Candle columns for the given epoch timestamps"""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    prices = 1.0 + timestamps / 1e6
+    return {
+        'timestamp': timestamps,
+        'open': prices,
+        'high': prices + 0.001,
+        'low': prices - 0.001,
+        'close': prices,
+        'volume': np.full(len(timestamps), 10, dtype=np.int64),
+    }
+
+def appended_one_by_one(timestamps, capacity=64):
+    """Reference series built through append"""
+    series = CandleSeries('EURUSD', 'M1', capacity)
+    records = make_records(timestamps)
+    for row in range(len(timestamps)):
+        series.append(int(records['timestamp'][row]), records['open'][row], records['high'][row],
+                      records['low'][row], records['close'][row], int(records['volume'][row]),
+                      received_at=0.0)
+    return series
+
+@pytest.mark.parametrize('batch', [
+    [200, 150, 160],
+    [300, 120, 130],
+    [300, 120, 130, 400, 401],
+    [50, 100, 101, 99, 102],
+    [101, 102, 103],
+])
+def test_extend_keeps_series_sorted(batch):
+    series = appended_one_by_one([100])
+    series.extend(make_records(batch), received_at=0.0)
+
+    timestamps = series.column('timestamp')
+    assert np.all(timestamps[1:] > timestamps[:-1])
+    reference = appended_one_by_one([100] + batch)
+    np.testing.assert_array_equal(timestamps, reference.column('timestamp'))
+    np.testing.assert_array_equal(series.column('close'), reference.column('close'))
+
+def test_extend_reports_bulk_rows_as_appended():
+    series = appended_one_by_one([100])
+    row_actions = []
+    actions = series.extend(make_records([200, 150, 160, 300]), received_at=0.0, row_actions=row_actions)
+
+    assert row_actions == [APPENDED, INSERTED, INSERTED, APPENDED]
+    assert actions[APPENDED] == 2 and actions[INSERTED] == 2
+
+def test_extend_random_batches_match_append():
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        history = sorted(rng.choice(1000, size=20, replace=False).tolist())
+        batch = rng.choice(np.arange(1, 1200), size=15, replace=False).tolist()
+        series = appended_one_by_one(history)
+        series.extend(make_records(batch), received_at=0.0)
+        reference = appended_one_by_one(history + batch)
+        np.testing.assert_array_equal(series.column('timestamp'), reference.column('timestamp'))